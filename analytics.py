@@ -0,0 +1,313 @@
+"""Streaming statistics over the JSON-lines game log.
+
+    python3 analytics.py [game_log*.json ...] [--json] [--no-numpy]
+
+Logs are read line by line and aggregated CHUNK_ROWS entries at a time,
+so memory depends on the number of players and cycles, not on the size
+of the log. Each chunk is reduced with a few bincounts when NumPy is
+installed and with a plain loop otherwise; both give the same numbers.
+
+Reported per player and per cycle: turns, accept / bonus / invalid /
+timeout rates, score velocity (points per turn), mean accepted word
+length and the gap between the client's player_timestamp and the
+server_timestamp. Overall: the accepted word-length distribution and
+gap percentiles.
+"""
+import argparse
+import glob
+import json
+import sys
+from datetime import datetime, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+LOG_PATTERN = "game_log*.json"      # live file, rotated files and prefork worker files
+CHUNK_ROWS = 65536
+STATES = ("accept", "bonus", "invalid", "timeout")
+MAX_WORD_LEN = 30       # longer accepted words share the last length bucket
+GAP_LIMIT_MS = 60000    # gaps are clipped to +-GAP_LIMIT_MS in the histogram
+
+EPOCH = datetime(1970, 1, 1)
+MS = timedelta(milliseconds=1)
+STATE_CODES = {s: i for i, s in enumerate(STATES)}
+ACCEPTED = (STATE_CODES["accept"], STATE_CODES["bonus"])
+
+def parse_ms(ts):
+    """Milliseconds since the epoch of a log timestamp, or None."""
+    try:
+        return (datetime.fromisoformat(ts) - EPOCH) // MS
+    except (TypeError, ValueError):
+        return None
+
+def new_group():
+    # [accept, bonus, invalid, timeout, points, chars, gap count, gap sum, gap min, gap max]
+    return [0, 0, 0, 0, 0, 0, 0, 0, None, None]
+
+def merge_gap(g, count, total, low, high):
+    g[6] += count
+    g[7] += total
+    g[8] = low if g[8] is None else min(g[8], low)
+    g[9] = high if g[9] is None else max(g[9], high)
+
+class Chunk:
+    """Up to CHUNK_ROWS log entries, stored as columns."""
+
+    def __init__(self):
+        self.names = {}         # player -> code within this chunk
+        self.player = []
+        self.cycle = []
+        self.state = []
+        self.points = []
+        self.length = []
+        self.server_ts = []
+        self.player_ts = []
+
+    def __len__(self):
+        return len(self.player)
+
+    def add(self, entry):
+        """Append one entry; returns False if it is not a turn record."""
+        state = STATE_CODES.get(entry.get("state"))
+        try:
+            cycle = int(entry["Cycle"])
+            points = int(entry["score_change"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        if state is None:
+            return False
+        name = str(entry.get("player"))
+        code = self.names.setdefault(name, len(self.names))
+        self.player.append(code)
+        self.cycle.append(cycle)
+        self.state.append(state)
+        self.points.append(points)
+        self.length.append(len(str(entry.get("word") or "")))
+        self.server_ts.append(timestamp(entry.get("server_timestamp")))
+        self.player_ts.append(timestamp(entry.get("player_timestamp")))
+        return True
+
+def timestamp(value):
+    # "2026-01-01T12:00:00.000Z" -> naive UTC text both parsers accept
+    if not isinstance(value, str) or not value:
+        return "NaT"
+    return value[:-1] if value.endswith("Z") else value
+
+class Stats:
+    def __init__(self, use_numpy=True):
+        self.numpy = use_numpy and np is not None
+        self.entries = 0
+        self.skipped = 0
+        self.players = {}
+        self.cycles = {}
+        self.lengths = [0] * (MAX_WORD_LEN + 1)
+        self.gaps = [0] * (2 * GAP_LIMIT_MS + 1)
+
+    def add_chunk(self, chunk):
+        if len(chunk):
+            self.entries += len(chunk)
+            (self._add_numpy if self.numpy else self._add_python)(chunk)
+
+    def _add_python(self, chunk):
+        names = list(chunk.names)
+        rows = zip(chunk.player, chunk.cycle, chunk.state, chunk.points,
+                   chunk.length, chunk.server_ts, chunk.player_ts)
+        for code, cycle, state, points, length, server_ts, player_ts in rows:
+            groups = (self.players.setdefault(names[code], new_group()),
+                      self.cycles.setdefault(cycle, new_group()))
+            accepted = state in ACCEPTED
+            if accepted:
+                self.lengths[min(length, MAX_WORD_LEN)] += 1
+            sent, received = parse_ms(player_ts), parse_ms(server_ts)
+            gap = None if sent is None or received is None else received - sent
+            if gap is not None:
+                self.gaps[min(max(gap, -GAP_LIMIT_MS), GAP_LIMIT_MS) + GAP_LIMIT_MS] += 1
+            for g in groups:
+                g[state] += 1
+                g[4] += points
+                if accepted:
+                    g[5] += length
+                if gap is not None:
+                    merge_gap(g, 1, gap, gap, gap)
+
+    def _add_numpy(self, chunk):
+        player = np.array(chunk.player, dtype=np.int64)
+        cycle = np.array(chunk.cycle, dtype=np.int64)
+        state = np.array(chunk.state, dtype=np.int64)
+        points = np.array(chunk.points, dtype=np.int64)
+        length = np.array(chunk.length, dtype=np.int64)
+        accepted = np.isin(state, ACCEPTED)
+
+        self._merge_hist(self.lengths, np.minimum(length[accepted], MAX_WORD_LEN))
+        received, sent = ms_array(chunk.server_ts), ms_array(chunk.player_ts)
+        valid = ~(np.isnat(received) | np.isnat(sent))
+        gap = (received[valid] - sent[valid]).astype(np.int64)
+        self._merge_hist(self.gaps, np.clip(gap, -GAP_LIMIT_MS, GAP_LIMIT_MS) + GAP_LIMIT_MS)
+
+        # cycles are reduced on offsets from the smallest one in the chunk
+        base = int(cycle.min())
+        for groups, keys, codes in ((self.players, list(chunk.names), player),
+                                    (self.cycles, None, cycle - base)):
+            n = int(codes.max()) + 1
+            counts = np.bincount(codes * len(STATES) + state, minlength=n * len(STATES))
+            counts = counts.reshape(n, len(STATES))
+            pts = np.bincount(codes, weights=points, minlength=n)
+            chars = np.bincount(codes[accepted], weights=length[accepted], minlength=n)
+            gap_codes = codes[valid]
+            gap_n = np.bincount(gap_codes, minlength=n)
+            gap_sum = np.bincount(gap_codes, weights=gap, minlength=n)
+            gap_min = np.full(n, np.iinfo(np.int64).max)
+            gap_max = np.full(n, np.iinfo(np.int64).min)
+            np.minimum.at(gap_min, gap_codes, gap)
+            np.maximum.at(gap_max, gap_codes, gap)
+            for i in np.flatnonzero(counts.sum(axis=1)):
+                key = keys[i] if keys is not None else base + int(i)
+                g = groups.setdefault(key, new_group())
+                for s in range(len(STATES)):
+                    g[s] += int(counts[i, s])
+                g[4] += int(pts[i])
+                g[5] += int(chars[i])
+                if gap_n[i]:
+                    merge_gap(g, int(gap_n[i]), int(gap_sum[i]), int(gap_min[i]), int(gap_max[i]))
+
+    @staticmethod
+    def _merge_hist(hist, values):
+        counts = np.bincount(values, minlength=len(hist))
+        for i in np.flatnonzero(counts):
+            hist[i] += int(counts[i])
+
+    def gap_summary(self):
+        total = sum(self.gaps)
+        if not total:
+            return {"count": 0}
+        result = {"count": total}
+        marks = [("p50", 0.50), ("p95", 0.95), ("p99", 0.99)]
+        seen = 0
+        for i, n in enumerate(self.gaps):
+            if not n:
+                continue
+            if "min" not in result:
+                result["min"] = i - GAP_LIMIT_MS
+            seen += n
+            while marks and seen >= marks[0][1] * total:
+                result[marks.pop(0)[0]] = i - GAP_LIMIT_MS
+            result["max"] = i - GAP_LIMIT_MS
+        gap_n = sum(g[6] for g in self.players.values())
+        result["mean"] = round(sum(g[7] for g in self.players.values()) / gap_n, 1)
+        return result
+
+    def report(self):
+        accepted = sum(self.lengths)
+        return {
+            "engine": "numpy" if self.numpy else "python",
+            "entries": self.entries,
+            "skipped": self.skipped,
+            "players": {k: describe(g) for k, g in sorted(self.players.items())},
+            "cycles": {k: describe(g) for k, g in sorted(self.cycles.items())},
+            "word_lengths": {(str(i) if i < MAX_WORD_LEN else f"{i}+"): n
+                             for i, n in enumerate(self.lengths) if n},
+            "mean_word_length": round(sum(i * n for i, n in enumerate(self.lengths)) / accepted, 2)
+                                if accepted else None,
+            "gap_ms": self.gap_summary(),
+        }
+
+def ms_array(values):
+    try:
+        return np.array(values, dtype="datetime64[ms]")
+    except ValueError:
+        # some timestamp in the chunk is malformed; parse one by one
+        parsed = (parse_ms(v) for v in values)
+        return np.array([np.datetime64("NaT") if v is None else np.datetime64(v, "ms") for v in parsed],
+                        dtype="datetime64[ms]")
+
+def describe(g):
+    turns = sum(g[:len(STATES)])
+    accepted = g[STATE_CODES["accept"]] + g[STATE_CODES["bonus"]]
+    result = {"turns": turns}
+    for s in STATES:
+        result[f"{s}_rate"] = round(g[STATE_CODES[s]] / turns, 3)
+    result["points_per_turn"] = round(g[4] / turns, 2)
+    result["mean_word_length"] = round(g[5] / accepted, 2) if accepted else None
+    result["gap_ms"] = round(g[7] / g[6], 1) if g[6] else None
+    result["gap_ms_min"], result["gap_ms_max"] = g[8], g[9]
+    return result
+
+def read_logs(paths, stats):
+    chunk = Chunk()
+    for path in paths:
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    stats.skipped += 1
+                    continue
+                if not isinstance(entry, dict) or not chunk.add(entry):
+                    stats.skipped += 1
+                    continue
+                if len(chunk) >= CHUNK_ROWS:
+                    stats.add_chunk(chunk)
+                    chunk = Chunk()
+    stats.add_chunk(chunk)
+    return stats
+
+def fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+def print_table(title, rows):
+    print(f"{title:<16} {'turns':>7} {'accept':>7} {'bonus':>7} {'invalid':>7} {'timeout':>7}"
+          f" {'pts/turn':>9} {'len':>6} {'gap ms':>9}")
+    for key, r in rows.items():
+        print(f"{str(key)[:16]:<16} {r['turns']:>7} {r['accept_rate']:>7.1%} {r['bonus_rate']:>7.1%}"
+              f" {r['invalid_rate']:>7.1%} {r['timeout_rate']:>7.1%} {r['points_per_turn']:>9.2f}"
+              f" {fmt(r['mean_word_length'], '.2f'):>6} {fmt(r['gap_ms'], '.1f'):>9}")
+    print()
+
+def print_report(report, paths):
+    print(f"{report['entries']} turns from {len(paths)} file(s), {report['skipped']} lines skipped"
+          f" ({report['engine']}).\n")
+    if not report['entries']:
+        return
+    print_table("player", report['players'])
+    print_table("cycle", report['cycles'])
+    print(f"accepted word lengths (mean {report['mean_word_length']}):")
+    lengths = report['word_lengths']
+    widest = max(lengths.values(), default=1)
+    for length, n in lengths.items():
+        print(f"  {length:>3} {n:>8} {'#' * max(1, round(40 * n / widest))}")
+    gap = report['gap_ms']
+    print("\nserver_timestamp - player_timestamp (ms):")
+    if gap['count']:
+        print("  " + "  ".join(f"{k} {gap[k]}" for k in ("count", "mean", "min", "p50", "p95", "p99", "max")))
+    else:
+        print("  no entries carry a player_timestamp")
+
+def main():
+    parser = argparse.ArgumentParser(description="Statistics over the JSON-lines game log")
+    parser.add_argument("logs", nargs="*", help=f"log files or globs (default: {LOG_PATTERN})")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--no-numpy", action="store_true", help="use the pure Python aggregation")
+    args = parser.parse_args()
+
+    paths = []
+    for pattern in args.logs or [LOG_PATTERN]:
+        paths.extend(sorted(glob.glob(pattern)) or ([pattern] if args.logs else []))
+    if not paths:
+        sys.exit(f"No log files match {LOG_PATTERN}.")
+    try:
+        stats = read_logs(paths, Stats(use_numpy=not args.no_numpy))
+    except OSError as e:
+        sys.exit(f"Cannot read log: {e}")
+    report = stats.report()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, paths)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import asyncio
+import signal
+
+import inbound
+import outbound
+import scheduler
+import server
+import wire
+
+
+connections = 0
+clients = set()     # handle_client tasks, cancelled on SIGTERM
+
+async def handle_client(reader, writer):
+    global connections
+    if connections >= server.MAX_CONNECTIONS:
+        writer.write(b"INFO Server full.\n")
+        writer.close()
+        return
+    connections += 1
+    clients.add(asyncio.current_task())
+    outbox = outbound.AsyncOutbox(writer)
+    p = server.new_player(outbox)
+    lines = inbound.LineReader(lambda msg: server.send_to(p, wire.error(msg)))
+
+    try:
+        while True:
+            data = await reader.read(inbound.RECV_SIZE)
+            if not data:
+                raise ConnectionError()
+            for line in lines.feed(data):
+                p = server.handle_line(p, line) or p
+    except (OSError, ValueError, asyncio.CancelledError):
+        # cancelled only on shutdown; finishing normally keeps the stream's
+        # done callback from reporting it
+        pass
+    finally:
+        # Handle disconnection
+        server.lose_connection(p, outbox)
+        connections -= 1
+        clients.discard(asyncio.current_task())
+        outbox.close()
+        writer.close()
+
+async def serve(port=server.PORT):
+    server.load_dictionary()
+    # turn timers and chat flushes run on the loop, next to the outboxes they write to
+    scheduler.loop = loop = asyncio.get_running_loop()
+    srv = await asyncio.start_server(handle_client, '', port,
+                                     reuse_address=True, backlog=1024)
+    # SIGTERM stops the loop from inside, so the connections close before
+    # asyncio.run returns and atexit drains the game log
+    stopping = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stopping.set)
+    print(f"Server (asyncio) listening on port {port}...")
+    await stopping.wait()
+    srv.close()
+    tasks = list(clients)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await srv.wait_closed()
+
+def accept_loop(port=server.PORT):
+    try:
+        asyncio.run(serve(port))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    accept_loop()
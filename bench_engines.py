@@ -0,0 +1,180 @@
+"""Side-by-side comparison of the thread and asyncio server engines.
+
+For each engine a server process is started, then:
+  * turn latency: two players play full games, measuring the time from
+    sending a word to receiving the JSON turn result;
+  * connections: N idle clients connect, then the server's RSS and
+    thread count are read from /proc.
+
+Usage: python3 bench_engines.py [--connections 1000] [--turns 200]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from server import DICT_FILE
+
+def load_words(path=DICT_FILE):
+    by_letter = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            w = line.strip().lower()
+            if w.isalpha():
+                by_letter.setdefault(w[0], []).append(w)
+    return by_letter
+
+def start_server(engine, port, max_connections, log):
+    # Wait for the banner rather than probing the port: a probe connection
+    # would take a player slot.
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "server.py", "--engine", engine, "--port", str(port),
+         "--max-connections", str(max_connections)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        log.seek(0)
+        if b"listening" in log.read():
+            return proc
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{engine} server did not start")
+
+def proc_status(pid):
+    info = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "Threads"):
+                info[key] = int(value.split()[0])
+    return info
+
+class LineSocket:
+    def __init__(self, port):
+        self.sock = socket.create_connection(('localhost', port))
+        self.buf = b""
+
+    def send(self, line):
+        self.sock.sendall((line + "\n").encode())
+
+    def readline(self):
+        while b"\n" not in self.buf:
+            chunk = self.sock.recv(4096)
+            if not chunk:
+                raise ConnectionError("server closed connection")
+            self.buf += chunk
+        line, self.buf = self.buf.split(b"\n", 1)
+        return line.decode()
+
+    def close(self):
+        self.sock.close()
+
+def measure_turns(port, turns, words):
+    """Play games between two players until `turns` words were answered."""
+    host, guest = LineSocket(port), LineSocket(port)
+    conns = {"host": host, "guest": guest}
+    host.send("REGISTER host")
+    while "You are the host" not in host.readline():
+        pass
+    guest.send("REGISTER guest")
+    while "Player guest joined" not in host.readline():
+        pass
+    host.send("START")
+
+    samples = []
+    used = set()
+    while len(samples) < turns:
+        # Only the prompted player receives PROMPT; poll both sockets.
+        for name, conn in conns.items():
+            conn.sock.settimeout(0.01 if not conn.buf else None)
+            try:
+                line = conn.readline()
+            except socket.timeout:
+                continue
+            finally:
+                conn.sock.settimeout(None)
+            if line.startswith("PROMPT"):
+                letter = line.split()[1]
+                word = next((w for w in words.get(letter, ()) if w not in used), "zzz")
+                used.add(word)
+                sent = time.perf_counter()
+                conn.send(json.dumps({"word": word, "player": name}))
+                while True:
+                    reply = conn.readline()
+                    if reply.startswith("{"):
+                        samples.append(time.perf_counter() - sent)
+                        break
+            elif line.startswith("ENDGAME") and name == "host":
+                used.clear()
+                time.sleep(0.05)
+                host.send("START")
+    host.close()
+    guest.close()
+    return samples
+
+def measure_connections(port, count, pid):
+    conns = []
+    t0 = time.perf_counter()
+    for _ in range(count):
+        conns.append(socket.create_connection(('localhost', port)))
+    connect_time = time.perf_counter() - t0
+    time.sleep(1.0)
+    status = proc_status(pid)
+    for c in conns:
+        c.close()
+    return connect_time, status
+
+def run_engine(engine, port, args, words):
+    log = tempfile.TemporaryFile()
+    proc = start_server(engine, port, args.connections + 10, log)
+    try:
+        baseline = proc_status(proc.pid)
+        samples = measure_turns(port, args.turns, words)
+        time.sleep(0.5)
+        connect_time, loaded = measure_connections(port, args.connections, proc.pid)
+    finally:
+        proc.kill()
+        proc.wait()
+        log.close()
+    samples.sort()
+    return {
+        "engine": engine,
+        "connections": args.connections,
+        "connect_s": round(connect_time, 3),
+        "rss_idle_kb": baseline["VmRSS"],
+        "rss_loaded_kb": loaded["VmRSS"],
+        "kb_per_conn": round((loaded["VmRSS"] - baseline["VmRSS"]) / args.connections, 2),
+        "threads_loaded": loaded["Threads"],
+        "turn_p50_ms": round(statistics.median(samples) * 1000, 3),
+        "turn_p95_ms": round(samples[int(len(samples) * 0.95) - 1] * 1000, 3),
+        "turn_max_ms": round(samples[-1] * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--port", type=int, default=23456)
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = parser.parse_args()
+
+    words = load_words()
+    results = [run_engine(engine, args.port + i, args, words)
+               for i, engine in enumerate(("thread", "asyncio"))]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    keys = [k for k in results[0] if k != "engine"]
+    print(f"{'':16}" + "".join(f"{r['engine']:>12}" for r in results))
+    for k in keys:
+        print(f"{k:16}" + "".join(f"{r[k]:>12}" for r in results))
+
+if __name__ == "__main__":
+    main()
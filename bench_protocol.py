@@ -0,0 +1,84 @@
+"""Text vs binary encoding of the high-frequency server messages.
+
+For each message kind (and for a typical turn's mix) reports the bytes
+on the wire, the server's cost to build and encode a frame, and the
+client's cost to frame and parse it into an event (gameclient).
+
+Usage: python3 bench_protocol.py [--count 20000] [--json]
+"""
+import argparse
+import json
+import time
+
+import gameclient
+import wire
+
+
+PLAYERS = [("alice", 42), ("bob", 17), ("carol", 33), ("dave", 8), ("erin", 25)]
+
+MESSAGES = {
+    "scores": lambda: wire.scores(PLAYERS),
+    "delta": lambda: wire.score_delta(1234, PLAYERS[:1], []),
+    "result": lambda: wire.result(12, "alice", "elephant", "bonus", 13, 42,
+                                  "2026-01-01T12:00:00.000Z", "2026-01-01T12:00:00.012Z"),
+    "played": lambda: wire.played("alice", "elephant", 13, "accept"),
+    "prompt": lambda: wire.prompt("t"),
+    "chat": lambda: wire.chat("bob", "nice one"),
+}
+# what every player of a 5-player room receives per turn (the prompt goes to one)
+TURN_MIX = ["played", "scores", "played", "scores", "result", "prompt"]
+
+def per_op_ns(fn, count, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(count)
+        best = min(best, time.perf_counter() - t0)
+    return best / count * 1e9
+
+def encode_ns(make, binary, count):
+    def run(n):
+        for _ in range(n):
+            make().encode(binary)
+    return per_op_ns(run, count)
+
+def decode_ns(stream, messages, binary):
+    def run(_):
+        framer = gameclient.LineFramer()
+        framer.binary = binary
+        for i in range(0, len(stream), gameclient.BUFFER_SIZE):
+            framer.feed(stream[i:i + gameclient.BUFFER_SIZE])
+            for item in framer.lines():
+                gameclient.to_event(item)
+    return per_op_ns(run, messages)
+
+def measure(kinds, count):
+    row = {}
+    for binary, label in ((False, "text"), (True, "binary")):
+        frames = [MESSAGES[k]().encode(binary) for k in kinds]
+        stream = b"".join(frames) * (count // len(kinds))
+        row[f"{label}_bytes"] = round(sum(map(len, frames)) / len(frames), 1)
+        row[f"{label}_encode_ns"] = round(sum(encode_ns(MESSAGES[k], binary, count // len(kinds))
+                                              for k in kinds) / len(kinds))
+        row[f"{label}_decode_ns"] = round(decode_ns(stream, count // len(kinds) * len(kinds), binary))
+    return row
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=20000, help="messages per measurement")
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = parser.parse_args()
+
+    results = {kind: measure([kind], args.count) for kind in MESSAGES}
+    results["turn mix"] = measure(TURN_MIX, args.count)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    keys = list(next(iter(results.values())))
+    print(f"{'':10}" + "".join(f"{k:>18}" for k in keys))
+    for kind, row in results.items():
+        print(f"{kind:10}" + "".join(f"{row[k]:>18}" for k in keys))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Server-side bot players.
+
+The host of a room adds bots with BOT [easy|medium|hard]. They fill seats
+like players and take their turns from a scheduler timer, after a think
+time that depends on the level, so they never hold a thread.
+
+Moves come from the dictionary's wordindex.LetterGraph. From the current
+letter, a bot looks at the last letters it can reach with an unused
+word. Easy and medium bots pick one at random, and easy bots sometimes
+miss. Hard bots pick the letter that leaves the next player the fewest
+unused words. Then the bot takes an unused word of that pair, starting
+from a random position in its id list. This is one pass over at most a
+few dozen letters and a few bitset probes: microseconds.
+"""
+import random
+import threading
+
+
+# level -> (think time range in seconds, chance of answering with a non-word)
+LEVELS = {
+    "easy": ((3.0, 8.0), 0.15),
+    "medium": ((1.5, 4.0), 0.05),
+    "hard": ((0.5, 1.5), 0.0),
+}
+DEFAULT_LEVEL = "medium"
+MISS = "qxzj"           # appended to the letter when a bot misses
+
+stats_lock = threading.Lock()
+totals = {"added": 0, "moves": 0, "misses": 0}
+
+def count(key):
+    with stats_lock:
+        totals[key] += 1
+
+def snapshot():
+    """Bot counters: bots added, moves made, deliberate misses."""
+    with stats_lock:
+        return dict(totals)
+
+class NoOutbox:
+    """A bot's outbox: what the server sends it is dropped."""
+
+    def put(self, data, kind="default"):
+        pass
+
+    def abort(self):
+        pass
+
+def think_time(level):
+    low, high = LEVELS[level][0]
+    return random.uniform(low, high)
+
+def choose_word(graph, index, used, letter, level):
+    """A word starting with `letter` for a bot of `level`, or None if none is left."""
+    count("moves")
+    if random.random() < LEVELS[level][1]:
+        count("misses")
+        return letter + MISS
+    targets = [(last, ids) for last, ids in graph.targets(letter).items()
+               if len(ids) > used.used_pair(letter, last)]
+    if not targets:
+        return None
+    if level == "hard":
+        # words the next player can choose from; a dead end makes the server draw a new letter
+        left = [used.remaining(t[0]) - (t[0] == letter) for t in targets]
+        left = [n if n > 0 else len(index) for n in left]
+        best = min(left)
+        targets = [t for t, n in zip(targets, left) if n == best]
+    _, ids = random.choice(targets)
+    start = random.randrange(len(ids))
+    for k in range(len(ids)):
+        word_id = ids[(start + k) % len(ids)]
+        if word_id not in used:
+            return index.word(word_id)
+    return None
@@ -0,0 +1,75 @@
+"""Rate-limited, batched room chat.
+
+Each sender has a token bucket (RATE messages per second, up to BURST at
+once); a CHAT line that finds the bucket empty is dropped and the sender
+told so once per burst. Accepted messages wait in their room for
+FLUSH_MS; everything that arrived in that window is sent to each member
+as one combined write, encoded once per encoding. Flushes are scheduler
+timers.
+"""
+import threading
+import time
+
+import scheduler
+import wire
+
+
+RATE = 2.0          # messages per second per sender
+BURST = 5           # messages a sender may send at once
+FLUSH_MS = 5        # how long a room collects chat before sending it
+
+stats_lock = threading.Lock()
+totals = {"messages": 0, "throttled": 0, "coalesced": 0, "flushes": 0}
+
+def count(key, n=1):
+    with stats_lock:
+        totals[key] += n
+
+def snapshot():
+    """Chat counters: accepted, throttled and coalesced messages, flushes."""
+    with stats_lock:
+        return dict(totals)
+
+class TokenBucket:
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate or RATE
+        self.burst = burst or BURST
+        self.tokens = float(self.burst)
+        self.stamp = time.monotonic()
+        self.warned = False     # sender was told about this run of throttled messages
+
+    def take(self):
+        """True if a message may go out now."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        self.warned = False
+        return True
+
+def post(room, frame):
+    """Queue a wire.Frame for the room's next flush."""
+    count("messages")
+    with room.lock:
+        room.chat.append(frame)
+        if len(room.chat) > 1:
+            return
+    scheduler.call_later(FLUSH_MS / 1000, flush, room)
+
+def flush(room):
+    with room.lock:
+        frames, room.chat = room.chat, []
+        events = [(room.log_event(f), f) for f in frames]
+        targets = list(room.players.values())
+    if not frames:
+        return
+    count("flushes")
+    count("coalesced", len(frames) - 1)
+    data = {}
+    for p in targets:
+        key = (p['binary'], p['resume'])
+        if key not in data:
+            data[key] = b"".join([wire.encode_event(f, seq, *key) for seq, f in events])
+        p['send'](data[key], "chat")
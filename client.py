@@ -1,37 +1,118 @@
-import socket
-import threading
-import time
 import tkinter as tk
 from tkinter import scrolledtext, messagebox
+import collections
 import json
-import datetime
+import queue
+import threading
+
+import dictcache
+import gameclient
+from gameclient import (Chat, DictionaryData, DictionaryVersion, Disconnected, EndGame, Error, GameStarted,
+                        Host, Info, Played, Prompt, Rooms, Scores, ScoreDelta, ScoreSnapshot, Session,
+                        TurnResult)
 
 HOST = 'localhost'
 PORT = 12345
-BUFFER_SIZE = 1024
-RETRY_ATTEMPTS = 3
-RETRY_DELAY = 2  # seconds
+CHAT_HISTORY = 1000     # messages kept for scrolling back
+CHAT_ROWS = 30          # row widgets; more than fit in the chat area
+UI_TICK_MS = 50         # events are applied to the GUI in batches this often
+COMPLETIONS = 5         # words suggested under the word entry
+
+class ChatView:
+    """Chat log with a fixed pool of row labels.
+
+    Messages live in a ring buffer of `history` entries; render() fills the
+    rows from the bottom with the messages at the current scroll position,
+    so the number of widgets stays the same however long the session runs.
+    """
+
+    COLORS = {"me": '#e5f6ff', "system": '#f0f0f0', "other": '#f0f2f5'}
+
+    def __init__(self, parent, rows=CHAT_ROWS, history=CHAT_HISTORY):
+        self.messages = collections.deque(maxlen=history)
+        self.offset = 0         # messages scrolled back from the newest
+        self.dirty = False
+        self.scrollbar = tk.Scrollbar(parent, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.frame = tk.Frame(parent, bg='white', width=400)
+        self.frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.frame.pack_propagate(False)
+        self.rows = []
+        for _ in range(rows):
+            label = tk.Label(self.frame, bg='white', fg='#1c1e21', font=('Arial', 10),
+                             anchor='w', justify='left', wraplength=380)
+            label.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+            self.rows.append(label)
+        for widget in [self.frame] + self.rows:
+            widget.bind("<MouseWheel>", lambda e: self.scroll(1 if e.delta > 0 else -1))
+            widget.bind("<Button-4>", lambda e: self.scroll(1))
+            widget.bind("<Button-5>", lambda e: self.scroll(-1))
+
+    def add(self, sender, text, is_me=False):
+        self.messages.append((sender, text, is_me))
+        if self.offset:
+            # keep a scrolled-back view where it is
+            self.offset = min(self.offset + 1, len(self.messages) - 1)
+        self.dirty = True
+
+    def scroll(self, lines):
+        self.offset = max(0, min(self.offset + lines, len(self.messages) - 1))
+        self.dirty = True
+        self.render()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        total = len(self.messages)
+        if action == "moveto":
+            # the scrollbar runs oldest (0.0) to newest (1.0) and marks the top row
+            self.scroll(total - int(float(amount) * total) - len(self.rows) - self.offset)
+        else:
+            step = len(self.rows) if unit == "pages" else 1
+            self.scroll(-int(amount) * step)
+
+    def render(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+        newest = len(self.messages) - 1 - self.offset
+        for i, label in enumerate(self.rows):
+            if newest - i < 0:
+                label.config(text="", bg='white')
+                continue
+            sender, text, is_me = self.messages[newest - i]
+            if sender == "System":
+                label.config(text=text, bg=self.COLORS["system"])
+            else:
+                name = sender + (" (You)" if is_me else "")
+                label.config(text=f"{name}: {text}", bg=self.COLORS["me" if is_me else "other"])
+        total = max(len(self.messages), 1)
+        self.scrollbar.set(max(0, newest + 1 - len(self.rows)) / total, (newest + 1) / total)
 
 class GameClient:
     def __init__(self, root):
         self.root = root
         self.root.title("Networked Word Chain Game")
-        self.client_socket = None
+        self.conn = gameclient.GameConnection(HOST, PORT)
         self.name = ""
         self.timer_running = False
         self.time_left = 30
         self.timer_id = None
         self.is_host = False
-        self.scores = {}
+        self.scoreboard = gameclient.Scoreboard()
         self.current_player = ""
         self.current_letter = ""
         self.my_turn = False
         self.current_cycle = 1
+        self.events = queue.SimpleQueue()
+        self.score_changes = set()
+        self.reconnecting = False
+        self.dictionary = None      # dictcache.LocalDictionary for pre-checking words
+        self.used_words = set()     # words played in this game
         self.setup_gui()
-        self.connect_to_server()
-        self.receive_thread = threading.Thread(target=self.receive_messages)
-        self.receive_thread.daemon = True
-        self.receive_thread.start()
+        if self.connect_to_server():
+            # events arrive on the reader thread; Tk is only touched from the main loop
+            self.receive_thread = self.conn.start_reader(self.events.put)
+            self.conn.request_dictionary()
+        self.tick()
         self.my_turn = False
         self.word_entry.config(state='disabled')
 
@@ -59,6 +140,15 @@ class GameClient:
         
         self.start_button = tk.Button(self.top_frame, text="Start Game", command=self.start_game, state='disabled')
         self.start_button.pack(side=tk.LEFT, padx=5)
+        tk.Button(self.top_frame, text="Add Bot", command=self.add_bot).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(self.top_frame, text="Room:").pack(side=tk.LEFT, padx=5)
+        self.room_entry = tk.Entry(self.top_frame, width=10)
+        self.room_entry.insert(0, "main")
+        self.room_entry.pack(side=tk.LEFT, padx=5)
+        tk.Button(self.top_frame, text="Join", command=lambda: self.send_room_command("JOIN")).pack(side=tk.LEFT)
+        tk.Button(self.top_frame, text="Create", command=lambda: self.send_room_command("CREATE")).pack(side=tk.LEFT)
+        tk.Button(self.top_frame, text="Rooms", command=lambda: self.send_room_command("ROOMS")).pack(side=tk.LEFT)
         
         self.timer_label = tk.Label(self.top_frame, text="Time: 30")
         self.timer_label.pack(side=tk.RIGHT, padx=10)
@@ -72,24 +162,15 @@ class GameClient:
         self.score_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=5)
 
         # Chat display with scrollbar
-        self.chat_canvas = tk.Canvas(self.chat_frame, bg='white', width=400)
-        self.scrollbar = tk.Scrollbar(self.chat_frame, command=self.chat_canvas.yview)
-        self.chat_canvas.configure(yscrollcommand=self.scrollbar.set)
-        
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.chat_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        self.chat_inner_frame = tk.Frame(self.chat_canvas, bg='white')
-        self.chat_canvas.create_window((0, 0), window=self.chat_inner_frame, anchor='nw')
-        
-        self.chat_inner_frame.bind("<Configure>", lambda e: self.chat_canvas.configure(
-            scrollregion=self.chat_canvas.bbox("all")))
+        self.chat = ChatView(self.chat_frame)
 
         # Bottom frame - Input controls
         tk.Label(self.bottom_frame, text="Word:").pack(side=tk.LEFT, padx=5)
         self.word_entry = tk.Entry(self.bottom_frame, width=25)
         self.word_entry.pack(side=tk.LEFT, padx=5)
         self.word_entry.bind('<Return>', lambda event: self.send_word())
+        self.word_entry.bind('<KeyRelease>', lambda event: self.show_completions())
+        self.word_entry.bind('<Tab>', lambda event: self.complete_word())
         
         tk.Button(self.bottom_frame, text="Send Word", command=self.send_word).pack(side=tk.LEFT, padx=5)
         
@@ -100,75 +181,68 @@ class GameClient:
         
         tk.Button(self.bottom_frame, text="Send Chat", command=self.send_chat).pack(side=tk.LEFT, padx=5)
 
+        self.completion_label = tk.Label(self.root, text="", fg="gray", anchor='w')
+        self.completion_label.pack(fill=tk.X, padx=10)
+
         # Initialize score labels
-        self.score_labels = {}
+        self.score_labels = {}      # name -> (row frame, label)
+        self.score_order = []
 
     def add_message_to_chat(self, sender, text, is_word=False, is_me=False):
-        msg_frame = tk.Frame(self.chat_inner_frame, bg='white')
-        msg_frame.pack(fill=tk.X, pady=2)
-        
-        msg_bg = '#f0f2f5'
-        if is_me:
-            msg_bg = '#e5f6ff'
-        elif sender == "System":
-            msg_bg = '#f0f0f0'
-            
-        msg_container = tk.Frame(msg_frame, bg=msg_bg)
-        msg_container.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        
-        if sender != "System":
-            name_label = tk.Label(msg_container, 
-                                text=sender + (" (You)" if is_me else ""), 
-                                bg=msg_container['bg'],
-                                fg='#385898',
-                                font=('Arial', 9, 'bold'),
-                                anchor='w')
-            name_label.pack(fill=tk.X, padx=5, pady=(5, 0))
-        
-        msg_label = tk.Label(msg_container, 
-                            text=text,
-                            bg=msg_container['bg'],
-                            fg='#1c1e21',
-                            font=('Arial', 10),
-                            anchor='w',
-                            justify='left',
-                            wraplength=300)
-        msg_label.pack(fill=tk.X, padx=5, pady=(0 if sender == "System" else 5, 5))
-        
-        self.chat_canvas.yview_moveto(1.0)
-
-    def update_score_display(self):
-        for widget in self.score_frame.winfo_children():
-            widget.destroy()
+        self.chat.add(sender, text, is_me)
 
-        sorted_scores = sorted(self.scores.items(), key=lambda x: x[1], reverse=True)
-        
-        for player, score in sorted_scores:
-            frame = tk.Frame(self.score_frame)
-            frame.pack(fill=tk.X, padx=5, pady=2)
-            
-            label_text = f"{player}: {score}"
+    def tick(self):
+        """Apply the events received since the last tick, then redraw chat and scores once."""
+        try:
+            while True:
+                self.handle_event(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        finally:
+            if self.score_changes:
+                self.update_score_display(self.score_changes)
+                self.score_changes = set()
+            self.chat.render()
+            self.root.after(UI_TICK_MS, self.tick)
+
+    def update_score_display(self, changed):
+        """Update the labels of the `changed` players in place; rows are only repacked when the order changes."""
+        scores = self.scoreboard.scores
+        for player in changed:
+            if player not in scores:
+                row = self.score_labels.pop(player, None)
+                if row is not None:
+                    row[0].destroy()
+                continue
+            label_text = f"{player}: {scores[player]}"
             if player == self.name:
                 label_text += " (You)"
-                
-            label = tk.Label(frame, text=label_text, font=('Arial', 10))
-            label.pack(side=tk.LEFT, padx=5)
+            if player in self.score_labels:
+                self.score_labels[player][1].config(text=label_text)
+            else:
+                frame = tk.Frame(self.score_frame)
+                label = tk.Label(frame, text=label_text, font=('Arial', 10))
+                label.pack(side=tk.LEFT, padx=5)
+                self.score_labels[player] = (frame, label)
+
+        order = sorted(scores, key=lambda n: scores[n], reverse=True)
+        if order != self.score_order:
+            for player in order:
+                self.score_labels[player][0].pack_forget()
+            for player in order:
+                self.score_labels[player][0].pack(fill=tk.X, padx=5, pady=2)
+            self.score_order = order
 
     def connect_to_server(self):
-        for attempt in range(RETRY_ATTEMPTS):
-            try:
-                self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.client_socket.settimeout(5)
-                self.client_socket.connect((HOST, PORT))
-                self.client_socket.settimeout(None)
-                self.add_message_to_chat("System", "Connected to server")
-                return
-            except Exception as e:
-                self.add_message_to_chat("System", f"Connection attempt {attempt + 1} failed: {e}")
-                if attempt < RETRY_ATTEMPTS - 1:
-                    time.sleep(RETRY_DELAY)
-        messagebox.showerror("Error", "Failed to connect to server after multiple attempts")
-        self.root.quit()
+        try:
+            self.conn.connect(on_retry=lambda attempt, e: self.add_message_to_chat(
+                "System", f"Connection attempt {attempt} failed: {e}"))
+            self.add_message_to_chat("System", "Connected to server")
+            return True
+        except OSError:
+            messagebox.showerror("Error", "Failed to connect to server after multiple attempts")
+            self.root.quit()
+            return False
 
     def register(self):
         self.name = self.name_entry.get().strip()
@@ -176,7 +250,7 @@ class GameClient:
             messagebox.showwarning("Warning", "Please enter a name")
             return
         try:
-            self.client_socket.send(f"REGISTER {self.name}\n".encode('utf-8'))
+            self.conn.register(self.name, delta=True, resume=True, ping=True, state=True)
             self.name_entry.config(state='disabled')
             self.register_button.config(state='disabled')
             self.add_message_to_chat("System", "Registering name...")
@@ -185,6 +259,17 @@ class GameClient:
             self.name_entry.config(state='normal')
             self.register_button.config(state='normal')
 
+    def send_room_command(self, cmd):
+        room = self.room_entry.get().strip()
+        if cmd != "ROOMS" and not room:
+            messagebox.showwarning("Warning", "Please enter a room name")
+            return
+        line = cmd if cmd == "ROOMS" else f"{cmd} {room}"
+        try:
+            self.conn.send_line(line)
+        except Exception as e:
+            self.add_message_to_chat("System", f"Error sending room command: {e}")
+
     def start_timer(self):
         if self.timer_running:
             return
@@ -210,142 +295,142 @@ class GameClient:
     def start_game(self):
         if self.is_host:
             try:
-                self.client_socket.send("START\n".encode('utf-8'))
+                self.conn.start_game()
                 self.start_button.config(state='disabled')
             except Exception as e:
                 self.add_message_to_chat("System", f"Error starting game: {e}")
         else:
             self.add_message_to_chat("System", "Only the host can start the game!")
 
-    def receive_messages(self):
-        buffer = b""
-        while True:
-            try:
-                chunk = self.client_socket.recv(BUFFER_SIZE)
-                if not chunk:
-                    raise ConnectionError("Server disconnected")
-                buffer += chunk
-
-                while b'\n' in buffer:
-                    message, buffer = buffer.split(b'\n', 1)
-                    message = message.decode('utf-8', errors='ignore').strip()
-                    if not message:
-                        continue
-
-                    print(f"Client received: {message}")  # Debug log
-
-                    if message.startswith('INFO Registration successful'):
-                        self.root.after(0, lambda: self.add_message_to_chat("System", "Registration successful!"))
-                        continue
-                        
-                    if message.startswith('INFO Name already taken'):
-                        self.root.after(0, lambda: self.add_message_to_chat("System", "Name already taken. Please choose another name."))
-                        self.root.after(0, lambda: self.name_entry.config(state='normal'))
-                        self.root.after(0, lambda: self.register_button.config(state='normal'))
-                        continue
-                        
-                    if message.startswith('CHAT'):
-                        parts = message.split(' ', 2)
-                        if len(parts) >= 3:
-                            player = parts[1][1:-2]  
-                            chat_msg = parts[2]
-                            self.root.after(0, lambda p=player, m=chat_msg: self.add_message_to_chat(
-                                p, m, is_word=False, is_me=(p == self.name)))
-                    
-                    elif message.startswith('INFO') and 'played' in message:
-                        parts = message.split(' ', 3)
-                        if len(parts) >= 4:
-                            player = parts[1]
-                            word = parts[3].split("'")[1]
-                            points = parts[3].split('+')[1].split()[0] if '+' in parts[3] else "0"
-                            self.root.after(0, lambda p=player, w=word, pts=points: self.add_message_to_chat(
-                                p, f"Word : {w} (+{pts} points)", is_word=True, is_me=(p == self.name)))
-                    
-                    elif message.startswith('{'):
-                        try:
-                            json_data = json.loads(message)
-                            cycle = json_data.get("Cycle")
-                            player = json_data.get("player")
-                            word = json_data.get("word")
-                            state = json_data.get("state")
-                            score_change = json_data.get("score_change", 0)
-                            current_score = json_data.get("current_score", 0)
-                            player_timestamp = json_data.get("player_timestamp")
-                            server_timestamp = json_data.get("server_timestamp")
-
-
-                            self.current_cycle = int(cycle)
-                            self.scores[player] = current_score
-                            self.root.after(0, self.update_score_display)
-
-                            if state == "accept":
-                                self.root.after(0, lambda: self.add_message_to_chat("System", f"{player} played '{word}' (+{score_change} points)"))
-                            elif state == "bonus":
-                                self.root.after(0, lambda: self.add_message_to_chat("System", f"{player} played '{word}' (+{score_change} points) [Bonus]"))
-                            elif state == "invalid":
-                                self.root.after(0, lambda: self.add_message_to_chat("System", f"Word '{word}' is not valid"))
-                            elif state == "timeout":
-                                self.root.after(0, lambda: self.add_message_to_chat("System", f"{player} ran out of time ({score_change} points)"))
-
-                            if player == self.name:
-                                self.root.after(0, self.stop_timer)
-                                self.my_turn = False
-                                self.root.after(0, lambda: self.word_entry.config(state='disabled'))
-                                self.log_play(cycle, player, word, player_timestamp, server_timestamp)
-                        except json.JSONDecodeError:
-                            self.root.after(0, lambda: self.add_message_to_chat("System", "Invalid JSON received"))
-                        continue
-
-                    elif "Game starting" in message:
-                        self.root.after(0, lambda: self.add_message_to_chat("System", "Game started! First player's turn."))
-                        self.root.after(0, lambda: self.word_entry.config(state='disabled'))
-                    
-                    elif message.startswith('PROMPT'):
-                        letter = message.split()[1]
-                        self.my_turn = True
-                        self.current_letter = letter
-                        self.root.after(0, lambda: self.word_entry.config(state='normal'))
-                        self.root.after(0, lambda: self.add_message_to_chat("System", f"Your turn! Enter a word starting with '{letter}':"))
-                        self.root.after(0, self.start_timer)
-                    
-                    elif "You are the host" in message or "You are the new host" in message:
-                        self.is_host = True
-                        self.root.after(0, lambda: self.host_label.config(text="(Host)"))
-                        self.root.after(0, lambda: self.start_button.config(state='normal'))
-                        self.root.after(0, lambda: self.add_message_to_chat("System", "You are the host"))
-                        print(f"Client {self.name} recognized as host")  
-                    
-                    elif message.startswith('SCORES'):
-                        score_data = message.split(' ', 1)[1]
-                        self.scores.clear()
-                        for item in score_data.split(','):
-                            player, score = item.split(':')
-                            self.scores[player] = int(score)
-                        self.root.after(0, self.update_score_display)
-                    
-                    elif message.startswith('ENDGAME'):
-                        self.root.after(0, lambda: self.add_message_to_chat("System", "Game Over! Final Scores:"))
-                        scores = message.split(' ', 1)[1].split(',')
-                        for score in scores:
-                            self.root.after(0, lambda s=score: self.add_message_to_chat("System", s))
-                        self.root.after(0, lambda: messagebox.showinfo("Game Over", "Game has ended"))
-                        break
-                    
-                    elif message.startswith('INFO'):
-                        self.root.after(0, lambda: self.add_message_to_chat("System", message[5:]))
-
-            except ConnectionError as e:
-                self.root.after(0, lambda: self.add_message_to_chat("System", f"Error: {e}"))
-                self.root.after(0, lambda: messagebox.showerror("Connection Lost", "Disconnected from server. Please restart the client."))
-                break
-            except Exception as e:
-                self.root.after(0, lambda: self.add_message_to_chat("System", f"Error receiving message: {e}"))
-                continue
+    def add_bot(self):
+        try:
+            self.conn.add_bot()
+        except OSError as e:
+            self.add_message_to_chat("System", f"Error adding bot: {e}")
+
+    def handle_event(self, event):
+        """Apply one server event to the GUI (runs in the Tk main loop)."""
+        if isinstance(event, Chat):
+            self.add_message_to_chat(event.sender, event.text, is_me=(event.sender == self.name))
+
+        elif isinstance(event, Played):
+            if event.state in ("accept", "bonus"):
+                self.used_words.add(event.word.lower())
+            self.add_message_to_chat(event.player, f"Word : {event.word} (+{event.points} points)",
+                                     is_word=True, is_me=(event.player == self.name))
+
+        elif isinstance(event, TurnResult):
+            player, word, score_change = event.player, event.word, event.score_change
+            self.current_cycle = event.cycle
+
+            if event.state in ("accept", "bonus"):
+                self.used_words.add(word.lower())
+            if event.state == "accept":
+                self.add_message_to_chat("System", f"{player} played '{word}' (+{score_change} points)")
+            elif event.state == "bonus":
+                self.add_message_to_chat("System", f"{player} played '{word}' (+{score_change} points) [Bonus]")
+            elif event.state == "invalid":
+                self.add_message_to_chat("System", f"Word '{word}' is not valid")
+            elif event.state == "timeout":
+                self.add_message_to_chat("System", f"{player} ran out of time ({score_change} points)")
 
+            if player == self.name:
+                self.stop_timer()
+                self.my_turn = False
+                self.word_entry.config(state='disabled')
+                self.log_play(event.cycle, player, word, event.player_timestamp, event.server_timestamp)
+
+        elif isinstance(event, GameStarted):
+            self.used_words = set()
+            self.add_message_to_chat("System", "Game started! First player's turn.")
+            self.word_entry.config(state='disabled')
+
+        elif isinstance(event, Prompt):
+            self.my_turn = True
+            self.current_letter = event.letter
+            self.word_entry.config(state='normal')
+            self.add_message_to_chat("System", f"Your turn! Enter a word starting with '{event.letter}':")
+            self.start_timer()
+
+        elif isinstance(event, Host):
+            self.is_host = True
+            self.host_label.config(text="(Host)")
+            self.start_button.config(state='normal')
+            self.add_message_to_chat("System", "You are the host")
+
+        elif isinstance(event, Rooms):
+            lines = [f"{room} ({players}/{max_players} players, {status})"
+                     for room, players, max_players, status in event.rooms]
+            self.add_message_to_chat("System", "Rooms: " + ("; ".join(lines) if lines else "none"))
+
+        elif isinstance(event, Error):
+            self.add_message_to_chat("System", event.text)
+            if self.reconnecting:
+                # the session expired meanwhile: register again
+                self.reconnecting = False
+                self.conn.token = None
+                self.name_entry.config(state='normal')
+                self.register_button.config(state='normal')
+
+        elif isinstance(event, DictionaryVersion):
+            self.dictionary = dictcache.LocalDictionary(event.version)
+            if not self.dictionary.cached():
+                self.add_message_to_chat("System", f"Downloading the dictionary ({event.words} words,"
+                                                   f" {event.size // 1024} kB)...")
+                self.conn.fetch_dictionary()
+
+        elif isinstance(event, DictionaryData):
+            if self.dictionary is not None:
+                try:
+                    dictcache.store(self.dictionary.version, event.data)
+                    self.add_message_to_chat("System", "Dictionary saved; words are checked as you type.")
+                except (OSError, ValueError) as e:
+                    self.add_message_to_chat("System", f"Could not save the dictionary: {e}")
+
+        elif isinstance(event, Session):
+            if self.reconnecting:
+                self.reconnecting = False
+                self.add_message_to_chat("System", "Session resumed.")
+
+        elif isinstance(event, (Scores, ScoreSnapshot, ScoreDelta)):
+            changed = self.scoreboard.apply(event)
+            if changed is None:
+                # missed an update: start over from a snapshot
+                self.conn.request_scores()
+            else:
+                self.score_changes |= changed
+
+        elif isinstance(event, EndGame):
+            self.add_message_to_chat("System", "Game Over! Final Scores:")
+            for player, score in event.scores:
+                self.add_message_to_chat("System", f"{player}: {score}")
+            if self.is_host:
+                self.start_button.config(state='normal')
+            messagebox.showinfo("Game Over", "Game has ended")
+
+        elif isinstance(event, Info):
+            self.add_message_to_chat("System", event.text)
+
+        elif isinstance(event, Disconnected):
+            self.add_message_to_chat("System", f"Error: {event.reason}")
+            if self.conn.token and not self.reconnecting:
+                self.reconnecting = True
+                self.add_message_to_chat("System", "Reconnecting...")
+                threading.Thread(target=self.resume_session, daemon=True).start()
+                return
+            messagebox.showerror("Connection Lost", "Disconnected from server. Please restart the client.")
+            self.conn.close()
+
+    def resume_session(self):
+        """Reconnect and RESUME the session (background thread); a failure ends up as Disconnected."""
+        self.conn.close()
         try:
-            self.client_socket.close()
-        except:
-            pass
+            self.conn.connect()
+            self.conn.start_reader(self.events.put)
+            self.conn.resume()
+        except OSError as e:
+            self.conn.token = None
+            self.events.put(Disconnected(str(e)))
 
     def log_play(self, cycle, player, word, player_timestamp, server_timestamp=None):
         log_data = {
@@ -369,46 +454,58 @@ class GameClient:
         word = self.word_entry.get().strip()
         if not word:
             return
+        if self.dictionary is not None:
+            # the server decides; this only saves the point a sure miss would cost
+            problem = self.dictionary.check(word, self.current_letter, self.used_words)
+            if problem:
+                self.add_message_to_chat("System", f"{problem} Not sent.")
+                return
 
-        # 1. Generate timestamp before sending
-        ts = datetime.datetime.utcnow().isoformat(timespec='milliseconds') + "Z"
-
-        payload = {
-            "Cycle": str(self.current_cycle),
-            "player": self.name,
-            "word": word,
-            "player_timestamp": ts
-        }
         try:
-            # 2. Send JSON with player_timestamp
-            self.client_socket.send((json.dumps(payload) + "\n").encode('utf-8'))
+            # Send JSON with player_timestamp
+            ts = self.conn.send_word(word, self.name, self.current_cycle)
 
-            # 3. Log the timestamp
+            # Log the timestamp
             self.log_play(self.current_cycle, self.name, word, ts)
 
             # disable entry after sending
             self.root.after(0, lambda: self.word_entry.delete(0, tk.END))
+            self.completion_label.config(text="")
             self.my_turn = False
             self.root.after(0, lambda: self.word_entry.config(state='disabled'))
-        except (ConnectionError, BrokenPipeError) as e:
+        except OSError as e:
             self.root.after(0, lambda: self.add_message_to_chat("System", f"Error sending word: {e}"))
             self.root.after(0, lambda: messagebox.showerror("Connection Lost", "Disconnected from server. Please restart the client."))
 
+    def show_completions(self):
+        prefix = self.word_entry.get().strip()
+        words = self.dictionary.completions(prefix, COMPLETIONS * 4) if self.dictionary and prefix else []
+        words = [w for w in words if w not in self.used_words][:COMPLETIONS]
+        self.completion_label.config(text=("Tab: " + ", ".join(words)) if words else "")
+
+    def complete_word(self):
+        prefix = self.word_entry.get().strip()
+        if self.dictionary is not None and self.my_turn:
+            for word in self.dictionary.completions(prefix, COMPLETIONS * 4):
+                if word not in self.used_words:
+                    self.word_entry.delete(0, tk.END)
+                    self.word_entry.insert(0, word)
+                    break
+            self.show_completions()
+        return "break"
+
     def send_chat(self):
         message = self.chat_entry.get().strip()
         if message:
             try:
-                self.client_socket.send(f"CHAT {message}\n".encode('utf-8'))
+                self.conn.chat(message)
                 self.root.after(0, lambda: self.chat_entry.delete(0, tk.END))
-            except (ConnectionError, BrokenPipeError) as e:
+            except OSError as e:
                 self.root.after(0, lambda: self.add_message_to_chat("System", f"Error sending chat: {e}"))
                 self.root.after(0, lambda: messagebox.showerror("Connection Lost", "Disconnected from server. Please restart the client."))
 
     def on_closing(self):
-        try:
-            self.client_socket.close()
-        except:
-            pass
+        self.conn.close()
         self.root.destroy()
 
 def main():
@@ -0,0 +1,134 @@
+"""The server's dictionary for clients, and the clients' cache of it.
+
+The server packs its word list when a client first asks for it: the
+sorted words joined by newlines, zlib-compressed and cut into
+CHUNK-byte DICTDATA frames. The version is the start of the SHA-256 of
+the uncompressed list, so the same word list has the same version on
+every server and after restarts. A download queues the frames' cached
+encodings; nothing is compressed or encoded per client.
+
+A client sends DICT after connecting. If CACHE_DIR already holds that
+version it uses the file; otherwise it sends DICT GET once and stores
+what arrives, after checking it against the version. LocalDictionary
+opens the cached list the first time it is asked something. It flags
+words with the wrong first letter, words played earlier in the game and
+words missing from the dictionary before they are sent, and completes
+prefixes. The server still validates every answer.
+"""
+import hashlib
+import os
+import threading
+import zlib
+
+import wire
+import wordindex
+
+
+CHUNK = 32768           # compressed bytes per DICTDATA frame
+BATCH = 4096            # words hashed and compressed at a time
+VERSION_DIGITS = 16     # hex digits of the SHA-256 kept as the version
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "wordchain")
+
+stats_lock = threading.Lock()
+totals = {"offers": 0, "downloads": 0, "bytes": 0}
+
+def count(key, n=1):
+    with stats_lock:
+        totals[key] += n
+
+def snapshot():
+    """Versions announced, dictionaries sent and their bytes."""
+    with stats_lock:
+        return dict(totals)
+
+def version_of(data):
+    return hashlib.sha256(data).hexdigest()[:VERSION_DIGITS]
+
+# --- server side ---
+
+class Pack:
+    """The compressed word list of a WordIndex or MappedIndex, as frames."""
+
+    def __init__(self, index):
+        # streamed, so the uncompressed list never exists as a whole
+        digest = hashlib.sha256()
+        packer = zlib.compressobj(9)
+        parts = []
+        for start in range(0, len(index), BATCH):
+            words = [index.word(i) for i in range(start, min(start + BATCH, len(index)))]
+            data = (("\n" if start else "") + "\n".join(words)).encode('utf-8')
+            digest.update(data)
+            parts.append(packer.compress(data))
+        parts.append(packer.flush())
+        blob = b"".join(parts)
+        chunks = [blob[i:i + CHUNK] for i in range(0, len(blob), CHUNK)] or [b""]
+        self.version = digest.hexdigest()[:VERSION_DIGITS]
+        self.offer = wire.dictionary(self.version, len(index), len(blob))
+        self.frames = [wire.dictionary_data(i, len(chunks), c) for i, c in enumerate(chunks)]
+        self.encoded = {}       # binary -> all frames as one bytes object
+
+    def data(self, binary):
+        if binary not in self.encoded:
+            self.encoded[binary] = b"".join([f.encode(binary) for f in self.frames])
+        count("downloads")
+        count("bytes", len(self.encoded[binary]))
+        return self.encoded[binary]
+
+# --- client side ---
+
+def cache_path(version, cache_dir=None):
+    return os.path.join(cache_dir or CACHE_DIR, f"{version}.z")
+
+def store(version, blob, cache_dir=None):
+    """Check a downloaded dictionary against `version` and cache it; raises ValueError if it does not match."""
+    try:
+        data = zlib.decompress(blob)
+    except zlib.error as e:
+        raise ValueError(f"corrupt dictionary: {e}") from None
+    if version_of(data) != version:
+        raise ValueError("dictionary does not match its version")
+    path = cache_path(version, cache_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(blob)
+    os.replace(tmp, path)
+    return path
+
+class LocalDictionary:
+    """A cached dictionary version, loaded on first use."""
+
+    def __init__(self, version, cache_dir=None):
+        self.version = version
+        self.path = cache_path(version, cache_dir)
+        self.index = None
+
+    def cached(self):
+        return self.index is not None or os.path.exists(self.path)
+
+    def load(self):
+        """The WordIndex, or None if the cached file is missing or damaged."""
+        if self.index is None:
+            try:
+                with open(self.path, "rb") as f:
+                    words = zlib.decompress(f.read()).decode('utf-8').split("\n")
+            except (OSError, zlib.error, UnicodeDecodeError):
+                return None
+            self.index = wordindex.WordIndex(words)
+        return self.index
+
+    def check(self, word, letter, used=()):
+        """Why the server would reject `word`, or None if it would not (or the dictionary is not cached)."""
+        wl = word.lower()
+        if letter and not wl.startswith(letter.lower()):
+            return f"'{word}' does not start with '{letter}'."
+        if wl in used:
+            return f"'{word}' was already played."
+        index = self.load()
+        if index is not None and wl not in index:
+            return f"'{word}' is not in the dictionary."
+        return None
+
+    def completions(self, prefix, limit=5):
+        index = self.load() if prefix else None
+        return index.completions(prefix.lower(), limit) if index is not None else []
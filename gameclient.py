@@ -0,0 +1,544 @@
+"""Client side of the game protocol, without any GUI.
+
+GameConnection (blocking socket plus a reader thread) and
+AsyncGameConnection (asyncio) own the socket, split the incoming byte
+stream into lines with LineFramer and turn every line into a typed event:
+
+    Prompt(letter)                  your turn; answer with send_word()
+    TurnResult(...)                 the JSON result of your answer
+    Played(player, word, points, state)     someone's answer, sent to the whole room;
+                                    state is None on text without state=True
+    Scores(scores)                  {name: score}
+    ScoreSnapshot(seq, scores)      versioned scoreboard ("+delta"), {name: score}
+    ScoreDelta(seq, changed, removed)   {name: score} that changed, names that left
+    Chat(sender, text)
+    GameStarted(letter)
+    EndGame(scores)                 [(name, score)], winner first
+    Host(new)                       you are the (new) host
+    Rooms(rooms)                    [(name, players, max_players, status)]
+    Session(token)                  resumable session ("+resume")
+    State(room, status, cycle, letter, player)  room snapshot for a spectator
+    DictionaryVersion(version, words, size)     answer to request_dictionary()
+    DictionaryData(data)            the compressed word list, after fetch_dictionary()
+    Info(text), Error(text)         any other INFO / ERROR line
+    Disconnected(reason)            always the last event
+
+Events go to an `on_event` callback (called on the reader thread, or on
+the event loop) or, for AsyncGameConnection, out of `async for`.
+register(name, binary=True) negotiates the binary encoding (wire.py);
+the events are the same either way. register(name, delta=True) asks for
+scoreboard deltas; Scoreboard applies them and notices gaps.
+register(name, resume=True) keeps the session open for a while after the
+connection drops: connect again and call resume() to get what was missed.
+Events seen twice (already received before the drop) are not delivered.
+register(name, ping=True) asks for heartbeats; the connection answers
+them itself, with its clock so the server can measure RTT and clock
+offset, and they are not delivered as events.
+register(name, state=True) gets the turn state of every Played on the
+text encoding too; binary frames always carry it.
+watch(room) instead of register() follows a room's game as a spectator.
+request_dictionary() and fetch_dictionary() get the server's word list
+for dictcache.LocalDictionary; the DICTDATA chunks are put together here.
+"""
+import asyncio
+import base64
+import collections
+import datetime
+import json
+import socket
+import threading
+import time
+
+import wire
+
+
+HOST = 'localhost'
+PORT = 12345
+BUFFER_SIZE = 4096
+MAX_LINE = 64 * 1024
+RETRY_ATTEMPTS = 3
+RETRY_DELAY = 2  # seconds
+
+Prompt = collections.namedtuple("Prompt", "letter")
+TurnResult = collections.namedtuple(
+    "TurnResult", "cycle player word state score_change current_score player_timestamp server_timestamp")
+Played = collections.namedtuple("Played", "player word points state", defaults=(None,))
+Scores = collections.namedtuple("Scores", "scores")
+ScoreSnapshot = collections.namedtuple("ScoreSnapshot", "seq scores")
+ScoreDelta = collections.namedtuple("ScoreDelta", "seq changed removed")
+Chat = collections.namedtuple("Chat", "sender text")
+GameStarted = collections.namedtuple("GameStarted", "letter")
+EndGame = collections.namedtuple("EndGame", "scores")
+Host = collections.namedtuple("Host", "new")
+Rooms = collections.namedtuple("Rooms", "rooms")
+Session = collections.namedtuple("Session", "token")
+Ping = collections.namedtuple("Ping", "n")
+State = collections.namedtuple("State", "room status cycle letter player")
+DictionaryVersion = collections.namedtuple("DictionaryVersion", "version words size")
+DictionaryChunk = collections.namedtuple("DictionaryChunk", "index total data")
+DictionaryData = collections.namedtuple("DictionaryData", "data")
+Info = collections.namedtuple("Info", "text")
+Error = collections.namedtuple("Error", "text")
+Disconnected = collections.namedtuple("Disconnected", "reason")
+
+def parse_scores(text, sep):
+    scores = []
+    for item in text.split(","):
+        name, _, score = item.rpartition(sep)
+        try:
+            scores.append((name.strip(), int(score)))
+        except ValueError:
+            pass
+    return scores
+
+def parse_delta(text):
+    seq, _, rest = text.partition(" ")
+    changed, removed = {}, []
+    for item in filter(None, rest.split(",")):
+        name, _, score = item.rpartition(":")
+        if score:
+            try:
+                changed[name] = int(score)
+            except ValueError:
+                pass
+        else:
+            removed.append(name)
+    return ScoreDelta(int(seq), changed, removed)
+
+EVENTS = {
+    wire.PROMPT: Prompt,
+    wire.SCORES: lambda pairs: Scores(dict(pairs)),
+    wire.RESULT: TurnResult,
+    wire.PLAYED: Played,
+    wire.CHAT: Chat,
+    wire.INFO: Info,
+    wire.ERROR: Error,
+    wire.ENDGAME: EndGame,
+    wire.ROOMS: Rooms,
+    wire.STARTED: GameStarted,
+    wire.HOST: Host,
+    wire.SCORESNAP: lambda seq, pairs: ScoreSnapshot(seq, dict(pairs)),
+    wire.SCOREDELTA: lambda seq, changed, removed: ScoreDelta(seq, dict(changed), removed),
+    wire.SESSION: Session,
+    wire.PING: Ping,
+    wire.STATE: State,
+    wire.DICT: DictionaryVersion,
+    wire.DICTDATA: DictionaryChunk,
+}
+
+def parse_frame(type, payload):
+    """Event for one binary frame."""
+    fields = wire.decode(type, payload)
+    return EVENTS[type](*fields)
+
+def to_event(item):
+    """Event for a LineFramer item: a text line or a (type, payload) frame."""
+    if isinstance(item, str):
+        return parse_line(item)
+    return parse_frame(*item)
+
+def parse_line(line):
+    """Event for one protocol line, or None for a blank line."""
+    line = line.strip()
+    if not line:
+        return None
+    cmd, _, rest = line.partition(" ")
+    if line.startswith("{"):
+        try:
+            msg = json.loads(line)
+            cycle = int(msg.get("Cycle", 0))
+        except (ValueError, TypeError):
+            return Error("Invalid JSON received")
+        return TurnResult(cycle, msg.get("player"), msg.get("word"), msg.get("state"),
+                          msg.get("score_change", 0), msg.get("current_score", 0),
+                          msg.get("player_timestamp"), msg.get("server_timestamp"))
+    if cmd == "PROMPT":
+        return Prompt(rest.strip())
+    if cmd == "SCORES":
+        return Scores(dict(parse_scores(rest, ":")) if rest else {})
+    if cmd == "SCORESNAP":
+        seq, _, pairs = rest.partition(" ")
+        try:
+            return ScoreSnapshot(int(seq), dict(parse_scores(pairs, ":")) if pairs else {})
+        except ValueError:
+            return Error("Invalid scoreboard received")
+    if cmd == "SCOREDELTA":
+        try:
+            return parse_delta(rest)
+        except ValueError:
+            return Error("Invalid scoreboard received")
+    if cmd == "STATE":
+        fields = rest.split(" ", 4)
+        try:
+            room, status, cycle, letter = fields[:4]
+            return State(room, status, int(cycle), "" if letter == "-" else letter,
+                         fields[4] if len(fields) > 4 else "")
+        except ValueError:
+            return Error("Invalid room state received")
+    if cmd == "PING":
+        return Ping(rest.strip())
+    if cmd == "DICT":
+        try:
+            version, words, size = rest.split()
+            return DictionaryVersion(version, int(words), int(size))
+        except ValueError:
+            return Error("Invalid dictionary version received")
+    if cmd == "DICTDATA":
+        try:
+            index, total, chunk = rest.split(" ", 2)
+            return DictionaryChunk(int(index), int(total), base64.b64decode(chunk))
+        except ValueError:
+            return Error("Invalid dictionary data received")
+    if cmd == "SESSION":
+        return Session(rest.strip())
+    if cmd == "ENDGAME":
+        return EndGame(parse_scores(rest, ": "))
+    if cmd == "CHAT":
+        # CHAT [name]: text
+        sender, _, text = rest.partition("]: ")
+        return Chat(sender[1:], text)
+    if cmd == "ROOMS":
+        listing = []
+        for item in filter(None, rest.split(",")):
+            name, count, status = item.split(":")
+            players, _, max_players = count.partition("/")
+            listing.append((name, int(players), int(max_players or 0), status))
+        return Rooms(listing)
+    if cmd == "ERROR:" or cmd == "ERROR":
+        return Error(rest.strip())
+    if cmd == "INFO":
+        if " played '" in rest:
+            # INFO name played 'word' (+points points) [state]
+            player, _, tail = rest.partition(" played '")
+            word, _, points = tail.rpartition("' (+")
+            state = points.rpartition(" [")[2].rstrip("]") if points.endswith("]") else None
+            try:
+                return Played(player, word, int(points.split()[0]), state)
+            except (ValueError, IndexError):
+                pass
+        if rest.startswith("Game starting!"):
+            return GameStarted(rest.rpartition(" ")[2])
+        if rest in ("You are the host.", "You are the new host."):
+            return Host(rest == "You are the new host.")
+        return Info(rest)
+    return Info(line)
+
+class LineFramer:
+    """Splits a byte stream into lines inside one reusable bytearray.
+
+    Data is received straight into space() (recv_into / BufferedProtocol)
+    and committed; lines() returns the complete lines. Consumed bytes are
+    only reclaimed when the free space runs out, by moving the unfinished
+    line to the front, so a burst of lines costs no per-line buffer copies.
+    After the wire.SWITCH line the stream carries binary frames, which
+    lines() returns as (type, payload) tuples.
+    """
+
+    def __init__(self, size=BUFFER_SIZE, max_line=MAX_LINE):
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.start = 0      # first byte of the unfinished line
+        self.scan = 0       # bytes before this offset contain no newline
+        self.end = 0
+        self.max_line = max_line
+        self.binary = False
+
+    def space(self, want=BUFFER_SIZE):
+        """Writable view of at least `want` free bytes."""
+        if self.start == self.end:
+            self.start = self.scan = self.end = 0
+        if len(self.buf) - self.end < want:
+            pending = self.end - self.start
+            if pending + want > len(self.buf):
+                buf = bytearray(max(2 * len(self.buf), pending + want))
+            else:
+                buf = self.buf
+            buf[:pending] = bytes(self.view[self.start:self.end])
+            if buf is not self.buf:
+                self.buf, self.view = buf, memoryview(buf)
+            self.scan -= self.start
+            self.start, self.end = 0, pending
+        return self.view[self.end:]
+
+    def commit(self, n):
+        self.end += n
+
+    def feed(self, data):
+        self.space(len(data))[:len(data)] = data
+        self.commit(len(data))
+
+    def lines(self):
+        out = []
+        while not self.binary:
+            i = self.buf.find(b"\n", self.scan, self.end)
+            if i < 0:
+                self.scan = self.end
+                if self.end - self.start > self.max_line:
+                    raise ValueError(f"line longer than {self.max_line} bytes")
+                return out
+            line = str(self.view[self.start:i], 'utf-8', 'replace').rstrip("\r")
+            self.start = self.scan = i + 1
+            if line == wire.SWITCH:
+                self.binary = True
+            else:
+                out.append(line)
+        header = wire.HEADER.size
+        while self.end - self.start >= header:
+            length, type = wire.HEADER.unpack_from(self.buf, self.start)
+            if self.end - self.start < header + length:
+                break
+            body = self.start + header
+            out.append((type, self.view[body:body + length].tobytes()))
+            self.start = body + length
+        self.scan = self.start
+        return out
+
+class Scoreboard:
+    """Client copy of a room's scoreboard, kept current from score events.
+
+    apply() returns the names whose entry changed (or disappeared), or None
+    when a delta does not follow the last sequence number; the caller then
+    asks for a snapshot with request_scores() and ignores deltas until it
+    arrives.
+    """
+
+    def __init__(self):
+        self.scores = {}
+        self.seq = None
+
+    def apply(self, event):
+        if isinstance(event, ScoreDelta):
+            if self.seq is None:
+                return set()        # waiting for a snapshot
+            if event.seq <= self.seq:
+                return set()        # already included in a snapshot
+            if event.seq != self.seq + 1:
+                self.seq = None
+                return None
+            self.seq = event.seq
+            for name in event.removed:
+                self.scores.pop(name, None)
+            self.scores.update(event.changed)
+            return set(event.changed) | set(event.removed)
+        # Scores or ScoreSnapshot
+        old = self.scores
+        self.scores = dict(event.scores)
+        self.seq = getattr(event, "seq", None)
+        return {n for n in old.keys() | self.scores.keys() if old.get(n) != self.scores.get(n)}
+
+def timestamp():
+    return datetime.datetime.utcnow().isoformat(timespec='milliseconds') + "Z"
+
+class Commands:
+    """Protocol commands; subclasses provide send_line()."""
+
+    token = None            # from the last Session event
+    last_seq = 0            # last room event delivered
+    pending_seq = None      # from a binary SEQ frame, for the frame after it
+    dictionary_parts = ()   # DICTDATA chunks received so far
+
+    def receive(self, item):
+        """Event for a LineFramer item, or None if there is none or it was seen before."""
+        if isinstance(item, str):
+            if item.startswith("@"):
+                seq, _, item = item.partition(" ")
+                self.pending_seq = int(seq[1:]) if seq[1:].isdigit() else None
+        elif item[0] == wire.SEQ:
+            self.pending_seq = wire.decode(*item)[0]
+            return None
+        seq, self.pending_seq = self.pending_seq, None
+        if seq is not None:
+            if seq <= self.last_seq:
+                return None
+            self.last_seq = seq
+        event = to_event(item)
+        if isinstance(event, Ping):
+            self.send_line(f"PONG {event.n} {time.time() * 1000:.0f}")
+            return None
+        if isinstance(event, DictionaryChunk):
+            return self.add_dictionary_chunk(event)
+        if isinstance(event, Session) and event.token != self.token:
+            self.token = event.token
+            self.last_seq = 0
+        return event
+
+    def add_dictionary_chunk(self, chunk):
+        parts = self.dictionary_parts if chunk.index else []
+        if chunk.index != len(parts):
+            self.dictionary_parts = ()
+            return Error("Incomplete dictionary received")
+        parts.append(chunk.data)
+        if chunk.index + 1 < chunk.total:
+            self.dictionary_parts = parts
+            return None
+        self.dictionary_parts = ()
+        return DictionaryData(b"".join(parts))
+
+    def register(self, name, binary=False, delta=False, resume=False, ping=False, state=False):
+        self.send_line(f"REGISTER {name}" + (" +bin" if binary else "") + (" +delta" if delta else "")
+                       + (" +resume" if resume else "") + (" +ping" if ping else "")
+                       + (" +state" if state else ""))
+
+    def watch(self, room, binary=False, delta=False):
+        """Follow a room as a spectator, instead of register()."""
+        self.send_line(f"WATCH {room}" + (" +bin" if binary else "") + (" +delta" if delta else ""))
+
+    def resume(self):
+        """Continue the session on a new connection, instead of register()."""
+        self.send_line(f"RESUME {self.token} {self.last_seq}")
+
+    def request_dictionary(self):
+        """Ask for the dictionary's version (DictionaryVersion)."""
+        self.send_line("DICT")
+
+    def fetch_dictionary(self):
+        """Download the compressed dictionary (DictionaryData)."""
+        self.send_line("DICT GET")
+
+    def request_scores(self):
+        self.send_line("SCORES")
+
+    def start_game(self):
+        self.send_line("START")
+
+    def add_bot(self, level="medium"):
+        self.send_line(f"BOT {level}")
+
+    def chat(self, text):
+        self.send_line(f"CHAT {text}")
+
+    def create_room(self, room):
+        self.send_line(f"CREATE {room}")
+
+    def join_room(self, room):
+        self.send_line(f"JOIN {room}")
+
+    def list_rooms(self):
+        self.send_line("ROOMS")
+
+    def send_word(self, word, player="", cycle=1):
+        """Answer a prompt; returns the player_timestamp that was sent."""
+        ts = timestamp()
+        self.send_line(json.dumps({"Cycle": str(cycle), "player": player, "word": word,
+                                   "player_timestamp": ts}))
+        return ts
+
+class GameConnection(Commands):
+    """Blocking client; events are delivered on a reader thread."""
+
+    def __init__(self, host=HOST, port=PORT):
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.send_lock = threading.Lock()
+
+    def connect(self, attempts=RETRY_ATTEMPTS, delay=RETRY_DELAY, timeout=5, on_retry=None):
+        """Connect, retrying; `on_retry(attempt, error)` is told about failures."""
+        for attempt in range(1, attempts + 1):
+            try:
+                self.sock = socket.create_connection((self.host, self.port), timeout)
+                self.sock.settimeout(None)
+                return
+            except OSError as e:
+                if on_retry:
+                    on_retry(attempt, e)
+                if attempt == attempts:
+                    raise
+                time.sleep(delay)
+
+    def send_line(self, line):
+        with self.send_lock:
+            self.sock.sendall((line + "\n").encode('utf-8'))
+
+    def start_reader(self, on_event):
+        thread = threading.Thread(target=self.read_loop, args=(on_event,), daemon=True)
+        thread.start()
+        return thread
+
+    def read_loop(self, on_event):
+        framer = LineFramer()
+        reason = "Server disconnected"
+        try:
+            while True:
+                n = self.sock.recv_into(framer.space())
+                if not n:
+                    break
+                framer.commit(n)
+                for item in framer.lines():
+                    event = self.receive(item)
+                    if event is not None:
+                        on_event(event)
+        except (OSError, ValueError) as e:
+            reason = str(e)
+        on_event(Disconnected(reason))
+
+    def close(self):
+        try:
+            self.sock.close()
+        except (OSError, AttributeError):
+            pass
+
+class _Protocol(asyncio.BufferedProtocol):
+    def __init__(self, conn):
+        self.conn = conn
+        self.framer = LineFramer()
+
+    def get_buffer(self, sizehint):
+        return self.framer.space()
+
+    def buffer_updated(self, nbytes):
+        self.framer.commit(nbytes)
+        try:
+            lines = self.framer.lines()
+        except ValueError as e:
+            self.conn.lost = str(e)
+            self.conn.transport.abort()
+            return
+        for item in lines:
+            event = self.conn.receive(item)
+            if event is not None:
+                self.conn.deliver(event)
+
+    def connection_lost(self, exc):
+        self.conn.deliver(Disconnected(self.conn.lost or (str(exc) if exc else "Server disconnected")))
+
+class AsyncGameConnection(Commands):
+    """asyncio client: `async for event in conn`, or an on_event callback."""
+
+    def __init__(self, on_event=None):
+        self.on_event = on_event
+        self.events = asyncio.Queue()
+        self.transport = None
+        self.lost = None
+        self.done = False
+
+    @classmethod
+    async def open(cls, host=HOST, port=PORT, on_event=None):
+        conn = cls(on_event)
+        conn.transport, _ = await asyncio.get_running_loop().create_connection(
+            lambda: _Protocol(conn), host, port)
+        return conn
+
+    def deliver(self, event):
+        if self.on_event is not None:
+            self.on_event(event)
+        else:
+            self.events.put_nowait(event)
+
+    def send_line(self, line):
+        self.transport.write((line + "\n").encode('utf-8'))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.done:
+            raise StopAsyncIteration
+        event = await self.events.get()
+        if isinstance(event, Disconnected):
+            self.done = True
+        return event
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
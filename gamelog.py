@@ -0,0 +1,148 @@
+"""Background writer for the JSON-lines game log.
+
+log_play_state only enqueues the entry; a writer thread serializes
+entries in batches and writes each batch with one write call, flushing
+when FLUSH_ENTRIES are buffered or FLUSH_INTERVAL has passed. Files are
+rotated by size and/or by UTC date to game_log.<timestamp>.json next to
+the live file.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+
+QUEUE_SIZE = 10000          # entries waiting for the writer; more are dropped
+FLUSH_ENTRIES = 256
+FLUSH_INTERVAL = 1.0        # seconds
+FSYNC = False
+ROTATE_BYTES = 64 * 1024 * 1024     # 0 disables size rotation
+ROTATE_DAILY = False
+
+_STOP = object()
+
+class LogWriter:
+    def __init__(self, path, fsync=None, rotate_bytes=None, rotate_daily=None):
+        self.path = path
+        self.fsync = FSYNC if fsync is None else fsync
+        self.rotate_bytes = ROTATE_BYTES if rotate_bytes is None else rotate_bytes
+        self.rotate_daily = ROTATE_DAILY if rotate_daily is None else rotate_daily
+        self.q = queue.Queue(QUEUE_SIZE)
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.rotations = 0
+        self.batch_since = None     # enqueue time of the oldest buffered entry
+        self.file = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, entry):
+        """Queue one log entry (a dict); never blocks."""
+        try:
+            self.q.put_nowait((time.time(), entry))
+        except queue.Full:
+            self.dropped += 1
+
+    def lag(self):
+        """Seconds the oldest not yet written entry has been waiting."""
+        oldest = self.batch_since
+        with self.q.mutex:
+            if self.q.queue and self.q.queue[0] is not _STOP:
+                head = self.q.queue[0][0]
+                oldest = head if oldest is None else min(oldest, head)
+        return time.time() - oldest if oldest is not None else 0.0
+
+    def stats(self):
+        return {
+            "queued": self.q.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "rotations": self.rotations,
+            "lag_seconds": round(self.lag(), 3),
+        }
+
+    def close(self, timeout=5.0):
+        """Write out everything queued so far and stop the writer."""
+        if self.thread.is_alive():
+            self.q.put(_STOP)
+            self.thread.join(timeout)
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.opened_day = datetime.now(timezone.utc).date()
+
+    def _rotate_due(self):
+        if self.rotate_bytes and self.file.tell() >= self.rotate_bytes:
+            return True
+        return self.rotate_daily and datetime.now(timezone.utc).date() != self.opened_day
+
+    def _rotate(self):
+        self.file.close()
+        base, ext = os.path.splitext(self.path)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        target = f"{base}.{stamp}{ext}"
+        n = 1
+        while os.path.exists(target):
+            target = f"{base}.{stamp}-{n}{ext}"
+            n += 1
+        os.replace(self.path, target)
+        self.rotations += 1
+        self._open()
+
+    def _flush(self, lines):
+        if self.file is None:
+            self._open()
+        self.file.write("".join(lines))
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.written += len(lines)
+        self.flushes += 1
+        if self._rotate_due():
+            self._rotate()
+
+    def run(self):
+        lines = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                item = self.q.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                t, entry = item
+                if not lines:
+                    self.batch_since = t
+                    deadline = time.time() + FLUSH_INTERVAL
+                lines.append(json.dumps(entry) + "\n")
+            if lines and (len(lines) >= FLUSH_ENTRIES or time.time() >= deadline):
+                try:
+                    self._flush(lines)
+                except OSError as e:
+                    print(f"Game log write failed: {e}")
+                    self.dropped += len(lines)
+                lines = []
+                deadline = self.batch_since = None
+
+        # drain on shutdown
+        while True:
+            try:
+                item = self.q.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                lines.append(json.dumps(item[1]) + "\n")
+        if lines:
+            try:
+                self._flush(lines)
+            except OSError as e:
+                print(f"Game log write failed: {e}")
+        if self.file is not None:
+            self.file.close()
@@ -0,0 +1,106 @@
+"""Per-connection line framing for client input.
+
+A LineReader collects received bytes and returns only complete lines,
+so a line split across recv calls (or a multibyte character cut at the
+boundary) is reassembled before it is decoded. Lines longer than
+MAX_LINE are discarded up to their newline instead of being buffered,
+and lines that are not valid UTF-8 are rejected; each rejection is
+reported to the client, and a connection that keeps sending malformed
+input is dropped after MALFORMED_LIMIT of them.
+"""
+import threading
+import weakref
+
+
+RECV_SIZE = 4096
+MAX_LINE = 4096             # bytes, without the newline
+MALFORMED_LIMIT = 20        # rejected lines before the connection is dropped
+
+stats_lock = threading.Lock()
+totals = {"bytes_read": 0, "lines": 0, "oversized": 0, "bad_utf8": 0}
+live = weakref.WeakSet()
+
+def count(key, n=1):
+    with stats_lock:
+        totals[key] += n
+
+def snapshot():
+    """Input counters over all connections, plus the open ones."""
+    readers = list(live)
+    with stats_lock:
+        result = dict(totals)
+    result.update({
+        "connections": len(readers),
+        "max_bytes_read": max((r.bytes_read for r in readers), default=0),
+    })
+    return result
+
+class LineReader:
+    def __init__(self, on_error=None, max_line=None):
+        self.on_error = on_error        # called with a message for each rejected line
+        self.max_line = max_line or MAX_LINE
+        self.buf = bytearray()
+        self.scan = 0                   # no newline before this offset
+        self.skipping = False           # inside an oversized line
+        self.bytes_read = 0
+        self.lines = 0
+        self.malformed = 0
+        live.add(self)
+
+    def feed(self, data):
+        """Add received bytes; returns the complete lines as strings."""
+        self.bytes_read += len(data)
+        count("bytes_read", len(data))
+        self.buf += data
+        out = []
+        start = 0
+        while True:
+            i = self.buf.find(b"\n", self.scan)
+            if i < 0:
+                break
+            raw = bytes(self.buf[start:i])
+            start = self.scan = i + 1
+            if self.skipping:
+                # rest of a line that was already rejected
+                self.skipping = False
+                continue
+            if len(raw) > self.max_line:
+                self.reject("oversized", f"Line longer than {self.max_line} bytes ignored.")
+                continue
+            try:
+                line = raw.decode('utf-8')
+            except UnicodeDecodeError:
+                self.reject("bad_utf8", "Line is not valid UTF-8.")
+                continue
+            out.append(line.rstrip("\r"))
+        del self.buf[:start]
+        self.scan -= start
+        if len(self.buf) > self.max_line:
+            # no newline in sight: drop what we have and skip to the next one
+            if not self.skipping:
+                self.skipping = True
+                self.reject("oversized", f"Line longer than {self.max_line} bytes ignored.")
+            self.buf.clear()
+            self.scan = 0
+        self.lines += len(out)
+        count("lines", len(out))
+        return out
+
+    def remainder(self):
+        """The unfinished line, to hand to another reader; None while skipping an oversized one."""
+        return None if self.skipping else bytes(self.buf)
+
+    def prime(self, remainder):
+        """Continue from another reader's remainder() (a connection that moved)."""
+        if remainder is None:
+            self.skipping = True
+        else:
+            self.buf += remainder
+
+    def reject(self, kind, message):
+        self.malformed += 1
+        count(kind)
+        if self.on_error is not None:
+            self.on_error(message)
+        if self.malformed >= MALFORMED_LIMIT:
+            raise ValueError("too many malformed lines")
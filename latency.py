@@ -0,0 +1,78 @@
+"""Round-trip time and clock offset per connection, from PING/PONG.
+
+The server notes when it sends PING <n> to a "+ping" client, which
+answers PONG <n> <its wall clock in ms>. Each answer to the newest PING
+gives an RTT sample (monotonic receive - send) and, when the clock is
+there, a clock offset sample: the client's clock minus the server's at
+the moment the client answered, taken to be halfway through the round
+trip. Both are smoothed with TCP's RTT gains (RFC 6298).
+
+The server credits a player's smoothed RTT, up to MAX_CREDIT, against
+the time from PROMPT to answer, so BONUS_TIME counts from when the
+prompt reached the player to when the answer left. The credit is capped
+because a client decides when it answers a PING.
+"""
+import threading
+import time
+
+
+ALPHA = 1 / 8       # gain of the smoothed RTT and offset
+BETA = 1 / 4        # gain of the RTT variation
+MAX_CREDIT = 1.0    # seconds of RTT at most credited to an answer (0: none)
+
+stats_lock = threading.Lock()
+totals = {"samples": 0, "stale": 0}
+
+def count(key):
+    with stats_lock:
+        totals[key] += 1
+
+def snapshot():
+    """RTT samples taken, and PONGs that did not answer the newest PING."""
+    with stats_lock:
+        return dict(totals)
+
+class Estimator:
+    def __init__(self):
+        self.probe = None       # (n, time.monotonic(), wall clock ms) of the PING awaiting its PONG
+        self.rtt = None         # smoothed RTT in seconds, None before the first sample
+        self.rttvar = 0.0
+        self.offset = None      # smoothed client clock - server clock in ms
+
+    def sent(self, n):
+        self.probe = (n, time.monotonic(), time.time() * 1000)
+
+    def answered(self, arg):
+        """Take a PONG's "<n> [client ms]"; returns the RTT sample, or None if it is not one."""
+        now = time.monotonic()
+        fields = arg.split()
+        probe = self.probe
+        if not fields or probe is None or fields[0] != str(probe[0]):
+            count("stale")
+            return None
+        self.probe = None
+        _, sent, wall = probe
+        sample = now - sent
+        if self.rtt is None:
+            self.rtt, self.rttvar = sample, sample / 2
+        else:
+            self.rttvar += BETA * (abs(self.rtt - sample) - self.rttvar)
+            self.rtt += ALPHA * (sample - self.rtt)
+        try:
+            clock = float(fields[1])
+        except (IndexError, ValueError):
+            clock = None
+        if clock is not None:
+            offset = clock - (wall + sample * 500)
+            self.offset = offset if self.offset is None else self.offset + ALPHA * (offset - self.offset)
+        count("samples")
+        return sample
+
+    def credit(self):
+        """Seconds to take off a response time for the network."""
+        return min(self.rtt or 0.0, MAX_CREDIT)
+
+    def fields(self):
+        """rtt_ms and clock_offset_ms for a log entry (None before the first PONG)."""
+        return {"rtt_ms": None if self.rtt is None else round(self.rtt * 1000, 1),
+                "clock_offset_ms": None if self.offset is None else round(self.offset, 1)}
@@ -0,0 +1,270 @@
+"""Headless load generator: bot players in many concurrent rooms.
+
+Each game is a room "load-<n>" with --players bots. The first bot
+creates the room and starts the game once everyone joined; every bot
+answers its PROMPT with an unused dictionary word after a think time,
+sometimes with an invalid word (--invalid-rate) and sometimes not at all
+(--timeout-rate). Finished games are restarted.
+
+The run goes through steps of --games (e.g. 10,20,50,100); games are
+added at each step and kept running, and each step is measured for
+--duration seconds:
+  * rtt: time from sending a word to receiving the JSON turn result;
+  * skew: spread of the arrival times of one "played" broadcast across
+    the players of a room;
+  * turns, timeouts, errors and dropped connections;
+  * with --spectators, lag: how long after the first player a spectator
+    receives a "played" broadcast.
+The first step whose rtt p95 exceeds --p95-limit-ms (or that loses
+connections) marks the limit; max_games is the last step below it.
+
+Usage: python3 loadtest.py --games 10,50,100 --duration 20 [--json]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from bench_engines import load_words
+from gameclient import (AsyncGameConnection, EndGame, Error, GameStarted, Host, Info, Played,
+                        Prompt, TurnResult)
+
+
+INVALID_WORD = "qqxzv"
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    pick = lambda q: round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 3)
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+            "max": round(samples[-1] * 1000, 3)}
+
+class Metrics:
+    """Samples for the current step."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.rtt = []
+        self.skew = []
+        self.lag = []
+        self.counts = {"turns": 0, "invalid": 0, "timeouts": 0, "errors": 0, "disconnects": 0, "watched": 0}
+
+class Game:
+    """Shared state of the bots playing in one room."""
+
+    def __init__(self, n, players):
+        self.room = f"load-{n}"
+        self.players = players
+        self.host_ready = asyncio.Event()
+        self.used = set()
+        self.arrivals = {}      # (game, play) -> arrival times of that broadcast
+        self.first = {}         # (player, word) -> first arrival of that broadcast, for spectators
+
+    def arrived(self, key, metrics):
+        times = self.arrivals.setdefault(key, [])
+        times.append(time.perf_counter())
+        if len(times) == 1:
+            self.first[key[2:]] = times[0]
+        if len(times) == self.players:
+            del self.arrivals[key]
+            metrics.skew.append(max(times) - min(times))
+
+class Bot:
+    def __init__(self, game, index, args, words, metrics, stop):
+        self.game = game
+        self.name = f"{game.room}-{index}"
+        self.is_host = index == 0
+        self.args = args
+        self.words = words
+        self.metrics = metrics
+        self.stop = stop
+        self.sent = None
+        self.game_no = 0
+        self.plays = 0
+        self.joined = 0
+
+    async def run(self):
+        try:
+            self.conn = await AsyncGameConnection.open(self.args.host, self.args.port)
+        except OSError:
+            self.metrics.counts["disconnects"] += 1
+            return
+        try:
+            if self.is_host:
+                self.conn.create_room(self.game.room)
+            else:
+                await self.game.host_ready.wait()
+                self.conn.join_room(self.game.room)
+            # +state: text Played lines say whether the word was accepted
+            self.conn.register(self.name, self.args.binary, state=True)
+            async for event in self.conn:
+                await self.on_event(event)
+            if not self.stop.is_set():
+                self.metrics.counts["disconnects"] += 1
+        finally:
+            self.conn.close()
+
+    async def on_event(self, event):
+        if isinstance(event, Prompt):
+            asyncio.get_running_loop().create_task(self.answer(event.letter))
+        elif isinstance(event, TurnResult):
+            if self.sent is not None:
+                self.metrics.rtt.append(time.perf_counter() - self.sent)
+                self.sent = None
+            self.metrics.counts["turns"] += 1
+            if event.state == "timeout":
+                self.metrics.counts["timeouts"] += 1
+        elif isinstance(event, GameStarted):
+            self.game_no += 1
+            self.plays = 0
+            if self.is_host:
+                self.game.used.clear()
+                self.game.first.clear()
+        elif isinstance(event, Played):
+            self.plays += 1
+            if event.state in ("accept", "bonus"):
+                self.game.used.add(event.word.lower())
+            self.game.arrived((self.game_no, self.plays, event.player, event.word), self.metrics)
+        elif isinstance(event, Host):
+            self.game.host_ready.set()
+        elif self.is_host and isinstance(event, Info) and event.text.startswith("Player ") \
+                and event.text.endswith(" joined"):
+            self.joined += 1
+            if self.joined == self.game.players:
+                self.conn.start_game()
+        elif isinstance(event, EndGame) and self.is_host:
+            await asyncio.sleep(0.1)
+            self.conn.start_game()
+        elif isinstance(event, Error):
+            self.metrics.counts["errors"] += 1
+
+    async def answer(self, letter):
+        if random.random() < self.args.timeout_rate:
+            return
+        await asyncio.sleep(self.args.think / 1000 * random.uniform(0.5, 1.5))
+        if random.random() < self.args.invalid_rate:
+            word = letter + INVALID_WORD
+            self.metrics.counts["invalid"] += 1
+        else:
+            choices = self.words.get(letter, ())
+            word = next((w for w in random.sample(choices, min(len(choices), 20))
+                         if w not in self.game.used), letter + INVALID_WORD)
+        self.sent = time.perf_counter()
+        self.conn.send_word(word, self.name)
+
+class Spectator:
+    def __init__(self, game, args, metrics, stop):
+        self.game = game
+        self.args = args
+        self.metrics = metrics
+        self.stop = stop
+
+    async def run(self):
+        try:
+            conn = await AsyncGameConnection.open(self.args.host, self.args.port)
+        except OSError:
+            self.metrics.counts["disconnects"] += 1
+            return
+        try:
+            await self.game.host_ready.wait()
+            conn.watch(self.game.room, self.args.binary)
+            async for event in conn:
+                if isinstance(event, Played):
+                    first = self.game.first.get((event.player, event.word))
+                    if first is not None:
+                        self.metrics.lag.append(time.perf_counter() - first)
+                    self.metrics.counts["watched"] += 1
+                elif isinstance(event, Error):
+                    self.metrics.counts["errors"] += 1
+            if not self.stop.is_set():
+                self.metrics.counts["disconnects"] += 1
+        finally:
+            conn.close()
+
+async def run(args, words):
+    metrics = Metrics()
+    stop = asyncio.Event()
+    tasks = []
+    games = 0
+    results = []
+    for target in args.games:
+        while games < target:
+            game = Game(games, args.players)
+            for i in range(args.players):
+                tasks.append(asyncio.get_running_loop().create_task(
+                    Bot(game, i, args, words, metrics, stop).run()))
+            for _ in range(args.spectators):
+                tasks.append(asyncio.get_running_loop().create_task(
+                    Spectator(game, args, metrics, stop).run()))
+            games += 1
+            # pace connection setup so registration is not part of the measurement
+            await asyncio.sleep(0.002)
+        await asyncio.sleep(args.warmup)
+        metrics.reset()
+        t0 = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        elapsed = time.perf_counter() - t0
+        step = {"games": games, "connections": games * (args.players + args.spectators),
+                "turns_per_s": round(metrics.counts["turns"] / elapsed, 1)}
+        step.update(metrics.counts)
+        step.update({f"rtt_{k}_ms": v for k, v in percentiles(metrics.rtt).items()})
+        step.update({f"skew_{k}_ms": v for k, v in percentiles(metrics.skew).items()})
+        if args.spectators:
+            step.update({f"lag_{k}_ms": v for k, v in percentiles(metrics.lag).items()})
+        step["degraded"] = (step["disconnects"] > 0 or step["rtt_p95_ms"] is None
+                            or step["rtt_p95_ms"] > args.p95_limit_ms)
+        results.append(step)
+        if not args.json:
+            print_step(step)
+        if step["degraded"]:
+            break
+    stop.set()
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    ok = [s["games"] for s in results if not s["degraded"]]
+    return {
+        "settings": {k: v for k, v in vars(args).items() if k != "json"},
+        "steps": results,
+        "max_games": max(ok, default=0),
+        "max_connections": max(ok, default=0) * (args.players + args.spectators),
+    }
+
+def print_step(step):
+    print(f"{step['games']:>6} games {step['connections']:>6} conns  {step['turns_per_s']:>8} turns/s"
+          f"  rtt p50/p95/p99 {step['rtt_p50_ms']}/{step['rtt_p95_ms']}/{step['rtt_p99_ms']} ms"
+          f"  skew p95 {step['skew_p95_ms']} ms"
+          + (f"  lag p95 {step['lag_p95_ms']} ms" if "lag_p95_ms" in step else "")
+          + f"  errors {step['errors']} dropped {step['disconnects']}"
+          + ("  DEGRADED" if step["degraded"] else ""))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=12345)
+    parser.add_argument("--games", type=lambda s: sorted(int(n) for n in s.split(",")), default=[10],
+                        help="comma separated game counts to step through")
+    parser.add_argument("--players", type=int, default=2, help="bots per game")
+    parser.add_argument("--spectators", type=int, default=0, help="spectators per game")
+    parser.add_argument("--think", type=float, default=200, help="mean think time in ms")
+    parser.add_argument("--invalid-rate", type=float, default=0.05)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--duration", type=float, default=10, help="seconds measured per step")
+    parser.add_argument("--warmup", type=float, default=2, help="seconds before measuring a step")
+    parser.add_argument("--p95-limit-ms", type=float, default=100)
+    parser.add_argument("--binary", action="store_true", help="negotiate the binary protocol")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args, load_words()))
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"max games below the limit: {result['max_games']} ({result['max_connections']} connections)")
+
+if __name__ == "__main__":
+    main()
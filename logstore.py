@@ -0,0 +1,396 @@
+"""Columnar store for closed game log segments, and queries over it.
+
+    python3 logstore.py compact [SEGMENT ...] [--remove]
+    python3 logstore.py moves [--player NAME] [--game ID] [--room ROOM] [--state STATE]
+                              [--limit N] [--store FILE ...] [--json]
+    python3 logstore.py games [--longest N] [--by turns|duration] [--player NAME]
+                              [--store FILE ...] [--json]
+
+`compact` turns each closed segment of the JSON-lines log (the files
+gamelog.py rotates out, game_log.<stamp>.json, and those of the prefork
+workers) into game_log.<stamp>.col next to it. The live files are never
+touched. Each log field becomes an array column; player names, words,
+rooms and game ids become codes into sorted string tables. Two indexes
+list the rows of each player and of each game, and three per-game
+columns hold the first and last timestamps and the number of turns.
+
+Queries mmap the .col files and view the columns they need in place, so
+"all moves by X" reads X's index entries and the columns of those rows
+only, and "the longest games" reads the per-game columns only.
+
+Entries written before log entries carried a "game" id are grouped per
+room; a game ends where the cycle number drops.
+
+Layout, in the byte order of the machine that built it (little-endian
+hosts only): magic "WCOL0001", directory length, row count, the
+directory (JSON: name -> [typecode, byte offset, items]), then the
+sections, each 8-byte aligned.
+"""
+import argparse
+import array
+import glob
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+
+import analytics
+
+
+MAGIC = b"WCOL0001"
+HEADER = struct.Struct("<8sII")
+ALIGN = 8
+SEGMENT_PATTERN = "game_log*.json"
+STORE_PATTERN = "game_log*.col"
+ROTATED = re.compile(r"\.\d{8}-\d{6}(-\d+)?\.json$")     # gamelog.LogWriter._rotate names
+NO_GAP = -2 ** 31       # gap of an entry without player_timestamp
+
+# row columns: name -> typecode
+COLUMNS = {
+    "ts": "q",          # server_timestamp, ms since the epoch
+    "gap": "i",         # server_timestamp - player_timestamp in ms, or NO_GAP
+    "cycle": "I",
+    "state": "B",       # analytics.STATE_CODES
+    "points": "i",      # score_change
+    "score": "i",       # current_score
+    "rtt": "f",         # rtt_ms, NaN when not measured
+    "offset": "f",      # clock_offset_ms, NaN when not measured
+    "player": "I",      # codes into the string tables
+    "word": "I",
+    "room": "I",
+    "game": "I",
+}
+TABLES = ("player", "word", "room", "game")
+INDEXES = ("player", "game")
+
+def is_segment(path):
+    """True for a rotated, no longer written log file."""
+    return bool(ROTATED.search(path))
+
+def store_path(segment):
+    return os.path.splitext(segment)[0] + ".col"
+
+def read_segment(path):
+    """Columns (lists, strings not yet encoded) of a log segment, and the lines skipped."""
+    cols = {name: [] for name in COLUMNS}
+    skipped = 0
+    games = {}      # room -> [cycle, number] for entries without a game id
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                state = analytics.STATE_CODES[entry["state"]]
+                cycle = int(entry["Cycle"])
+                points = int(entry["score_change"])
+                score = int(entry["current_score"])
+            except (ValueError, TypeError, KeyError):
+                skipped += 1
+                continue
+            ts = analytics.parse_ms(analytics.timestamp(entry.get("server_timestamp")))
+            if ts is None:
+                skipped += 1
+                continue
+            sent = analytics.parse_ms(analytics.timestamp(entry.get("player_timestamp")))
+            room = str(entry.get("room") or "")
+            game = entry.get("game")
+            if game is None:
+                last = games.setdefault(room, [cycle, 1])
+                if cycle < last[0]:
+                    last[1] += 1
+                last[0] = cycle
+                game = f"{room}#{last[1]}@{os.path.basename(path)}"
+            cols["ts"].append(ts)
+            cols["gap"].append(NO_GAP if sent is None else max(NO_GAP + 1, min(2 ** 31 - 1, ts - sent)))
+            cols["cycle"].append(cycle)
+            cols["state"].append(state)
+            cols["points"].append(points)
+            cols["score"].append(score)
+            cols["rtt"].append(number(entry.get("rtt_ms")))
+            cols["offset"].append(number(entry.get("clock_offset_ms")))
+            cols["player"].append(str(entry.get("player")))
+            cols["word"].append(str(entry.get("word") or ""))
+            cols["room"].append(room)
+            cols["game"].append(str(game))
+    return cols, skipped
+
+def number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def group_rows(codes, size):
+    """(rows ordered by code, start offset per code + end) for an index."""
+    starts = [0] * (size + 1)
+    for c in codes:
+        starts[c + 1] += 1
+    for i in range(size):
+        starts[i + 1] += starts[i]
+    rows = sorted(range(len(codes)), key=codes.__getitem__)
+    return array.array("I", rows), array.array("I", starts)
+
+def compact(src, dst):
+    """Write the columnar form of log segment `src` to `dst`; returns (rows, lines skipped)."""
+    cols, skipped = read_segment(src)
+    n = len(cols["ts"])
+    sections = {}
+    for name in TABLES:
+        strings = sorted(set(cols[name]))
+        codes = {s: i for i, s in enumerate(strings)}
+        cols[name] = [codes[s] for s in cols[name]]
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = [0]
+        for s in encoded:
+            offsets.append(offsets[-1] + len(s))
+        sections[f"{name}.offsets"] = array.array("I", offsets)
+        sections[f"{name}.blob"] = array.array("B", b"".join(encoded))
+    for name, typecode in COLUMNS.items():
+        sections[name] = array.array(typecode, cols[name])
+    for name in INDEXES:
+        size = len(sections[f"{name}.offsets"]) - 1
+        sections[f"{name}.rows"], sections[f"{name}.starts"] = group_rows(cols[name], size)
+    # per game: first and last timestamp, turns
+    rows, starts = sections["game.rows"], sections["game.starts"]
+    ts = sections["ts"]
+    first, last = array.array("q"), array.array("q")
+    for g in range(len(starts) - 1):
+        # rows of a game are in log order
+        first.append(ts[rows[starts[g]]])
+        last.append(ts[rows[starts[g + 1] - 1]])
+    sections["game.first"], sections["game.last"] = first, last
+    sections["game.turns"] = array.array("I", (starts[g + 1] - starts[g] for g in range(len(starts) - 1)))
+
+    directory = {}
+    pos = 0
+    for name, data in sections.items():
+        directory[name] = [data.typecode, pos, len(data)]
+        pos += -(-len(data) * data.itemsize // ALIGN) * ALIGN
+    head = json.dumps(directory).encode()
+    head += b" " * (-(HEADER.size + len(head)) % ALIGN)
+    tmp = dst + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(head), n))
+        f.write(head)
+        for data in sections.values():
+            raw = data.tobytes()
+            f.write(raw + b"\0" * (-len(raw) % ALIGN))
+    os.replace(tmp, dst)
+    return n, skipped
+
+class Store:
+    """Read-only view of a .col file; columns are memoryviews into the mapping."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, size, self.rows = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a log store")
+        self.base = HEADER.size + size
+        self.directory = json.loads(self.mm[HEADER.size:self.base])
+        self.views = {}
+
+    def column(self, name):
+        view = self.views.get(name)
+        if view is None:
+            typecode, offset, items = self.directory[name]
+            start = self.base + offset
+            end = start + items * array.array(typecode).itemsize
+            view = self.views[name] = memoryview(self.mm)[start:end].cast(typecode)
+        return view
+
+    def string(self, table, code):
+        offsets = self.column(f"{table}.offsets")
+        return bytes(self.column(f"{table}.blob")[offsets[code]:offsets[code + 1]]).decode("utf-8")
+
+    def code(self, table, text):
+        """Code of `text` in a sorted string table, or None."""
+        offsets = self.column(f"{table}.offsets")
+        blob = self.column(f"{table}.blob")
+        key = text.encode("utf-8")
+        low, high = 0, len(offsets) - 1
+        while low < high:
+            mid = (low + high) // 2
+            if bytes(blob[offsets[mid]:offsets[mid + 1]]) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < len(offsets) - 1 and bytes(blob[offsets[low]:offsets[low + 1]]) == key:
+            return low
+        return None
+
+    def indexed(self, index, code):
+        """Rows of one player or game, in log order."""
+        starts = self.column(f"{index}.starts")
+        return self.column(f"{index}.rows")[starts[code]:starts[code + 1]]
+
+    def find(self, player=None, game=None, room=None, state=None):
+        """Rows matching every given filter, in log order."""
+        codes = {}
+        for table, text in (("player", player), ("game", game), ("room", room)):
+            if text is not None:
+                codes[table] = self.code(table, text)
+                if codes[table] is None:
+                    return []
+        if state is not None:
+            codes["state"] = analytics.STATE_CODES[state]
+        # start from the smaller index, then check the other filters on those rows only
+        picks = [(len(self.indexed(t, codes[t])), t) for t in INDEXES if t in codes]
+        if picks:
+            used = min(picks)[1]
+            rows = self.indexed(used, codes.pop(used))
+        else:
+            rows = range(self.rows)
+        for name, code in codes.items():
+            col = self.column(name)
+            rows = [r for r in rows if col[r] == code]
+        return list(rows)
+
+    def entry(self, row):
+        """A log entry as gamelog wrote it, with the cycle as a number."""
+        gap = self.column("gap")[row]
+        ts = self.column("ts")[row]
+        return {
+            "Cycle": self.column("cycle")[row],
+            "room": self.string("room", self.column("room")[row]),
+            "game": self.string("game", self.column("game")[row]),
+            "player": self.string("player", self.column("player")[row]),
+            "word": self.string("word", self.column("word")[row]),
+            "player_timestamp": None if gap == NO_GAP else format_ms(ts - gap),
+            "server_timestamp": format_ms(ts),
+            "state": analytics.STATES[self.column("state")[row]],
+            "score_change": self.column("points")[row],
+            "current_score": self.column("score")[row],
+            "rtt_ms": self.optional("rtt", row),
+            "clock_offset_ms": self.optional("offset", row),
+        }
+
+    def optional(self, name, row):
+        # stores compacted before the column existed lack it
+        if name not in self.directory:
+            return None
+        value = self.column(name)[row]
+        return None if math.isnan(value) else round(value, 1)
+
+    def games(self, player=None):
+        """{game id: [room, first ms, last ms, turns]} of all games, or of those `player` played in."""
+        first, last = self.column("game.first"), self.column("game.last")
+        turns = self.column("game.turns")
+        if player is None:
+            codes = range(len(turns))
+        else:
+            code = self.code("player", player)
+            if code is None:
+                return {}
+            game = self.column("game")
+            codes = sorted({game[r] for r in self.indexed("player", code)})
+        room, rows = self.column("room"), self.column("game.rows")
+        starts = self.column("game.starts")
+        return {self.string("game", g): [self.string("room", room[rows[starts[g]]]),
+                                         first[g], last[g], turns[g]] for g in codes}
+
+def format_ms(ms):
+    return (analytics.EPOCH + ms * analytics.MS).isoformat(timespec="milliseconds") + "Z"
+
+def open_stores(patterns):
+    paths = []
+    for pattern in patterns or [STORE_PATTERN]:
+        paths.extend(sorted(glob.glob(pattern)) or ([pattern] if patterns else []))
+    if not paths:
+        sys.exit(f"No log stores match {STORE_PATTERN}; run `logstore.py compact` first.")
+    try:
+        return [Store(p) for p in paths]
+    except (OSError, ValueError) as e:
+        sys.exit(f"Cannot open log store: {e}")
+
+def cmd_compact(args):
+    paths = []
+    for pattern in args.segments or [SEGMENT_PATTERN]:
+        paths.extend(sorted(glob.glob(pattern)) or ([pattern] if args.segments else []))
+    segments = [p for p in paths if is_segment(p)]
+    if args.segments and len(segments) < len(paths):
+        print(f"Skipping {len(paths) - len(segments)} file(s) still being written.")
+    if not segments:
+        print(f"No closed log segments match {SEGMENT_PATTERN}.")
+    for src in segments:
+        dst = store_path(src)
+        if os.path.exists(dst) and os.path.getmtime(dst) >= os.path.getmtime(src):
+            continue
+        try:
+            rows, skipped = compact(src, dst)
+        except OSError as e:
+            sys.exit(f"Cannot compact {src}: {e}")
+        print(f"{src} -> {dst}: {rows} rows, {skipped} lines skipped,"
+              f" {os.path.getsize(src)} -> {os.path.getsize(dst)} bytes.")
+        if args.remove:
+            os.remove(src)
+
+def cmd_moves(args):
+    shown = 0
+    for store in open_stores(args.store):
+        for row in store.find(args.player, args.game, args.room, args.state):
+            if args.limit and shown >= args.limit:
+                return
+            e = store.entry(row)
+            if args.json:
+                print(json.dumps(e))
+            else:
+                print(f"{e['server_timestamp']} {e['room'][:12]:<12} {e['Cycle']:>5} {e['player'][:16]:<16}"
+                      f" {e['state']:<8} {e['score_change']:>4} {e['current_score']:>5} {e['word']}")
+            shown += 1
+
+def cmd_games(args):
+    games = {}
+    for store in open_stores(args.store):
+        for game, (room, first, last, turns) in store.games(args.player).items():
+            # a game that spans a rotation is in two stores
+            g = games.setdefault(game, [room, first, last, 0])
+            g[1], g[2] = min(g[1], first), max(g[2], last)
+            g[3] += turns
+    key = (lambda g: g[3]) if args.by == "turns" else (lambda g: g[2] - g[1])
+    top = sorted(games.items(), key=lambda item: key(item[1]), reverse=True)[:args.longest]
+    if args.json:
+        print(json.dumps([{"game": game, "room": room, "start": format_ms(first),
+                           "duration_s": (last - first) / 1000, "turns": turns}
+                          for game, (room, first, last, turns) in top], indent=2))
+        return
+    print(f"{'game':<24} {'room':<12} {'start':<24} {'duration s':>10} {'turns':>6}")
+    for game, (room, first, last, turns) in top:
+        print(f"{game[:24]:<24} {room[:12]:<12} {format_ms(first):<24} {(last - first) / 1000:>10.1f} {turns:>6}")
+
+def main():
+    if sys.byteorder != "little":
+        sys.exit("Log stores are only supported on little-endian hosts.")
+    parser = argparse.ArgumentParser(description="Columnar store and queries for closed game log segments")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("compact", help="compact closed log segments into .col files")
+    p.add_argument("segments", nargs="*", help=f"segments or globs (default: {SEGMENT_PATTERN}, rotated only)")
+    p.add_argument("--remove", action="store_true", help="delete each segment once it is compacted")
+    p.set_defaults(run=cmd_compact)
+    p = sub.add_parser("moves", help="print the moves matching every filter, in log order")
+    p.add_argument("--player")
+    p.add_argument("--game")
+    p.add_argument("--room")
+    p.add_argument("--state", choices=analytics.STATES)
+    p.add_argument("--limit", type=int, default=0, help="print at most N moves")
+    p.set_defaults(run=cmd_moves)
+    p = sub.add_parser("games", help="print the longest games")
+    p.add_argument("--longest", type=int, default=10, metavar="N")
+    p.add_argument("--by", choices=("duration", "turns"), default="duration")
+    p.add_argument("--player", help="only games this player played in")
+    p.set_defaults(run=cmd_games)
+    for p in sub.choices.values():
+        if p.get_default("run") is not cmd_compact:
+            p.add_argument("--store", nargs="+", help=f"log stores or globs (default: {STORE_PATTERN})")
+            p.add_argument("--json", action="store_true", help="print JSON")
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
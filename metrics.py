@@ -0,0 +1,140 @@
+"""Prometheus text-format metrics on a local HTTP port (--metrics-port).
+
+Hot paths record into fixed-bucket histograms: an observe() is a
+perf_counter difference, a bisect and a locked increment, well under a
+microsecond, so they stay on in production. Everything else (players,
+games, outbound queue depths, input and chat counters, timers, the game
+log) is read from the subsystems' snapshot() functions when /metrics is
+scraped, and costs nothing in between.
+
+With --workers each worker process serves its own rooms on
+--metrics-port + 1 + worker index; the coordinator serves the lobby.
+"""
+import bisect
+import http.server
+import threading
+
+import bots
+import chat
+import dictcache
+import inbound
+import latency
+import outbound
+import rooms
+import scheduler
+import spectators
+
+
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Histogram:
+    def __init__(self, name, help, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # the last one is +Inf
+        self.sum = 0.0
+        self.lock = threading.Lock()
+        histograms.append(self)
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += seconds
+
+    def render(self):
+        with self.lock:
+            counts, total = list(self.counts), self.sum
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+histograms = []
+VALIDATE_WORD = Histogram("wordchain_validate_word_seconds", "Time to validate one answer.")
+BROADCAST = Histogram("wordchain_broadcast_seconds", "Time to queue one frame for a whole room.")
+TURN_LATENCY = Histogram("wordchain_turn_latency_seconds", "Time from PROMPT to the player's answer.")
+LOG_WRITE = Histogram("wordchain_log_write_seconds", "Time to hand one entry to the game log writer.")
+BOT_MOVE = Histogram("wordchain_bot_move_seconds", "Time for a bot to choose its word.",
+                     (0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005))
+RTT = Histogram("wordchain_rtt_seconds", "Round-trip time of one PING/PONG.")
+LOCK_WAIT = Histogram("wordchain_room_lock_wait_seconds", "Time spent waiting for a room lock to broadcast.")
+
+collectors = []     # more callables returning samples, e.g. the game log in server.py
+
+def room_samples():
+    with rooms.lock:
+        all_rooms = list(rooms.rooms.values())
+    return [
+        ("wordchain_rooms", "gauge", "Open rooms.", len(all_rooms)),
+        ("wordchain_players", "gauge", "Registered players in rooms.", sum(len(r.players) for r in all_rooms)),
+        ("wordchain_active_games", "gauge", "Rooms with a game in progress.",
+         sum(1 for r in all_rooms if r.game_active)),
+    ]
+
+def snapshot_samples(prefix, snap, gauges, help):
+    """Samples for a subsystem snapshot() dict; keys not in `gauges` are counters."""
+    out = []
+    for key, value in snap.items():
+        if key in gauges:
+            out.append((f"{prefix}_{key}", "gauge", f"{help}: {key}.", value))
+        else:
+            out.append((f"{prefix}_{key}_total", "counter", f"{help}: {key}.", value))
+    return out
+
+def samples():
+    result = room_samples()
+    result += snapshot_samples("wordchain_outbound", outbound.snapshot(),
+                               {"connections", "queued_frames", "max_depth", "peak_depth"},
+                               "Outbound queues")
+    result += snapshot_samples("wordchain_inbound", inbound.snapshot(),
+                               {"connections", "max_bytes_read"}, "Client input")
+    result += snapshot_samples("wordchain_chat", chat.snapshot(), set(), "Chat")
+    result += snapshot_samples("wordchain_timers", scheduler.snapshot(),
+                               {"pending", "lateness_max_ms", "lateness_avg_ms"}, "Scheduler timers")
+    result += snapshot_samples("wordchain_bots", bots.snapshot(), set(), "Bots")
+    result += snapshot_samples("wordchain_dictionary", dictcache.snapshot(), set(), "Dictionary downloads")
+    result += snapshot_samples("wordchain_pong", latency.snapshot(), set(), "PONGs")
+    result += snapshot_samples("wordchain_spectator", spectators.snapshot(), {"spectators"}, "Spectators")
+    for collect in collectors:
+        result += collect()
+    return result
+
+def render():
+    lines = []
+    for name, kind, help, value in samples():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    for h in histograms:
+        lines += h.render()
+    return "\n".join(lines) + "\n"
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port, host="127.0.0.1"):
+    """Serve /metrics on a background thread."""
+    httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    print(f"Metrics on http://{host}:{port}/metrics")
+    return httpd
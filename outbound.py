@@ -0,0 +1,217 @@
+"""Per-connection bounded outbound queues.
+
+Every connection gets an Outbox: broadcasts enqueue already-encoded
+frames and return immediately, and a writer of its own (a thread, or a
+task in the asyncio engine) drains the queue to the socket. A slow client
+therefore only ever delays itself. When a queue is full the frame's kind
+decides what happens (OVERFLOW_POLICY):
+
+  drop        discard the new frame (chat)
+  coalesce    replace the pending frame of the same kind (scores snapshots)
+  disconnect  close the connection (everything else)
+"""
+import asyncio
+import collections
+import socket
+import threading
+import weakref
+
+
+OUTBOX_LIMIT = 256          # frames
+TRANSPORT_HIGH_WATER = 64 * 1024    # asyncio: bytes buffered in the transport before frames queue up
+OVERFLOW_POLICY = {"chat": "drop", "scores": "coalesce", "default": "disconnect"}
+
+stats_lock = threading.Lock()
+totals = {"dropped": 0, "coalesced": 0, "disconnected": 0}
+live = weakref.WeakSet()
+
+def count(key):
+    with stats_lock:
+        totals[key] += 1
+
+def parse_policy(text):
+    """Parse 'chat=drop,scores=coalesce' into an OVERFLOW_POLICY update."""
+    policy = {}
+    for item in text.split(","):
+        kind, _, action = item.partition("=")
+        if action not in ("drop", "coalesce", "disconnect"):
+            raise ValueError(f"unknown overflow action for {kind}: {action!r}")
+        policy[kind.strip()] = action
+    return policy
+
+def snapshot():
+    """Queue depth counters over all open connections."""
+    boxes = list(live)
+    depths = [len(b.frames) for b in boxes]
+    with stats_lock:
+        result = dict(totals)
+    result.update({
+        "connections": len(boxes),
+        "queued_frames": sum(depths),
+        "max_depth": max(depths, default=0),
+        "peak_depth": max((b.peak_depth for b in boxes), default=0),
+    })
+    return result
+
+class Outbox:
+    """Bounded frame queue; subclasses supply the writer."""
+
+    def __init__(self, limit=None, policy=None):
+        self.limit = limit or OUTBOX_LIMIT
+        self.policy = policy or OVERFLOW_POLICY
+        self.lock = threading.Lock()
+        self.frames = collections.deque()    # (kind, bytes)
+        self.closed = False
+        self.peak_depth = 0
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        live.add(self)
+
+    def put(self, data, kind="default"):
+        """Queue an encoded frame; returns False if it was dropped."""
+        with self.lock:
+            if self.closed:
+                return False
+            if len(self.frames) >= self.limit:
+                action = self.policy.get(kind, self.policy["default"])
+                if action == "coalesce":
+                    for i in range(len(self.frames) - 1, -1, -1):
+                        if self.frames[i][0] == kind:
+                            self.frames[i] = (kind, data)
+                            count("coalesced")
+                            return True
+                    action = self.policy["default"]
+                if action == "drop":
+                    count("dropped")
+                    return False
+                if action == "disconnect":
+                    self.closed = True
+                    self.frames.clear()
+                    count("disconnected")
+                    self._abort()
+                    return False
+            self.frames.append((kind, data))
+            self.peak_depth = max(self.peak_depth, len(self.frames))
+        self._wake()
+        return True
+
+    def _take(self):
+        """Remove all queued frames (lock held) and return them as one buffer."""
+        batch = [data for _, data in self.frames]
+        self.frames.clear()
+        data = b"".join(batch)
+        self.sent_frames += len(batch)
+        self.sent_bytes += len(data)
+        return data
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+        self._wake()
+
+    def abort(self):
+        """Close and cut the connection; its reader runs the normal disconnect path."""
+        self.close()
+        self._abort()
+
+    def _wake(self):
+        raise NotImplementedError
+
+    def _abort(self):
+        raise NotImplementedError
+
+class ThreadOutbox(Outbox):
+    """Outbox drained by a dedicated writer thread with blocking sendall."""
+
+    def __init__(self, sock, limit=None, policy=None):
+        super().__init__(limit, policy)
+        self.sock = sock
+        self.busy = False
+        self.ready = threading.Condition(self.lock)
+        self.drained = threading.Condition(self.lock)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def _wake(self):
+        with self.ready:
+            self.ready.notify()
+
+    def _abort(self):
+        # wakes the connection's reader, which runs the normal disconnect path
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def run(self):
+        while True:
+            with self.lock:
+                self.busy = False
+                self.drained.notify_all()
+                while not self.frames and not self.closed:
+                    self.ready.wait()
+                if not self.frames:
+                    return
+                data = self._take()
+                self.busy = True
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                with self.lock:
+                    self.closed = True
+                    self.frames.clear()
+                self._abort()
+
+    def flush(self, timeout=1.0):
+        """Wait until everything queued so far has been written."""
+        with self.lock:
+            return self.drained.wait_for(
+                lambda: self.closed or (not self.frames and not self.busy), timeout)
+
+class AsyncOutbox(Outbox):
+    """Outbox drained by a task on the asyncio engine's event loop."""
+
+    def __init__(self, writer, limit=None, policy=None):
+        super().__init__(limit, policy)
+        self.writer = writer
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.event = asyncio.Event()
+        self.task = self.loop.create_task(self.run())
+
+    def put(self, data, kind="default"):
+        # Fast path: while the transport keeps up, write straight through so a
+        # connection's frames never wait for its writer task to be scheduled.
+        if (not self.frames and not self.closed and threading.get_ident() == self.loop_thread
+                and self.writer.transport.get_write_buffer_size() < TRANSPORT_HIGH_WATER):
+            self.writer.write(data)
+            self.sent_frames += 1
+            self.sent_bytes += len(data)
+            return True
+        return super().put(data, kind)
+
+    def _wake(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    def _abort(self):
+        self.loop.call_soon_threadsafe(self.writer.transport.abort)
+
+    async def run(self):
+        while True:
+            with self.lock:
+                data = self._take() if self.frames else None
+                closed = self.closed
+            if data is None:
+                if closed:
+                    return
+                await self.event.wait()
+                self.event.clear()
+                continue
+            try:
+                self.writer.write(data)
+                await self.writer.drain()
+            except (OSError, RuntimeError):
+                with self.lock:
+                    self.closed = True
+                    self.frames.clear()
+                return
@@ -0,0 +1,392 @@
+"""Pre-forked multi-process server with room affinity.
+
+The coordinator process owns the listening socket and the lobby phase
+(ROOMS / CREATE / JOIN / REGISTER / DICT). Once a client registers, its
+socket is passed (SCM_RIGHTS) to the worker that hosts its room, so every player of
+a room is served by the same process. Workers report room membership back
+so the coordinator can list rooms and place new ones on the least loaded
+worker. A client that switches rooms after registering is handed back to
+the coordinator and placed again. RESUME and WATCH go straight to the
+worker that holds the session or the room. A handed-over client's
+input that was read but not handled yet goes along with it, as far as
+it fits in a channel message (carry()).
+"""
+import atexit
+import base64
+import errno
+import itertools
+import json
+import os
+import socket
+import threading
+
+import dictcache
+import inbound
+import metrics
+import profiling
+import rooms
+import server
+import wire
+
+
+MAX_MESSAGE = 65536     # bytes of one channel message, fds aside
+
+def carry(msg, lines, reader):
+    """Add a client's unhandled input to a handoff message: its complete `lines`, then
+    the unfinished line in `reader`. Input that would push the message past
+    MAX_MESSAGE is dropped from the end; a dropped unfinished line is then
+    skipped up to its newline, like an oversized one.
+    """
+    remainder = reader.remainder()
+    msg['pending'] = list(lines)
+    msg['partial'] = None if remainder is None else base64.b64encode(remainder).decode()
+    dropped = 0
+    while len(json.dumps(msg).encode()) > MAX_MESSAGE and (msg['partial'] or msg['pending']):
+        if msg['partial']:
+            msg['partial'] = None
+        else:
+            msg['pending'].pop()
+        dropped += 1
+    if dropped:
+        print(f"Handoff too large: dropped {dropped} pending line(s) of {msg.get('name') or 'a client'}.")
+    return msg
+
+def take_over(reader, partial):
+    """Prime a new LineReader with the unfinished line carry() put in a message."""
+    reader.prime(None if partial is None else base64.b64decode(partial))
+
+def send_msg(chan, chan_lock, msg, sock=None):
+    data = json.dumps(msg).encode()
+    if len(data) > MAX_MESSAGE:
+        # recv_msg would get it cut short
+        raise OSError(errno.EMSGSIZE, "channel message too large")
+    with chan_lock:
+        if sock is None:
+            chan.send(data)
+        else:
+            socket.send_fds(chan, [data], [sock.fileno()])
+
+def recv_msg(chan):
+    """Return (msg, socket or None); msg is None once the peer is gone."""
+    data, fds, _flags, _addr = socket.recv_fds(chan, MAX_MESSAGE, 1)
+    if not data:
+        return None, None
+    return json.loads(data), (socket.socket(fileno=fds[0]) if fds else None)
+
+# --- worker side ---
+
+class WorkerRouter:
+    """Installed as server.router inside a worker process."""
+
+    def __init__(self, chan):
+        self.chan = chan
+        self.chan_lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.waiting = {}       # ROOMS request id -> player
+
+    def send(self, msg, sock=None):
+        """False if the message could not be sent."""
+        try:
+            send_msg(self.chan, self.chan_lock, msg, sock)
+        except OSError:
+            return False
+        return True
+
+    def attach(self, p, msg, reader):
+        """Register a handed-over client; returns the lines it already sent."""
+        p.update(msg['caps'])
+        take_over(reader, msg['partial'])
+        if msg['name'] is None:
+            # RESUME of a session in this worker or WATCH of one of its rooms,
+            # as the first pending line
+            return msg['pending']
+        p['room_choice'] = (msg['room'], False)
+        server.register(p, msg['name'])
+        if not p['ready']:
+            # room filled up meanwhile; the coordinator lets the client choose again
+            raise server.Relocate()
+        return msg['pending']
+
+    def request_listing(self, p):
+        req = next(self.ids)
+        self.waiting[req] = p
+        self.send({"op": "list", "req": req})
+
+    def room_changed(self, room):
+        self.send({"op": "room", "room": room.name, "players": len(room.players),
+                   "max": room.max_players, "status": room.status()})
+
+    def release(self, p, sock, relocate, pending, reader):
+        if relocate is not None:
+            msg = carry({"op": "lobby", "name": (p['name'] or None) if relocate.line else None,
+                         "line": relocate.line, "from": relocate.room,
+                         "caps": {k: p[k] for k in server.CAPS}}, pending, reader)
+            if self.send(msg, sock):
+                return
+            # only a name or command line near MAX_MESSAGE gets here
+            print(f"Could not hand {p['name'] or 'a client'} back to the lobby; closing the connection.")
+            try:
+                sock.sendall(wire.error("Could not move you to another room.").encode(p['binary']))
+            except OSError:
+                pass
+        self.send({"op": "gone"})
+
+def worker_file(path, index):
+    """game_log.json -> game_log.w0.json, ..."""
+    base, ext = os.path.splitext(path)
+    return f"{base}.w{index}{ext}"
+
+def worker_main(chan, index):
+    rooms.CREATE_ON_JOIN = True
+    # the coordinator routes RESUME by this prefix
+    server.SESSION_PREFIX = f"{index}."
+    # one game log (and profile, trace) per worker
+    server.JSON_FILE = worker_file(server.JSON_FILE, index)
+    router = server.router = WorkerRouter(chan)
+    if server.METRICS_PORT:
+        metrics.serve(server.METRICS_PORT + 1 + index)
+    if profiling.PROFILE_FILE or profiling.TRACE_FILE:
+        profiling.start(profiling.PROFILE_FILE and worker_file(profiling.PROFILE_FILE, index), profiling.HZ,
+                        profiling.TRACE_FILE and worker_file(profiling.TRACE_FILE, index))
+    while True:
+        msg, sock = recv_msg(chan)
+        if msg is None:
+            # coordinator exited
+            return
+        if msg['op'] == "attach":
+            with server.lock:
+                server.connections += 1
+            threading.Thread(target=server.handle_client, args=(sock, msg), daemon=True).start()
+        elif msg['op'] == "listing":
+            p = router.waiting.pop(msg['req'], None)
+            if p is not None:
+                server.send_to(p, wire.rooms(msg['rooms']))
+
+# --- coordinator side ---
+
+def send_frame(sock, frame, binary=False):
+    sock.sendall(frame.encode(binary))
+
+class Coordinator:
+    def __init__(self, workers):
+        self.lock = threading.Lock()    # guards table, connections and worker state
+        self.workers = [{'pid': pid, 'chan': chan, 'chan_lock': threading.Lock(), 'alive': True}
+                        for pid, chan in workers]
+        self.table = {}                 # room -> {'worker', 'players', 'max', 'status'}
+        self.connections = 0
+
+    def listing(self):
+        with self.lock:
+            return [(n, e['players'], e['max'], e['status']) for n, e in self.table.items()]
+
+    def place(self, name, create):
+        """Return (worker index, error) for a client entering room `name`."""
+        with self.lock:
+            entry = self.table.get(name)
+            if create and entry is not None:
+                return None, f"Room {name} already exists."
+            if entry is None:
+                if not create and name != rooms.DEFAULT_ROOM:
+                    return None, f"No room named {name}."
+                if len(self.table) >= rooms.MAX_ROOMS:
+                    return None, "Too many rooms."
+                alive = [i for i, w in enumerate(self.workers) if w['alive']]
+                if not alive:
+                    return None, "No workers available."
+                load = {i: [0, 0] for i in alive}
+                for e in self.table.values():
+                    if e['worker'] in load:
+                        load[e['worker']][0] += e['players']
+                        load[e['worker']][1] += 1
+                worker = min(alive, key=lambda i: load[i])
+                entry = self.table[name] = {'worker': worker, 'players': 0,
+                                            'max': server.MAX_PLAYERS, 'status': "waiting"}
+            elif entry['players'] >= entry['max']:
+                return None, f"Room {name} is full."
+            return entry['worker'], None
+
+    def attach(self, sock, worker, name, room, pending, caps, reader):
+        w = self.workers[worker]
+        try:
+            send_msg(w['chan'], w['chan_lock'],
+                     carry({"op": "attach", "name": name, "room": room, "caps": caps}, pending, reader), sock)
+        except OSError:
+            print(f"Could not hand {name or 'a client'} to worker {worker}; closing the connection.")
+            send_frame(sock, wire.error("Could not move you to the room."), caps.get('binary', False))
+            raise
+        sock.close()
+
+    def lobby(self, sock, name=None, line=None, prev=None, pending=(), caps=None, partial=""):
+        """Serve a client until it is registered in a room, then hand it to a worker.
+
+        `name` is the REGISTER argument; clients coming back from a worker
+        keep what they negotiated at REGISTER (`caps`, see server.CAPS) and
+        bring the input the worker had not handled (`pending`, `partial`, see carry()).
+        """
+        choice = (rooms.DEFAULT_ROOM, False)
+        lines = ([line] if line else []) + list(pending)
+        caps = caps or {}
+        send = lambda frame: send_frame(sock, frame, caps.get('binary', False))
+        reader = inbound.LineReader(lambda msg: send(wire.error(msg)))
+        take_over(reader, partial)
+        try:
+            while True:
+                while lines:
+                    cmd, _, arg = lines.pop(0).strip().partition(" ")
+                    arg = arg.strip()
+                    target = None
+                    if cmd == "ROOMS":
+                        send(wire.rooms(self.listing()))
+                    elif cmd == "DICT":
+                        pack = server.get_dictionary_pack()
+                        if arg == "GET":
+                            sock.sendall(pack.data(caps.get('binary', False)))
+                        else:
+                            dictcache.count("offers")
+                            send(pack.offer)
+                    elif cmd in ("CREATE", "JOIN"):
+                        if not server.valid_room_name(arg):
+                            send(wire.error("Room names are 1-32 characters without spaces, ':' or ','."))
+                        elif name is None:
+                            choice = (arg, cmd == "CREATE")
+                            send(wire.info(f"Room {arg} selected."))
+                        else:
+                            target = (arg, cmd == "CREATE")
+                    elif cmd == "REGISTER" and name is None:
+                        if not wire.parse_register(arg)[0]:
+                            send(wire.error("Registration must include name."))
+                            raise ValueError("Invalid registration format")
+                        name = arg
+                        target = choice
+                    elif cmd == "RESUME" and name is None:
+                        # the session lives in the worker named by the token's prefix
+                        index = arg.partition(".")[0]
+                        if index.isdigit() and int(index) < len(self.workers):
+                            self.attach(sock, int(index), None, None, [f"RESUME {arg}"] + lines, caps, reader)
+                            return
+                        send(wire.error("Unknown or expired session."))
+                    elif cmd == "WATCH" and name is None:
+                        room = wire.parse_register(arg)[0]
+                        with self.lock:
+                            entry = self.table.get(room)
+                        if entry is None:
+                            send(wire.error(f"No room named {room}."))
+                        else:
+                            self.attach(sock, entry['worker'], None, None, [f"WATCH {arg}"] + lines, caps, reader)
+                            return
+                    if target is None:
+                        continue
+                    worker, error = self.place(*target)
+                    if error and prev is not None:
+                        # switching rooms failed: back to the room the client came from
+                        send(wire.error(error))
+                        target = (prev, False)
+                        worker, error = self.place(*target)
+                    if error:
+                        send(wire.error(error))
+                        name = prev = None
+                        continue
+                    self.attach(sock, worker, name, target[0], lines, caps, reader)
+                    return
+                data = sock.recv(inbound.RECV_SIZE)
+                if not data:
+                    raise ConnectionError()
+                lines = reader.feed(data)
+        except (OSError, ValueError):
+            pass
+        with self.lock:
+            self.connections -= 1
+        sock.close()
+
+    def on_room(self, worker, msg):
+        with self.lock:
+            name = msg['room']
+            entry = self.table.get(name)
+            if msg['players'] == 0 and name != rooms.DEFAULT_ROOM:
+                if entry is not None and entry['worker'] == worker:
+                    del self.table[name]
+                return
+            if entry is None:
+                entry = self.table[name] = {'worker': worker}
+            entry.update(players=msg['players'], max=msg['max'], status=msg['status'])
+
+    def channel_loop(self, worker):
+        w = self.workers[worker]
+        while True:
+            try:
+                msg, sock = recv_msg(w['chan'])
+            except OSError:
+                msg = None
+            if msg is None:
+                break
+            op = msg['op']
+            if op == "room":
+                self.on_room(worker, msg)
+            elif op == "gone":
+                with self.lock:
+                    self.connections -= 1
+            elif op == "list":
+                send_msg(w['chan'], w['chan_lock'],
+                         {"op": "listing", "req": msg['req'], "rooms": self.listing()})
+            elif op == "lobby":
+                threading.Thread(target=self.lobby, daemon=True,
+                                 args=(sock, msg['name'], msg['line'], msg['from'], msg['pending'],
+                                       msg['caps'], msg['partial'])).start()
+        print(f"Worker {worker} (pid {w['pid']}) exited.")
+        with self.lock:
+            w['alive'] = False
+            for name in [n for n, e in self.table.items() if e['worker'] == worker]:
+                del self.table[name]
+
+    def serve(self, srv):
+        for i in range(len(self.workers)):
+            threading.Thread(target=self.channel_loop, args=(i,), daemon=True).start()
+        while True:
+            cli, addr = srv.accept()
+            with self.lock:
+                full = self.connections >= server.MAX_CONNECTIONS
+                if not full:
+                    self.connections += 1
+            if full:
+                cli.sendall(b"INFO Server full.\n")
+                cli.close()
+                continue
+            threading.Thread(target=self.lobby, args=(cli,), daemon=True).start()
+
+def accept_loop(port=server.PORT, workers=os.cpu_count()):
+    # loaded before forking so the workers share the pages
+    server.load_dictionary()
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(('', port))
+    srv.listen(socket.SOMAXCONN)
+
+    chans = []
+    for i in range(workers):
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        pid = os.fork()
+        if pid == 0:
+            srv.close()
+            parent.close()
+            for _, c in chans:
+                c.close()
+            try:
+                worker_main(child, i)
+            finally:
+                server.close_game_log()
+                profiling.stop()
+                os._exit(0)
+        child.close()
+        chans.append((pid, parent))
+    print(f"Server listening on port {port} with {workers} worker processes...")
+    if server.METRICS_PORT:
+        # started after forking: the workers serve their own
+        metrics.serve(server.METRICS_PORT)
+    if profiling.PROFILE_FILE:
+        # the lobby; turns are traced in the workers
+        profiling.start(profiling.PROFILE_FILE, profiling.HZ)
+        atexit.register(profiling.stop)
+    try:
+        Coordinator(chans).serve(srv)
+    except KeyboardInterrupt:
+        pass
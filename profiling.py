@@ -0,0 +1,140 @@
+"""Opt-in stack sampling and per-turn tracing.
+
+--profile [FILE] starts a thread that samples the stacks of all other
+threads HZ times a second and, at exit, writes them in collapsed-stack
+format ("thread;outer;inner count" per line), the input of flamegraph.pl
+or speedscope. Samples are wall-clock: threads blocked in recv() or in a
+lock wait show up as well.
+
+--trace [FILE] writes one JSON line per turn with the time spent in each
+step: receive (from the answer's arrival to holding the turn), validate,
+score, log and broadcast, in milliseconds.
+
+Both are off by default; then `sampler` and `tracer` are None and the
+only cost is begin_turn()'s None check and the `trace is not None` tests
+in server.finish_turn.
+"""
+import collections
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+HZ = 97             # samples per second; off the beat of 10ms timers
+PROFILE_FILE = "profile.folded"
+TRACE_FILE = "trace.jsonl"
+
+sampler = None      # Sampler while profiling
+tracer = None       # TraceWriter while tracing
+
+class Sampler:
+    def __init__(self, path, hz=HZ):
+        self.path = path
+        self.interval = 1.0 / hz
+        self.counts = collections.Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self.counts[thread_label(names.get(ident, "?")) + ";" + collapse(frame)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        with open(self.path, "w") as f:
+            for stack, n in sorted(self.counts.items()):
+                f.write(f"{stack} {n}\n")
+        print(f"Profile {self.path}: {self.samples} samples, {len(self.counts)} stacks.")
+
+def thread_label(name):
+    """'Thread-12 (handle_client)' -> 'handle_client', so equal threads merge."""
+    m = re.search(r"\((\w+)\)$", name)
+    return m.group(1) if m else re.sub(r"-\d+$", "", name)
+
+def collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+class TraceWriter:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.f = open(path, "a", buffering=1)
+
+    def write(self, record):
+        line = json.dumps(record) + "\n"
+        with self.lock:
+            # a turn that ends after stop() has nowhere to go
+            if not self.f.closed:
+                self.f.write(line)
+
+    def close(self):
+        with self.lock:
+            self.f.close()
+
+class TurnTrace:
+    """Spans of one turn; mark(step) closes the step that ended now."""
+    __slots__ = ("writer", "room", "player", "ts", "start", "last", "spans")
+
+    def __init__(self, writer, room, player):
+        self.writer = writer
+        self.room = room
+        self.player = player
+        self.ts = datetime.utcnow().isoformat(timespec='milliseconds') + "Z"
+        self.start = self.last = time.perf_counter()
+        self.spans = {}
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.spans[step] = round((now - self.last) * 1000, 3)
+        self.last = now
+
+    def done(self, **fields):
+        record = {"ts": self.ts, "room": self.room, "player": self.player}
+        record.update(fields)
+        record["spans_ms"] = self.spans
+        record["total_ms"] = round((self.last - self.start) * 1000, 3)
+        self.writer.write(record)
+
+def begin_turn(room, player):
+    """A TurnTrace when tracing, else None."""
+    # the writer is kept on the trace: stop() may clear `tracer` mid-turn
+    writer = tracer
+    if writer is None:
+        return None
+    return TurnTrace(writer, room.name, player['name'])
+
+def start(profile=None, hz=HZ, trace=None):
+    global sampler, tracer
+    if profile:
+        sampler = Sampler(profile, hz)
+        print(f"Profiling all threads at {hz} Hz into {profile}")
+    if trace:
+        tracer = TraceWriter(trace)
+        print(f"Tracing turns into {trace}")
+
+def stop():
+    """Write the profile and close the trace; called at exit."""
+    global sampler, tracer
+    if sampler is not None:
+        sampler.stop()
+        sampler = None
+    if tracer is not None:
+        tracer.close()
+        tracer = None
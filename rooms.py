@@ -0,0 +1,107 @@
+import collections
+import itertools
+import threading
+
+
+DEFAULT_ROOM = "main"
+MAX_ROOMS = 500
+CREATE_ON_JOIN = False      # set in prefork workers, where the coordinator owns room existence
+REPLAY_EVENTS = 256         # room events kept for clients resuming a session
+
+lock = threading.Lock()     # guards `rooms`; always taken before a Room.lock
+rooms = {}
+event_ids = itertools.count(1)  # room event numbers, increasing across all rooms of the process
+
+class Room:
+    """State of one game room; `lock` guards players and game state."""
+
+    def __init__(self, name, max_players):
+        self.name = name
+        self.max_players = max_players
+        self.lock = threading.Lock()
+        self.players = {}           # player id -> player, in joining order
+        self.seats = itertools.count()  # turn order: players take turns by seat number
+        self.spectators = {}        # player id -> spectator, see spectators.py
+        self.used_words = None      # wordindex.UsedWords, set when a game starts
+        self.current_letter = None
+        self.game_active = False
+        self.current_cycle = 1
+        self.game_id = None         # names the game in log entries, see logstore.py
+        self.turns_in_cycle = 0
+        self.score_seq = 0          # version of `scoreboard`, see server.broadcast_scores
+        self.scoreboard = {}        # name -> score as last broadcast
+        self.chat = []              # wire.Frames waiting for chat.flush
+        self.turn_lock = threading.Lock()   # serializes the game's turn events, see server.py
+        self.turn = -1              # seat of the player who had the last turn
+        self.turn_seq = 0           # bumped per turn; stale timers compare against it
+        self.turn_player = None     # whose answer is awaited, None between turns
+        self.turn_started = 0.0     # time.monotonic()
+        self.turn_timer = None      # scheduler.Timer for TIMEOUT_SEC
+        self.events = collections.deque(maxlen=REPLAY_EVENTS)   # (seq, wire.Frame)
+        self.events_lost = 0        # newest seq that fell out of `events`
+
+    def status(self):
+        return "playing" if self.game_active else "waiting"
+
+    def log_event(self, frame):
+        """Number a frame sent to the whole room and keep it for replay (lock held)."""
+        seq = next(event_ids)
+        if len(self.events) == self.events.maxlen:
+            self.events_lost = self.events[0][0]
+        self.events.append((seq, frame))
+        return seq
+
+def get_room(name):
+    with lock:
+        return rooms.get(name)
+
+def enter(p, name, max_players, create=False):
+    """Add player dict `p` to room `name`.
+
+    With create=True the room must not exist yet; otherwise it must exist
+    (the default room is created on demand). Returns (room, error).
+    """
+    with lock:
+        room = rooms.get(name)
+        if create and room is not None:
+            return None, f"Room {name} already exists."
+        if room is None:
+            if not create and name != DEFAULT_ROOM and not CREATE_ON_JOIN:
+                return None, f"No room named {name}."
+            if len(rooms) >= MAX_ROOMS:
+                return None, "Too many rooms."
+            room = rooms[name] = Room(name, max_players)
+        with room.lock:
+            if len(room.players) >= room.max_players:
+                return None, f"Room {name} is full."
+            room.players[p['id']] = p
+            p['seat'] = next(room.seats)
+            p['is_host'] = len(room.players) == 1
+            p['room'] = room
+    return room, None
+
+def leave(p):
+    """Remove `p` from its room; returns (room, new_host or None)."""
+    room = p.get('room')
+    if room is None:
+        return None, None
+    with lock:
+        with room.lock:
+            room.players.pop(p['id'], None)
+            new_host = None
+            if p['is_host'] and room.players:
+                # bots cannot start games
+                new_host = next((o for o in room.players.values() if o['bot'] is None),
+                                next(iter(room.players.values())))
+                new_host['is_host'] = True
+            if not room.players and room.name != DEFAULT_ROOM and rooms.get(room.name) is room:
+                del rooms[room.name]
+        p['room'] = None
+        p['is_host'] = False
+    return room, new_host
+
+def list_rooms():
+    """Return (name, players, max_players, status) for every room."""
+    with lock:
+        snapshot = list(rooms.values())
+    return [(r.name, len(r.players), r.max_players, r.status()) for r in snapshot]
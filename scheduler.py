@@ -0,0 +1,111 @@
+"""Deadlines for every game on one timer heap.
+
+call_later(delay, fn, *args) runs fn(*args) after `delay` seconds and
+returns a Timer that can be cancelled. In the thread engine (and the
+prefork workers) one thread sleeps until the earliest deadline in a heap
+and runs the callbacks; in the asyncio engine `loop` is set and the event
+loop's own timers are used. Callbacks must not block: they run one after
+another, and a slow one delays all later deadlines.
+"""
+import heapq
+import itertools
+import threading
+import time
+import traceback
+
+
+loop = None         # asyncio loop in the asyncio engine; None: the timer thread
+
+stats_lock = threading.Lock()
+totals = {"scheduled": 0, "fired": 0, "cancelled": 0}
+lateness = {"max_ms": 0.0, "sum_ms": 0.0}
+heap_timer = None
+
+def count(key):
+    with stats_lock:
+        totals[key] += 1
+
+def snapshot():
+    """Timer counters; lateness is how long after its deadline a timer ran."""
+    with stats_lock:
+        result = dict(totals)
+        result["lateness_max_ms"] = round(lateness["max_ms"], 3)
+        result["lateness_avg_ms"] = round(lateness["sum_ms"] / max(totals["fired"], 1), 3)
+    result["pending"] = result["scheduled"] - result["fired"] - result["cancelled"]
+    return result
+
+class Timer:
+    __slots__ = ("deadline", "fn", "args", "cancelled")
+
+    def __init__(self, deadline, fn, args):
+        self.deadline = deadline
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            count("cancelled")
+
+def run_timer(timer):
+    if timer.cancelled:
+        return
+    late = (time.monotonic() - timer.deadline) * 1000
+    with stats_lock:
+        totals["fired"] += 1
+        lateness["max_ms"] = max(lateness["max_ms"], late)
+        lateness["sum_ms"] += late
+    try:
+        timer.fn(*timer.args)
+    except Exception:
+        traceback.print_exc()
+
+class TimerHeap:
+    """One thread running timers in deadline order."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.heap = []      # (deadline, tie breaker, Timer)
+        self.ids = itertools.count()
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def add(self, timer):
+        with self.cond:
+            heapq.heappush(self.heap, (timer.deadline, next(self.ids), timer))
+            if self.heap[0][2] is timer:
+                self.cond.notify()
+
+    def run(self):
+        while True:
+            with self.cond:
+                while True:
+                    if not self.heap:
+                        self.cond.wait()
+                        continue
+                    deadline, _, timer = self.heap[0]
+                    if timer.cancelled:
+                        heapq.heappop(self.heap)
+                        continue
+                    wait = deadline - time.monotonic()
+                    if wait <= 0:
+                        heapq.heappop(self.heap)
+                        break
+                    self.cond.wait(wait)
+            run_timer(timer)
+
+start_lock = threading.Lock()
+
+def call_later(delay, fn, *args):
+    global heap_timer
+    timer = Timer(time.monotonic() + delay, fn, args)
+    count("scheduled")
+    if loop is not None:
+        loop.call_later(delay, run_timer, timer)
+        return timer
+    if heap_timer is None:
+        with start_lock:
+            if heap_timer is None:
+                heap_timer = TimerHeap()
+    heap_timer.add(timer)
+    return timer
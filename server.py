@@ -1,15 +1,36 @@
+import argparse
+import atexit
+import itertools
+import signal
 import socket
+import sys
 import threading
-import queue
 import json
 import random
+import secrets
 import string
 import time
 from datetime import datetime
 
+import bots
+import chat
+import dictcache
+import gamelog
+import inbound
+import latency
+import metrics
+import outbound
+import profiling
+import rooms
+import scheduler
+import spectators
+import wire
+import wordindex
+
 
 PORT = 12345
-MAX_PLAYERS = 5
+MAX_PLAYERS = 5         # per room
+MAX_CONNECTIONS = 1000
 TIMEOUT_SEC = 30
 TIMEOUT_PENALTY = -2
 WIN_SCORE = 50
@@ -17,257 +38,888 @@ JSON_FILE = "game_log.json"
 BONUS_TIME = 5
 BONUS_POINTS = 5
 DICT_FILE = "dictionary.txt"
+METRICS_PORT = 0        # 0: no metrics endpoint
+RESUME_GRACE = 60       # seconds a "+resume" player keeps its place after losing the connection
+SESSION_PREFIX = ""     # prefork workers put their index into tokens
+CAPS = ('binary', 'delta', 'resume', 'ping', 'state')    # negotiated at REGISTER, kept across relocation and resume
+PING_INTERVAL = 3       # seconds between PINGs to "+ping" clients (0: off)
+PING_MISSES = 2         # PING intervals without a PONG before the connection is closed
+
+lock = threading.Lock()     # guards `connections`, `sessions`, `players` and `heartbeat_timer`
+connections = 0
+sessions = {}               # token -> player, for RESUME
+player_ids = itertools.count(1)
+players = {}                # player id -> registered player
+heartbeat_timer = None      # scheduler.Timer of the next heartbeat() round
+pings = itertools.count(1)
+dictionary = None           # wordindex.WordIndex
+letter_graph = None         # wordindex.LetterGraph of `dictionary`, built for the first bot
+dictionary_pack = None      # dictcache.Pack of `dictionary`, built on the first DICT
+build_lock = threading.Lock()   # guards building letter_graph and dictionary_pack
+router = None               # prefork.WorkerRouter inside a worker process
+game_log = None             # gamelog.LogWriter for JSON_FILE
+
+class Relocate(Exception):
+    """Raised in a prefork worker when a client has to go back to the coordinator."""
 
-lock = threading.Lock()
-players = []            
-player_queues = {}   
-used_words = []
-current_letter = None
-game_active = False
-current_cycle = 1
-dict_words = set()
+    def __init__(self, line=None, room=None):
+        super().__init__(line)
+        self.line = line
+        self.room = room
 
 def load_dictionary(path=DICT_FILE):
-    with open(path, encoding='utf-8') as f:
-        for line in f:
-            w = line.strip().lower()
-            if w:
-                dict_words.add(w)
-    print(f"Loaded {len(dict_words)} words into dictionary.")
-
-def log_play_state(player, word, state, score_change, current_score):
-    global current_cycle
+    global dictionary, letter_graph, dictionary_pack
+    # dictionary.bin (python3 wordindex.py) is mapped instead of parsed when present
+    dictionary = wordindex.open_dictionary(path)
+    kind = "compiled" if isinstance(dictionary, wordindex.MappedIndex) else "text"
+    print(f"Loaded {len(dictionary)} words into dictionary ({kind}).")
+    # built from this dictionary when first needed
+    letter_graph = dictionary_pack = None
+
+def log_play_state(room, player, word, state, score_change, current_score, player_timestamp=None,
+                   estimator=None):
     entry = {
-        "Cycle": str(current_cycle),
+        "Cycle": str(room.current_cycle),
+        "room": room.name,
+        "game": room.game_id,
         "player": player,
         "word": word,
+        "player_timestamp": player_timestamp,
         "server_timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
         "state": state,
         "score_change": score_change,
         "current_score": current_score
     }
-    with open(JSON_FILE, "a") as f:
-        json.dump(entry, f)
-        f.write("\n")
+    if estimator is not None:
+        entry.update(estimator.fields())
+    if game_log is None:
+        open_game_log()
+    t0 = time.perf_counter()
+    game_log.write(entry)
+    metrics.LOG_WRITE.observe(time.perf_counter() - t0)
 
-def broadcast(msg):
-    """Send string for clients'\n'."""
-    data = (msg + "\n").encode()
-    with lock:
-        for p in players:
-            try:
-                p['socket'].sendall(data)
-            except:
-                pass
-
-def broadcast_chat(name, text):
-    full = f"CHAT [{name}]: {text}\n".encode()
+def open_game_log():
+    """Start the background writer for JSON_FILE (once per process)."""
+    global game_log
     with lock:
-        for p in players:
-            try:
-                p['socket'].sendall(full)
-            except:
-                pass
+        if game_log is None:
+            game_log = gamelog.LogWriter(JSON_FILE)
+            atexit.register(close_game_log)
 
-def broadcast_scores():
-    with lock:
-        parts = [f"{p['name']}:{p['score']}" for p in players]
-    broadcast("SCORES " + ",".join(parts))
+def close_game_log():
+    """Write out queued log entries; called at exit."""
+    if game_log is not None:
+        game_log.close()
+        stats = game_log.stats()
+        print(f"Game log {JSON_FILE}: {stats['written']} entries written, {stats['dropped']} dropped.")
+
+def game_log_samples():
+    if game_log is None:
+        return []
+    return metrics.snapshot_samples("wordchain_game_log", game_log.stats(), {"queued", "lag_seconds"}, "Game log")
+
+metrics.collectors.append(game_log_samples)
+
+def new_player(outbox):
+    """Player record; `outbox` queues encoded frames for the client (see outbound.py)."""
+    return {
+        'id': next(player_ids),     # stable for the session; rooms and the registry are keyed by it
+        'send': outbox.put,
+        'outbox': outbox,
+        'name': "",
+        'is_host': False,
+        'score': 0,
+        'ready': False,
+        'room': None,
+        'room_choice': (rooms.DEFAULT_ROOM, False),
+        'binary': False,        # negotiated at REGISTER, see wire.py
+        'delta': False,         # versioned scoreboard instead of SCORES
+        'resume': False,        # session token and numbered room events
+        'ping': False,          # PING/PONG heartbeats
+        'state': False,         # turn states on text play lines
+        'seen': 0.0,            # time.monotonic() of the last PONG
+        'latency': latency.Estimator(),     # RTT and clock offset from PING/PONG
+        'token': None,
+        'grace': None,          # scheduler.Timer while the connection is lost
+        'watching': None,       # Room of a spectator
+        'bot': None,            # level of a server-side bot, see bots.py
+        'chat': chat.TokenBucket(),
+    }
+
+def send_to(p, frame):
+    """Send a wire.Frame to one client in its negotiated encoding."""
+    p['send'](frame.encode(p['binary']))
 
-def broadcast_word(player, word, score_change):
-    """Broadcast word and score change."""
-    broadcast(f"INFO {player} played '{word}' (+{score_change} points)")
+def broadcast(room, frame, kind="default"):
+    """Send a wire.Frame to every client in the room; it is encoded once per encoding."""
+    t0 = time.perf_counter()
+    with room.lock:
+        metrics.LOCK_WAIT.observe(time.perf_counter() - t0)
+        seq = room.log_event(frame)
+        targets = list(room.players.values())
+    data = {}
+    for p in targets:
+        key = (p['binary'], p['resume'], p['state'])
+        if key not in data:
+            data[key] = wire.encode_event(frame, seq, *key)
+        p['send'](data[key], kind)
+    spectators.publish(room, frame)
+    metrics.BROADCAST.observe(time.perf_counter() - t0)
 
-def validate_word(word, expected):
+def broadcast_chat(room, name, text):
+    """Queue a chat message for the room's next flush (see chat.py)."""
+    chat.post(room, wire.chat(name, text))
+
+def broadcast_scores(room, joined=None):
+    """Send the scoreboard: SCORES to old clients, the changes since the last call to "+delta" ones.
+
+    `joined` gets a snapshot instead. Frames are queued under the room lock
+    so every client sees the sequence numbers in order.
+    """
+    t0 = time.perf_counter()
+    with room.lock:
+        metrics.LOCK_WAIT.observe(time.perf_counter() - t0)
+        board = {p['name']: p['score'] for p in room.players.values()}
+        changed = [(n, s) for n, s in board.items() if room.scoreboard.get(n) != s]
+        removed = [n for n in room.scoreboard if n not in board]
+        if changed or removed:
+            room.score_seq += 1
+            room.scoreboard = board
+        full = wire.scores(list(board.items()))
+        delta = wire.score_delta(room.score_seq, changed, removed) if changed or removed else None
+        snapshot = None
+        for p in room.players.values():
+            if not p['delta']:
+                p['send'](full.encode(p['binary']), "scores")
+            elif p is joined:
+                snapshot = snapshot or wire.score_snapshot(room.score_seq, full.fields[0])
+                p['send'](snapshot.encode(p['binary']), "scores")
+            elif delta is not None:
+                p['send'](delta.encode(p['binary']), "scores")
+        spectators.publish_scores(room, full, delta)
+    metrics.BROADCAST.observe(time.perf_counter() - t0)
+
+def send_scores(p):
+    """SCORES: the scoreboard for one client, e.g. after it saw a gap in the sequence."""
+    room = p['room']
+    with room.lock:
+        if p['delta']:
+            frame = wire.score_snapshot(room.score_seq, list(room.scoreboard.items()))
+        else:
+            frame = wire.scores([(o['name'], o['score']) for o in room.players.values()])
+        p['send'](frame.encode(p['binary']), "scores")
+
+def broadcast_word(room, player, word, score_change, state):
+    """Broadcast word, score change and the turn's result state."""
+    broadcast(room, wire.played(player, word, score_change, state))
+
+def validate_word(room, word, expected):
     wl = word.lower()
     if not wl or wl[0] != expected.lower(): return False
-    if wl not in dict_words: return False
-    if wl in used_words: return False
+    word_id = dictionary.lookup(wl)
+    if word_id is None: return False
+    if word_id in room.used_words: return False
     return True
 
-def handle_client(sock, idx):
-    global game_active
-    q = queue.Queue()
-    player_queues[idx] = q
+def pick_letter(room):
+    """Random letter that still has unused words in this game, or None."""
+    letters = room.used_words.open_letters(string.ascii_lowercase)
+    return random.choice(letters) if letters else None
+
+def valid_room_name(name):
+    return 0 < len(name) <= 32 and not any(c in name for c in " :,")
+
+def room_changed(room):
+    if router is not None:
+        router.room_changed(room)
+
+def join_room(p, name, create=False):
+    room, error = rooms.enter(p, name, MAX_PLAYERS, create)
+    if error:
+        send_to(p, wire.error(error))
+        return None
+    p['score'] = 0
+    send_to(p, wire.info(f"Joined room {room.name}."))
+    broadcast(room, wire.info(f"Player {p['name']} joined"))
+    if p['is_host']:
+        send_to(p, wire.host())
+    broadcast_scores(room, joined=p)
+    room_changed(room)
+    return room
+
+def leave_room(p, reason="left"):
+    room, new_host = rooms.leave(p)
+    if room is None:
+        return
+    skip_turn(room, p)
+    broadcast(room, wire.info(f"Player {p['name']} {reason}"))
+    if not room.players and room.spectators and room.name != rooms.DEFAULT_ROOM:
+        broadcast(room, wire.info(f"Room {room.name} closed."))
+    if new_host:
+        send_to(new_host, wire.host(new=True))
+    broadcast_scores(room)
+    room_changed(room)
+    if p['bot'] is None:
+        dismiss_bots(room)
+
+def add_bot(p, arg):
+    """BOT [easy|medium|hard]: the host fills a seat with a server-side player."""
+    room = p['room']
+    level = arg.lower() or bots.DEFAULT_LEVEL
+    if level not in bots.LEVELS:
+        error = f"Bot levels are {', '.join(bots.LEVELS)}."
+    elif not p['is_host']:
+        error = "Only the host can add bots."
+    elif room.game_active:
+        error = "Cannot add bots during a game."
+    else:
+        error = None
+    if error:
+        send_to(p, wire.error(error))
+        return
+    # walks the whole dictionary once; done here rather than in the bot's first turn
+    get_letter_graph()
+    bot = new_player(bots.NoOutbox())
+    bot['name'] = f"{level}-bot-{bot['id']}"
+    bot['bot'] = level
+    with lock:
+        players[bot['id']] = bot
+    if join_room(bot, room.name) is None:
+        with lock:
+            players.pop(bot['id'], None)
+        send_to(p, wire.error(f"Room {room.name} is full."))
+        return
+    bot['ready'] = True
+    bots.count("added")
+
+def dismiss_bots(room):
+    """Bots leave with the last human player."""
+    with room.lock:
+        members = list(room.players.values())
+    if any(o['bot'] is None for o in members):
+        return
+    for bot in members:
+        end_session(bot, bot['outbox'], "left")
+
+def handle_room_command(p, cmd, arg):
+    """ROOMS / CREATE <room> / JOIN <room>, before or after REGISTER."""
+    if cmd == "ROOMS":
+        if router is not None:
+            router.request_listing(p)
+            return
+        send_to(p, wire.rooms(rooms.list_rooms()))
+        return
+    if not valid_room_name(arg):
+        send_to(p, wire.error("Room names are 1-32 characters without spaces, ':' or ','."))
+        return
+    create = cmd == "CREATE"
+    if not p['ready']:
+        # remembered until REGISTER
+        p['room_choice'] = (arg, create)
+        send_to(p, wire.info(f"Room {arg} selected."))
+        return
+    room = p['room']
+    if room is not None and room.game_active:
+        send_to(p, wire.error("Cannot change rooms during a game."))
+        return
+    if room is not None and room.name == arg:
+        return
+    if router is not None:
+        # rooms may live in another worker; the coordinator places the client
+        raise Relocate(f"{cmd} {arg}", room.name if room else None)
+    target = rooms.get_room(arg)
+    if create and target is not None:
+        send_to(p, wire.error(f"Room {arg} already exists."))
+        return
+    if not create and target is None and arg != rooms.DEFAULT_ROOM:
+        send_to(p, wire.error(f"No room named {arg}."))
+        return
+    leave_room(p)
+    if join_room(p, arg, create) is None and join_room(p, rooms.DEFAULT_ROOM) is None:
+        p['ready'] = False
+
+def register(p, arg):
+    """REGISTER <name> [+bin] [+delta] [+resume] [+ping] [+state]"""
+    name, caps = wire.parse_register(arg)
+    if not name:
+        send_to(p, wire.error("Registration must include name."))
+        raise ValueError("Invalid registration format")
+    print(f"Received registration: {name}")
+    spectators.unwatch(p)
+    if "bin" in caps and not p['binary']:
+        p['send'](f"{wire.SWITCH}\n".encode())
+        p['binary'] = True
+    if "delta" in caps:
+        p['delta'] = True
+    if "resume" in caps:
+        p['resume'] = True
+    if "ping" in caps:
+        p['ping'] = True
+        p['seen'] = time.monotonic()
+        start_heartbeat()
+        probe(p)
+    if "state" in caps:
+        p['state'] = True
+    p['name'] = name
+    with lock:
+        players[p['id']] = p
+    if p['resume']:
+        p['token'] = SESSION_PREFIX + secrets.token_urlsafe(16)
+        with lock:
+            sessions[p['token']] = p
+        send_to(p, wire.session(p['token']))
+    room_name, create = p['room_choice']
+    if join_room(p, room_name, create) is not None:
+        p['ready'] = True
+
+def get_dictionary_pack():
+    """The dictionary packed for DICT; built when first asked for, so startup stays flat."""
+    global dictionary_pack
+    with build_lock:
+        if dictionary_pack is None:
+            dictionary_pack = dictcache.Pack(dictionary)
+        return dictionary_pack
+
+def get_letter_graph():
+    """The dictionary's LetterGraph; bots are rare, so it is built for the first one."""
+    global letter_graph
+    with build_lock:
+        if letter_graph is None:
+            letter_graph = wordindex.LetterGraph(dictionary)
+        return letter_graph
+
+def send_dictionary(p, arg):
+    """DICT: the dictionary's version; DICT GET: the compressed word list (see dictcache.py)."""
+    pack = get_dictionary_pack()
+    if arg == "GET":
+        p['send'](pack.data(p['binary']), "dictionary")
+    else:
+        dictcache.count("offers")
+        send_to(p, pack.offer)
+
+def watch(p, arg):
+    """WATCH <room> [+bin] [+delta]: follow a room's game without playing."""
+    name, caps = wire.parse_register(arg)
+    room = rooms.get_room(name)
+    if room is None:
+        send_to(p, wire.error(f"No room named {name}."))
+        return
+    spectators.unwatch(p)
+    if "bin" in caps and not p['binary']:
+        p['send'](f"{wire.SWITCH}\n".encode())
+        p['binary'] = True
+    if "delta" in caps:
+        p['delta'] = True
+    spectators.watch(room, p)
+
+def resume(p, arg):
+    """RESUME <token> <last seq>: continue a lost connection's session on this one.
 
-    # --- REGISTER ---
+    Returns the session's player record, which the connection uses from
+    now on, or None.
+    """
+    token, _, last = arg.partition(" ")
     try:
-        while True:
-            data = sock.recv(1024)
-            if not data:
-                raise ConnectionError()
-            for line in data.decode().splitlines():
-                if line.startswith("REGISTER "):
-                    name = line[9:].strip()
-                    if not name:
-                        sock.sendall(b"ERROR: Registration must include name.\n")
-                        raise ValueError("Invalid registration format")
-                    print(f"Received registration: {name}")
-                    with lock:
-                        players[idx].update({
-                            'name': name,
-                            'ready': True,
-                            'score': 0,
-                        })
-                        players[idx]['is_host'] = (idx == 0)
-                    broadcast(f"INFO Player {name} joined")
-                    if players[idx]['is_host']:
-                        sock.sendall(b"INFO You are the host.\n")
-                    break
+        last = int(last)
+    except ValueError:
+        last = 0
+    with lock:
+        old = sessions.get(token)
+        if old is not None:
+            previous = old['outbox']
+            old['send'], old['outbox'] = p['send'], p['outbox']
+            grace, old['grace'] = old['grace'], None
+            old['seen'] = time.monotonic()
+            # a new connection, maybe over another network
+            old['latency'] = latency.Estimator()
+    if old is None:
+        send_to(p, wire.error("Unknown or expired session."))
+        return None
+    if grace is not None:
+        grace.cancel()
+    # the old connection may not have noticed yet that it is gone
+    previous.abort()
+    print(f"Resumed session: {old['name']}")
+    if old['binary']:
+        old['send'](f"{wire.SWITCH}\n".encode())
+    send_to(old, wire.session(token))
+    if old['ping']:
+        probe(old)
+    room = old['room']
+    if room is None:
+        return old
+    with room.lock:
+        if last < room.events_lost:
+            send_to(old, wire.info("Some events were lost while you were away."))
+        for seq, frame in room.events:
+            if seq > last:
+                old['send'](wire.encode_event(frame, seq, old['binary'], True, old['state']))
+    send_scores(old)
+    if room.game_active and room.turn_player is old:
+        send_to(old, wire.prompt(room.current_letter))
+    return old
+
+def lose_connection(p, outbox, relocate=None):
+    """A connection ended: keep a "+resume" player in its room for RESUME_GRACE, or remove it."""
+    if p['outbox'] is not outbox:
+        # the session went on on another connection
+        return
+    room = p['room']
+    if relocate is None and p['resume'] and p['ready'] and room is not None:
+        with lock:
+            p['grace'] = scheduler.call_later(RESUME_GRACE, end_session, p, outbox)
+        # the game goes on without it until it resumes
+        skip_turn(room, p)
+        return
+    end_session(p, outbox, "left" if relocate else "disconnected")
+
+def end_session(p, outbox, reason="disconnected"):
+    with lock:
+        if p['outbox'] is not outbox:
+            # resumed meanwhile
+            return
+        sessions.pop(p['token'], None)
+        players.pop(p['id'], None)
+        p['grace'] = None
+    spectators.unwatch(p)
+    leave_room(p, reason)
+
+def handle_line(p, line):
+    """Dispatch one protocol line; after a RESUME returns the session's player record."""
+    cmd, _, arg = line.strip().partition(" ")
+    arg = arg.strip()
+    if cmd == "PONG":
+        p['seen'] = time.monotonic()
+        rtt = p['latency'].answered(arg)
+        if rtt is not None:
+            metrics.RTT.observe(rtt)
+    elif p['watching'] is not None and router is not None and cmd in ("CREATE", "JOIN", "REGISTER", "WATCH"):
+        # the room it asks for may live in another worker
+        spectators.unwatch(p)
+        raise Relocate(line)
+    elif cmd in ("ROOMS", "CREATE", "JOIN"):
+        handle_room_command(p, cmd, arg)
+    elif cmd == "DICT":
+        send_dictionary(p, arg)
+    elif not p['ready']:
+        # --- REGISTER / RESUME ---
+        if cmd == "REGISTER":
+            register(p, arg)
+        elif cmd == "RESUME":
+            return resume(p, arg) or p
+        elif cmd == "WATCH":
+            watch(p, arg)
+        elif p['watching'] is not None:
+            send_to(p, wire.error("Spectators cannot play."))
+    # --- START, CHAT, JSON from client ---
+    elif cmd == "START":
+        room = p['room']
+        error = None
+        with room.lock:
+            if not p['is_host']:
+                error = "Only the host can start the game."
+            elif room.game_active:
+                error = "Game already in progress."
+            elif sum(1 for o in room.players.values() if o['ready']) < 2:
+                error = "Need at least 2 players."
             else:
-                continue
-            break
+                room.game_active = True
+        if error:
+            send_to(p, wire.error(error))
+        else:
+            room_changed(room)
+            start_game(room)
+    elif cmd == "SCORES":
+        send_scores(p)
+    elif cmd == "BOT":
+        add_bot(p, arg)
+    elif line.startswith("CHAT "):
+        bucket = p['chat']
+        if bucket.take():
+            broadcast_chat(p['room'], p['name'], line[5:])
+        else:
+            chat.count("throttled")
+            if not bucket.warned:
+                bucket.warned = True
+                send_to(p, wire.error("You are sending messages too fast."))
+    elif line.startswith("{"):
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            return
+        if isinstance(msg, dict):
+            submit_move(p, msg)
 
-        # --- START, CHAT, JSON from client ---
+def begin_game(room):
+    with room.lock:
+        # reset state
+        room.current_cycle = 1
+        room.turns_in_cycle = 0
+        room.game_id = secrets.token_hex(6)
+        room.used_words = wordindex.UsedWords(dictionary)
+        room.current_letter = pick_letter(room)
+        for p in room.players.values():
+            p['score'] = 0
+    broadcast(room, wire.started(room.current_letter))
+    broadcast_scores(room)
+
+def next_player(room):
+    """The first player seated after the last turn's one, or None.
+
+    Players who left are gone from room.players and players whose
+    connection is lost (waiting for RESUME) are passed over, so neither
+    holds up the game.
+    """
+    with room.lock:
+        present = [o for o in room.players.values() if o['grace'] is None]
+    for o in present:
+        if o['seat'] > room.turn:
+            return o
+    return present[0] if present else None
+
+def finish_turn(room, p, msg, elapsed, trace=None):
+    """Score one answer (msg is None on timeout) and announce it; True when the game is won.
+
+    `trace` is a profiling.TurnTrace under --trace.
+    """
+    name = p['name']
+    word = ""
+    dead_end = None
+    if msg is None:
+        msg = {}
+        state = "timeout"
+        score_change = TIMEOUT_PENALTY
+    else:
+        word = str(msg.get("word", ""))
+        # the PROMPT and the answer each spent about half an RTT on the network
+        early = elapsed - p['latency'].credit() <= BONUS_TIME
+        t0 = time.perf_counter()
+        valid = validate_word(room, word, room.current_letter)
+        metrics.VALIDATE_WORD.observe(time.perf_counter() - t0)
+        if valid:
+            room.used_words.add(dictionary.lookup(word.lower()))
+            score_change = len(word) + (BONUS_POINTS if early else 0)
+            state = "bonus" if early else "accept"
+            room.current_letter = word[-1].lower()
+            if room.used_words.remaining(room.current_letter) == 0:
+                # nobody could answer; don't make the next player wait out the timer
+                dead_end = room.current_letter
+                room.current_letter = pick_letter(room)
+        else:
+            score_change = -1
+            state = "invalid"
+    if trace is not None:
+        trace.mark("validate")
+    p['score'] += score_change
+
+    # send JSON response
+    player_timestamp = msg.get("player_timestamp")  # Preserve player's timestamp
+    server_timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+    send_to(p, wire.result(room.current_cycle, name, word, state, score_change, p['score'],
+                           player_timestamp, server_timestamp))
+    if trace is not None:
+        trace.mark("score")
+    log_play_state(room, name, word, state, score_change, p['score'], player_timestamp, p['latency'])
+    if trace is not None:
+        trace.mark("log")
+
+    broadcast_word(room, name, word, score_change, state)
+    broadcast_scores(room)
+
+    if dead_end is not None and room.current_letter is not None:
+        broadcast(room, wire.info(f"No unused words start with '{dead_end}'. New letter: {room.current_letter}"))
+    if trace is not None:
+        trace.mark("broadcast")
+        trace.done(cycle=room.current_cycle, state=state, elapsed_ms=round(elapsed * 1000, 3))
+
+    # check winner
+    if p['score'] >= WIN_SCORE:
+        end_game(room, p)
+        return True
+    if room.current_letter is None:
+        broadcast(room, wire.info("The dictionary is exhausted."))
+        with room.lock:
+            leader = max(room.players.values(), key=lambda o: o['score'], default=p)
+        end_game(room, leader)
+        return True
+
+    # update current cycle
+    room.turns_in_cycle += 1
+    if room.turns_in_cycle >= len(room.players):
+        room.current_cycle += 1
+        room.turns_in_cycle = 0
+    return False
+
+def end_game(room, winner):
+    with room.lock:
+        pairs = [(winner['name'], winner['score'])]
+        for o in room.players.values():
+            if o is not winner:
+                pairs.append((o['name'], o['score']))
+    broadcast(room, wire.endgame(pairs))
+
+# --- turn state machine ---
+# A game is driven by two events: submit_move() when the current player
+# answers and turn_expired() when the turn's scheduler timer runs out.
+# Both run under room.turn_lock, from client threads and the timer thread
+# (or the event loop in the asyncio engine).
+
+def start_game(room):
+    with room.turn_lock:
+        begin_game(room)
+        room.turn = -1
+        start_turn(room)
+
+def start_turn(room):
+    """Prompt the next player and arm the turn timer."""
+    p = next_player(room)
+    if p is None:
+        stop_game(room)
+        return
+    room.turn = p['seat']
+    room.turn_seq += 1
+    room.turn_player = p
+    room.turn_started = time.monotonic()
+    room.turn_timer = scheduler.call_later(TIMEOUT_SEC, turn_expired, room, room.turn_seq)
+    send_to(p, wire.prompt(room.current_letter))
+    if p['bot'] is not None:
+        scheduler.call_later(bots.think_time(p['bot']), bot_move, room, p, room.turn_seq)
+
+def bot_move(room, p, seq):
+    """A bot's think time is over: answer, unless its turn already ended."""
+    if room.turn_seq != seq or room.turn_player is not p:
+        return
+    t0 = time.perf_counter()
+    word = bots.choose_word(get_letter_graph(), dictionary, room.used_words, room.current_letter, p['bot'])
+    metrics.BOT_MOVE.observe(time.perf_counter() - t0)
+    submit_move(p, {"word": word or "", "player": p['name']})
+
+def submit_move(p, msg):
+    room = p['room']
+    if room is None:
+        return
+    trace = profiling.begin_turn(room, p)
+    with room.turn_lock:
+        if not room.game_active or room.turn_player is not p:
+            send_to(p, wire.error("It is not your turn."))
+            return
+        room.turn_timer.cancel()
+        metrics.TURN_LATENCY.observe(time.monotonic() - room.turn_started)
+        if trace is not None:
+            trace.mark("receive")
+        end_turn(room, p, msg, trace)
+
+def turn_expired(room, seq):
+    with room.turn_lock:
+        # the move may have won the race for the lock
+        if room.game_active and room.turn_seq == seq:
+            p = room.turn_player
+            trace = profiling.begin_turn(room, p)
+            if trace is not None:
+                trace.mark("receive")
+            end_turn(room, p, None, trace)
+
+def end_turn(room, p, msg, trace=None):
+    room.turn_player = None
+    if finish_turn(room, p, msg, time.monotonic() - room.turn_started, trace):
+        stop_game(room)
+        return
+    start_turn(room)
+
+def skip_turn(room, p):
+    """Pass the turn on right away if `p` holds it and has left or lost its connection."""
+    with room.turn_lock:
+        if not room.game_active or room.turn_player is not p:
+            return
+        room.turn_timer.cancel()
+        room.turn_player = None
+        broadcast(room, wire.info(f"Skipping {p['name']}'s turn."))
+        start_turn(room)
+
+def stop_game(room):
+    room.turn_player = None
+    room.game_active = False
+    room_changed(room)
+
+# --- heartbeats ---
+
+def start_heartbeat():
+    global heartbeat_timer
+    with lock:
+        if heartbeat_timer is None and PING_INTERVAL > 0:
+            heartbeat_timer = scheduler.call_later(PING_INTERVAL, heartbeat)
+
+def heartbeat():
+    """PING every "+ping" player; close connections that stopped answering."""
+    global heartbeat_timer
+    now = time.monotonic()
+    n = next(pings)
+    frame = wire.ping(n)
+    with lock:
+        targets = [p for p in players.values() if p['ping'] and p['grace'] is None]
+        heartbeat_timer = scheduler.call_later(PING_INTERVAL, heartbeat)
+    for p in targets:
+        if now - p['seen'] > PING_INTERVAL * PING_MISSES:
+            print(f"No PONG from {p['name']}; closing the connection.")
+            p['outbox'].abort()
+        else:
+            p['latency'].sent(n)
+            send_to(p, frame)
+
+def probe(p):
+    """PING one player now, for a first RTT sample before the next heartbeat."""
+    if PING_INTERVAL <= 0:
+        return
+    n = next(pings)
+    p['latency'].sent(n)
+    send_to(p, wire.ping(n))
+
+def latency_samples():
+    with lock:
+        rtts = [p['latency'].rtt for p in players.values() if p['latency'].rtt is not None]
+    return [
+        ("wordchain_rtt_players", "gauge", "Players with a measured RTT.", len(rtts)),
+        ("wordchain_rtt_smoothed_mean_seconds", "gauge", "Mean of the players' smoothed RTTs.",
+         sum(rtts) / len(rtts) if rtts else 0),
+        ("wordchain_rtt_smoothed_max_seconds", "gauge", "Largest smoothed RTT of a player.", max(rtts, default=0)),
+    ]
+
+metrics.collectors.append(latency_samples)
+
+def handle_client(sock, attach=None):
+    """Serve one connection; `attach` carries state handed over by the prefork coordinator."""
+    global connections
+    outbox = outbound.ThreadOutbox(sock)
+    p = new_player(outbox)
+    reader = inbound.LineReader(lambda msg: send_to(p, wire.error(msg)))
+    lines = []
+    relocate = None
+    try:
+        if attach is not None:
+            lines = router.attach(p, attach, reader)
         while True:
-            data = sock.recv(1024)
+            while lines:
+                p = handle_line(p, lines.pop(0)) or p
+            data = sock.recv(inbound.RECV_SIZE)
             if not data:
                 raise ConnectionError()
-            for line in data.decode().splitlines():
-                if line.strip() == "START":
-                    with lock:
-                        if not players[idx]['is_host']:
-                            sock.sendall(b"ERROR: Only the host can start the game.\n")
-                        elif game_active:
-                            sock.sendall(b"ERROR: Game already in progress.\n")
-                        else:
-                            ready_cnt = sum(1 for p in players if p['ready'])
-                            if ready_cnt < 2:
-                                sock.sendall(b"ERROR: Need at least 2 players.\n")
-                            else:
-                                game_active = True
-                                threading.Thread(target=game_loop, daemon=True).start()
-                elif line.startswith("CHAT "):
-                    broadcast_chat(players[idx]['name'], line[5:])
-                elif line.startswith("{"):
-                    try:
-                        msg = json.loads(line)
-                        q.put(msg)
-                    except:
-                        pass
-
-    except:
+            lines = reader.feed(data)
+    except Relocate as r:
+        relocate = r
+    except (OSError, ValueError):
+        pass
+    finally:
         # Handle disconnection
+        lose_connection(p, outbox, relocate)
         with lock:
-            pname = players[idx].get('name', '')
-            broadcast(f"INFO Player {pname} disconnected")
-            del players[idx]
-            del player_queues[idx]
-        broadcast_scores()
+            connections -= 1
+        if router is not None:
+            if relocate:
+                # everything queued must reach the client before the socket moves on
+                outbox.flush()
+            router.release(p, sock, relocate, lines, reader)
+        outbox.close()
         sock.close()
 
-def game_loop():
-    """Main thread game loop."""
-    global current_letter, current_cycle, game_active
-    with lock:
-        # reset state
-        current_cycle = 1
-        turns_in_cycle = 0
-        used_words.clear()
-    current_letter = random.choice(string.ascii_lowercase)
-    broadcast(f"INFO Game starting! First letter: {current_letter}")
-
-    turn = 0
-    while True:
-        with lock:
-            if turn >= len(players):
-                break
-            p = players[turn]
-        sock = p['socket']
-        name = p['name']
-        sock.sendall(f"PROMPT {current_letter}\n".encode())
-
-        start_t = time.time()
-        state = "invalid"
-        score_change = 0
-        word = ""
-
-        # waiting JSON from queue
-        try:
-            msg = player_queues[turn].get(timeout=TIMEOUT_SEC)
-            word = msg.get("word", "")
-            early = (time.time() - start_t) <= BONUS_TIME
-            duplicate = used_words and used_words[-1].lower() == word.lower()
-
-            if validate_word(word, current_letter) and not duplicate:
-                used_words.append(word.lower())
-                score_change = len(word) + (BONUS_POINTS if early else 0)
-                state = "bonus" if early else "accept"
-                p['score'] += score_change
-                current_letter = word[-1].lower()
-            else:
-                score_change = -1
-                state = "invalid"
-                p['score'] += score_change
-        except queue.Empty:
-            # timeout
-            state = "timeout"
-            score_change = TIMEOUT_PENALTY
-            p['score'] += score_change
-
-        # send JSON response
-        resp = {
-                "Cycle": str(current_cycle),
-                "player": name,
-                "word": word,
-                "player_timestamp": msg.get("player_timestamp"),  # Preserve player's timestamp
-                "server_timestamp": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
-                "state": state,
-                "score_change": score_change,
-                "current_score": p['score']
-            }
-        sock.sendall((json.dumps(resp) + "\n").encode())
-        log_play_state(name, word, state, score_change, p['score'])
-
-        broadcast_word(name, word, score_change)
-        broadcast_scores()
-
-        # check winner
-        if p['score'] >= WIN_SCORE:
-            with lock:
-                parts = [f"{p['name']}: {p['score']}"]
-                for o in players:
-                    if o is not p:
-                        parts.append(f"{o['name']}: {o['score']}")
-            broadcast("ENDGAME " + ",".join(parts))
-            break
-
-        # update current turn and cycle
-        turns_in_cycle += 1
-        if turns_in_cycle == len(players):
-            current_cycle += 1
-            turns_in_cycle = 0
-
-        # next turn
-        with lock:
-            turn = (turn + 1) % len(players)
-
-    game_active = False
-
-def accept_loop():
+def accept_loop(port=PORT):
+    global connections
     load_dictionary()
     srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    srv.bind(('', PORT))
-    srv.listen(MAX_PLAYERS)
-    print(f"Server listening on port {PORT}...")
+    srv.bind(('', port))
+    srv.listen(socket.SOMAXCONN)
+    print(f"Server listening on port {port}...")
 
     while True:
         cli, addr = srv.accept()
         with lock:
-            if len(players) >= MAX_PLAYERS:
+            if connections >= MAX_CONNECTIONS:
                 cli.sendall(b"INFO Server full.\n")
                 cli.close()
                 continue
-            idx = len(players)
-            players.append({
-                'socket': cli,
-                'name': "",
-                'is_host': False,
-                'score': 0,
-                'ready': False
-            })
-        threading.Thread(target=handle_client, args=(cli, idx), daemon=True).start()
+            connections += 1
+        threading.Thread(target=handle_client, args=(cli,), daemon=True).start()
+
+def main():
+    global MAX_PLAYERS, MAX_CONNECTIONS, JSON_FILE, METRICS_PORT, RESUME_GRACE, PING_INTERVAL
+    parser = argparse.ArgumentParser(description="Networked word chain game server")
+    parser.add_argument("--engine", choices=("thread", "asyncio"), default="thread",
+                        help="thread: one thread per client (default); "
+                             "asyncio: one event loop, one coroutine per client")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-players", type=int, default=MAX_PLAYERS, help="players per room")
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS)
+    parser.add_argument("--outbox-limit", type=int, default=outbound.OUTBOX_LIMIT,
+                        help="frames queued per client before the overflow policy applies")
+    parser.add_argument("--overflow-policy", type=outbound.parse_policy, default={},
+                        help="e.g. chat=drop,scores=coalesce,default=disconnect")
+    parser.add_argument("--chat-rate", type=float, default=chat.RATE, help="chat messages per second per player")
+    parser.add_argument("--chat-burst", type=int, default=chat.BURST, help="chat messages a player may send at once")
+    parser.add_argument("--chat-flush-ms", type=float, default=chat.FLUSH_MS,
+                        help="how long chat is collected before it is sent to the room")
+    parser.add_argument("--max-line", type=int, default=inbound.MAX_LINE,
+                        help="longest accepted client line in bytes")
+    parser.add_argument("--log-file", default=JSON_FILE)
+    parser.add_argument("--log-rotate-mb", type=float, default=gamelog.ROTATE_BYTES / 2**20,
+                        help="rotate the game log at this size (0: never)")
+    parser.add_argument("--log-rotate-daily", action="store_true", help="also rotate at UTC midnight")
+    parser.add_argument("--log-fsync", action="store_true", help="fsync after every log flush")
+    parser.add_argument("--resume-grace", type=float, default=RESUME_GRACE,
+                        help="seconds a disconnected +resume player keeps its place")
+    parser.add_argument("--ping-interval", type=float, default=PING_INTERVAL,
+                        help="seconds between heartbeats to +ping clients (0: off)")
+    parser.add_argument("--rtt-credit", type=float, default=latency.MAX_CREDIT,
+                        help="seconds of measured RTT at most taken off an answer's time for the bonus (0: none)")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="serve Prometheus metrics on 127.0.0.1:PORT/metrics (0: off)")
+    parser.add_argument("--profile", nargs="?", const=profiling.PROFILE_FILE, metavar="FILE",
+                        help="sample all thread stacks into a collapsed-stack file (flame graphs)")
+    parser.add_argument("--profile-hz", type=int, default=profiling.HZ, help="stack samples per second")
+    parser.add_argument("--trace", nargs="?", const=profiling.TRACE_FILE, metavar="FILE",
+                        help="write per-turn timing spans as JSON lines")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="pre-fork this many worker processes (thread engine); "
+                             "each room is pinned to one worker")
+    args = parser.parse_args()
+    MAX_PLAYERS = args.max_players
+    MAX_CONNECTIONS = args.max_connections
+    outbound.OUTBOX_LIMIT = args.outbox_limit
+    outbound.OVERFLOW_POLICY.update(args.overflow_policy)
+    inbound.MAX_LINE = args.max_line
+    chat.RATE = args.chat_rate
+    chat.BURST = args.chat_burst
+    chat.FLUSH_MS = args.chat_flush_ms
+    JSON_FILE = args.log_file
+    gamelog.ROTATE_BYTES = int(args.log_rotate_mb * 2**20)
+    gamelog.ROTATE_DAILY = args.log_rotate_daily
+    gamelog.FSYNC = args.log_fsync
+    METRICS_PORT = args.metrics_port
+    RESUME_GRACE = args.resume_grace
+    PING_INTERVAL = args.ping_interval
+    latency.MAX_CREDIT = args.rtt_credit
+    profiling.HZ = args.profile_hz
+    profiling.PROFILE_FILE = args.profile
+    profiling.TRACE_FILE = args.trace
+    # SIGTERM exits through atexit so the game log is drained (the asyncio
+    # engine replaces this with a handler that stops its loop)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    if args.workers > 1:
+        import prefork
+        prefork.accept_loop(args.port, args.workers)
+        return
+    if METRICS_PORT:
+        metrics.serve(METRICS_PORT)
+    if args.profile or args.trace:
+        profiling.start(args.profile, args.profile_hz, args.trace)
+        atexit.register(profiling.stop)
+    if args.engine == "asyncio":
+        import async_server
+        async_server.accept_loop(args.port)
+    else:
+        accept_loop(args.port)
 
 if __name__ == "__main__":
-    accept_loop()
+    # run as the importable `server` module so the other engines see these settings
+    import server
+    server.main()
@@ -0,0 +1,135 @@
+"""Read-only spectators and the fan-out that feeds them.
+
+A connection that sends WATCH <room> instead of REGISTER is put into
+room.spectators. It never gets a PROMPT and cannot play or chat. It
+receives the room's INFO, scoreboard and ENDGAME frames. server.py
+publishes every room event here when the room has spectators. The
+events go through one queue to a fan-out thread, so the turn that
+produced them only pays for a queue put. The thread takes whatever has
+queued up, encodes each event once per encoding, joins the events of a
+room into one buffer per encoding and hands that same bytes object to
+every spectator's outbox.
+
+A new spectator is added by the fan-out thread itself, between two
+batches. It gets a STATE frame and the scoreboard first, then every
+event published after that.
+"""
+import queue
+import threading
+import traceback
+
+import wire
+
+
+BATCH = 256         # events the fan-out thread takes at once
+
+pending = queue.SimpleQueue()   # (room, frame, delta frame) events and (room, None, player) joins
+start_lock = threading.Lock()
+thread = None
+
+stats_lock = threading.Lock()
+totals = {"spectators": 0, "watches": 0, "events": 0, "batches": 0, "writes": 0}
+
+def count(key, n=1):
+    with stats_lock:
+        totals[key] += n
+
+def snapshot():
+    """Spectators watching now; watches, events, fan-out batches and outbox writes so far."""
+    with stats_lock:
+        return dict(totals)
+
+def start():
+    global thread
+    with start_lock:
+        if thread is None:
+            thread = threading.Thread(target=run, name="spectators", daemon=True)
+            thread.start()
+
+def watch(room, p):
+    """Add `p` to the room's audience, after the events already queued."""
+    count("watches")
+    p['watching'] = room
+    start()
+    pending.put((room, None, p))
+
+def unwatch(p):
+    room = p['watching']
+    if room is None:
+        return
+    with room.lock:
+        p['watching'] = None
+        left = room.spectators.pop(p['id'], None) is not None
+    if left:
+        count("spectators", -1)
+
+def publish(room, frame):
+    """Queue a room event for its spectators."""
+    if room.spectators:
+        pending.put((room, frame, frame))
+
+def publish_scores(room, full, delta):
+    """Queue SCORES for spectators, and `delta` (or nothing, if None) for "+delta" ones."""
+    if room.spectators:
+        pending.put((room, full, delta))
+
+def run():
+    while True:
+        batch = [pending.get()]
+        try:
+            while len(batch) < BATCH:
+                batch.append(pending.get_nowait())
+        except queue.Empty:
+            pass
+        count("batches")
+        try:
+            fan_out(batch)
+        except Exception:
+            traceback.print_exc()
+
+def fan_out(batch):
+    events = []     # consecutive events of one room
+    for item in batch:
+        if events and (item[1] is None or item[0] is not events[0][0]):
+            send(events)
+            events = []
+        if item[1] is None:
+            add(item[0], item[2])
+        else:
+            events.append(item)
+    if events:
+        send(events)
+
+def add(room, p):
+    with room.lock:
+        if p['watching'] is not room:
+            # gone before its turn came
+            return
+        room.spectators[p['id']] = p
+        turn = room.turn_player
+        letter = room.current_letter if room.game_active else None
+        frames = [wire.state(room.name, room.status(), room.current_cycle, letter or "",
+                             turn['name'] if turn is not None else "")]
+        if p['delta']:
+            frames.append(wire.score_snapshot(room.score_seq, list(room.scoreboard.items())))
+        else:
+            frames.append(wire.scores([(o['name'], o['score']) for o in room.players.values()]))
+    count("spectators")
+    p['send'](b"".join([f.encode(p['binary']) for f in frames]), "spectate")
+
+def send(events):
+    room = events[0][0]
+    with room.lock:
+        targets = list(room.spectators.values())
+    count("events", len(events))
+    if not targets:
+        return
+    data = {}
+    for p in targets:
+        key = (p['binary'], p['delta'])
+        if key not in data:
+            frames = [e[2] if p['delta'] else e[1] for e in events]
+            data[key] = b"".join([f.encode(p['binary']) for f in frames if f is not None])
+        if data[key]:
+            p['send'](data[key], "spectate")
+    count("writes", len(targets))
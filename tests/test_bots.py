@@ -0,0 +1,56 @@
+import random
+
+import bots
+import wordindex
+
+
+WORDS = ["ant", "tiger", "tart", "rat", "tea", "apple", "eat", "trot"]
+
+def test_letter_graph_groups_by_first_and_last_letter():
+    index = wordindex.WordIndex(WORDS)
+    graph = wordindex.LetterGraph(index)
+    assert {index.word(i) for i in graph.targets("t")["t"]} == {"tart", "trot"}
+    assert graph.count("t", "r") == 1
+    assert graph.count("t", "a") == 1
+    assert graph.count("q", "a") == 0
+    assert graph.targets("q") == {}
+    assert sum(len(ids) for first in "atre" for ids in graph.targets(first).values()) == len(WORDS)
+
+def test_choose_word_only_plays_unused_words(monkeypatch):
+    monkeypatch.setitem(bots.LEVELS, "hard", ((0, 0), 0.0))
+    index = wordindex.WordIndex(WORDS)
+    graph = wordindex.LetterGraph(index)
+    used = wordindex.UsedWords(index)
+    played = []
+    while True:
+        word = bots.choose_word(graph, index, used, "t", "hard")
+        if word is None:
+            break
+        assert word.startswith("t") and word not in played
+        played.append(word)
+        used.add(index.lookup(word))
+    assert sorted(played) == ["tart", "tea", "tiger", "trot"]
+
+def test_hard_bot_leaves_the_fewest_words():
+    index = wordindex.WordIndex(WORDS)
+    graph = wordindex.LetterGraph(index)
+    used = wordindex.UsedWords(index)
+    random.seed(1)
+    # from "a": "ant" leaves the opponent four t-words, "apple" one e-word
+    for _ in range(20):
+        assert bots.choose_word(graph, index, used, "a", "hard") == "apple"
+
+def test_a_miss_is_not_a_word(monkeypatch):
+    monkeypatch.setitem(bots.LEVELS, "easy", ((0, 0), 1.0))
+    index = wordindex.WordIndex(WORDS)
+    word = bots.choose_word(wordindex.LetterGraph(index), index, wordindex.UsedWords(index), "a", "easy")
+    assert word == "a" + bots.MISS and word not in index
+
+def test_graph_is_built_for_the_first_bot(tmp_path):
+    import server
+    src = tmp_path / "words.txt"
+    src.write_text("\n".join(WORDS))
+    server.load_dictionary(str(src))
+    assert server.letter_graph is None
+    graph = server.get_letter_graph()
+    assert graph is server.get_letter_graph() and graph.count("t", "t") == 2
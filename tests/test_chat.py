@@ -0,0 +1,63 @@
+import chat
+import gameclient
+import rooms
+import wire
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def test_bucket_allows_a_burst_then_the_rate(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(chat.time, "monotonic", clock)
+    bucket = chat.TokenBucket(rate=2, burst=3)
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+    clock.now += 0.25
+    assert not bucket.take()
+    clock.now += 0.25
+    assert bucket.take() and not bucket.take()
+    clock.now += 60
+    assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+
+def test_warning_resets_after_an_accepted_message(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(chat.time, "monotonic", clock)
+    bucket = chat.TokenBucket(rate=1, burst=1)
+    bucket.take()
+    assert not bucket.take()
+    bucket.warned = True
+    clock.now += 1
+    assert bucket.take() and not bucket.warned
+
+def test_messages_in_one_window_go_out_as_one_write(monkeypatch):
+    timers = []
+    monkeypatch.setattr(chat.scheduler, "call_later", lambda delay, fn, *args: timers.append((fn, args)))
+    room = rooms.Room("lobby", 8)
+    received = {}
+    for i, binary in enumerate((False, True)):
+        received[binary] = []
+        room.players[i] = {'binary': binary, 'resume': False,
+                           'send': lambda data, kind, out=received[binary]: out.append((data, kind))}
+    before = chat.snapshot()
+    chat.post(room, wire.chat("alice", "hi"))
+    chat.post(room, wire.chat("bob", "hello"))
+    assert len(timers) == 1
+    fn, args = timers.pop()
+    fn(*args)
+    fn(*args)       # nothing left: nothing sent
+    expected = [gameclient.Chat("alice", "hi"), gameclient.Chat("bob", "hello")]
+    for binary, out in received.items():
+        assert len(out) == 1 and out[0][1] == "chat"
+        framer = gameclient.LineFramer()
+        framer.feed((wire.SWITCH.encode() + b"\n" if binary else b"") + out[0][0])
+        assert [gameclient.to_event(item) for item in framer.lines()] == expected
+    after = chat.snapshot()
+    assert after["messages"] - before["messages"] == 2
+    assert after["flushes"] - before["flushes"] == 1
+    assert after["coalesced"] - before["coalesced"] == 1
+    chat.post(room, wire.chat("alice", "again"))
+    assert len(timers) == 1
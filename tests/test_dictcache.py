@@ -0,0 +1,146 @@
+import pytest
+
+import dictcache
+import gameclient
+import wire
+import wordindex
+
+
+WORDS = ["apple", "banana", "bandana", "band", "cherry", "egg"]
+
+def frame_event(frame, binary):
+    if binary:
+        data = frame.encode(True)
+        return gameclient.parse_frame(data[2], data[3:])
+    return gameclient.parse_line(frame.encode().decode())
+
+def download(pack, binary):
+    conn = gameclient.Commands()
+    events = []
+    for frame in pack.frames:
+        event = conn.receive(frame_event_item(frame, binary))
+        if event is not None:
+            events.append(event)
+    return events
+
+def frame_event_item(frame, binary):
+    if binary:
+        data = frame.encode(True)
+        return (data[2], data[3:])
+    return frame.encode().decode().rstrip("\n")
+
+@pytest.fixture
+def pack():
+    return dictcache.Pack(wordindex.WordIndex(WORDS))
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_download_round_trip(pack, binary, tmp_path):
+    events = download(pack, binary)
+    assert len(events) == 1 and isinstance(events[0], gameclient.DictionaryData)
+    dictcache.store(pack.version, events[0].data, str(tmp_path))
+    local = dictcache.LocalDictionary(pack.version, str(tmp_path))
+    assert local.cached()
+    assert local.load().words == sorted(WORDS)
+
+def test_chunks(monkeypatch):
+    monkeypatch.setattr(dictcache, "CHUNK", 16)
+    pack = dictcache.Pack(wordindex.WordIndex(WORDS + [f"w{i}" for i in range(200)]))
+    assert len(pack.frames) > 1
+    events = download(pack, True)
+    assert [type(e) for e in events] == [gameclient.DictionaryData]
+
+def test_version_is_the_word_list():
+    a = dictcache.Pack(wordindex.WordIndex(WORDS))
+    b = dictcache.Pack(wordindex.WordIndex(reversed(WORDS)))
+    c = dictcache.Pack(wordindex.WordIndex(WORDS + ["fig"]))
+    assert a.version == b.version != c.version
+
+def test_compiled_dictionary_has_the_same_version(tmp_path):
+    src = tmp_path / "words.txt"
+    src.write_text("\n".join(WORDS))
+    wordindex.compile_dictionary(str(src), str(tmp_path / "words.bin"))
+    mapped = wordindex.MappedIndex(str(tmp_path / "words.bin"))
+    assert dictcache.Pack(mapped).version == dictcache.Pack(wordindex.WordIndex(WORDS)).version
+
+def test_store_rejects_a_mismatch(pack, tmp_path):
+    blob = b"".join(f.fields[2] for f in pack.frames)
+    with pytest.raises(ValueError):
+        dictcache.store("0" * dictcache.VERSION_DIGITS, blob, str(tmp_path))
+    with pytest.raises(ValueError):
+        dictcache.store(pack.version, blob[:-3], str(tmp_path))
+    assert not dictcache.LocalDictionary(pack.version, str(tmp_path)).cached()
+
+def test_out_of_order_chunk_is_an_error():
+    conn = gameclient.Commands()
+    event = conn.receive(frame_event_item(wire.dictionary_data(1, 2, b"x"), False))
+    assert isinstance(event, gameclient.Error)
+
+def test_check(tmp_path, pack):
+    dictcache.store(pack.version, b"".join(f.fields[2] for f in pack.frames), str(tmp_path))
+    local = dictcache.LocalDictionary(pack.version, str(tmp_path))
+    assert local.check("Banana", "b") is None
+    assert "does not start" in local.check("apple", "b")
+    assert "already played" in local.check("band", "b", {"band"})
+    assert "not in the dictionary" in local.check("bxz", "b")
+    assert local.completions("Band", 5) == ["band", "bandana"]
+
+def test_check_without_a_cached_dictionary(tmp_path):
+    local = dictcache.LocalDictionary("feedfacefeedface", str(tmp_path))
+    assert not local.cached()
+    # only what needs no dictionary is checked
+    assert local.check("bxz", "b") is None
+    assert "does not start" in local.check("bxz", "a")
+    assert local.completions("b") == []
+
+@pytest.mark.parametrize("binary", [False, True])
+@pytest.mark.parametrize("state", ["accept", "bonus", "invalid", "timeout"])
+def test_played_carries_the_state(binary, state):
+    frame = wire.played("bob", "apple", -1 if state == "invalid" else 5, state)
+    data = frame.encode(binary, state=True)
+    if binary:
+        event = gameclient.parse_frame(data[2], data[3:])
+    else:
+        event = gameclient.parse_line(data.decode())
+    assert event == gameclient.Played("bob", "apple", -1 if state == "invalid" else 5, state)
+    # text clients that did not ask for it get the original line
+    assert frame_event(frame, False).state is None
+
+def test_played_from_an_older_server():
+    # only accepted words may go into the client's used-words set; without a state none are known
+    assert gameclient.parse_line("INFO bob played 'apple' (+5 points)") == gameclient.Played("bob", "apple", 5, None)
+    old = wire.PACK[wire.PLAYED]("bob", "apple", 5, "accept")[:-1]
+    assert gameclient.parse_frame(wire.PLAYED, old) == gameclient.Played("bob", "apple", 5, None)
+
+def test_pack_streams_in_batches(monkeypatch):
+    words = sorted(WORDS + [f"w{i}" for i in range(11)])
+    whole = dictcache.Pack(wordindex.WordIndex(words))
+    monkeypatch.setattr(dictcache, "BATCH", 3)
+    batched = dictcache.Pack(wordindex.WordIndex(words))
+    assert batched.version == whole.version == dictcache.version_of("\n".join(words).encode())
+    assert b"".join(f.fields[2] for f in batched.frames) == b"".join(f.fields[2] for f in whole.frames)
+
+def test_server_packs_on_the_first_request(tmp_path, monkeypatch):
+    import server
+    src = tmp_path / "words.txt"
+    src.write_text("\n".join(WORDS))
+    monkeypatch.setattr(server, "dictionary_pack", None)
+    server.load_dictionary(str(src))
+    assert server.dictionary_pack is None
+    pack = server.get_dictionary_pack()
+    assert pack is server.get_dictionary_pack()
+    assert pack.version == dictcache.Pack(wordindex.WordIndex(WORDS)).version
+
+def test_server_sends_the_state_to_clients_that_ask():
+    import rooms
+    import server
+    room = rooms.Room("lobby", 8)
+    received = {}
+    for i, (binary, state) in enumerate([(False, False), (False, True), (True, False)]):
+        out = received[binary, state] = []
+        room.players[i] = {'binary': binary, 'resume': False, 'state': state,
+                           'send': lambda data, kind="default", out=out: out.append(data)}
+    server.broadcast_word(room, "bob", "apple", 5, "accept")
+    assert received[False, False] == [b"INFO bob played 'apple' (+5 points)\n"]
+    assert received[False, True] == [b"INFO bob played 'apple' (+5 points) [accept]\n"]
+    data = received[True, False][0]
+    assert gameclient.parse_frame(data[2], data[3:]).state == "accept"
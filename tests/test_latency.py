@@ -0,0 +1,77 @@
+import pytest
+
+import latency
+
+
+class Clocks:
+    """Stands in for time.monotonic and time.time."""
+
+    def __init__(self):
+        self.mono = 50.0
+        self.wall = 1_700_000_000.0
+
+    def monotonic(self):
+        return self.mono
+
+    def time(self):
+        return self.wall
+
+    def advance(self, seconds):
+        self.mono += seconds
+        self.wall += seconds
+
+@pytest.fixture
+def clocks(monkeypatch):
+    clocks = Clocks()
+    monkeypatch.setattr(latency, "time", clocks)
+    return clocks
+
+def ping(est, clocks, n, rtt, skew_ms=0.0):
+    """One PING/PONG round trip; the client's clock is `skew_ms` ahead."""
+    est.sent(n)
+    clocks.advance(rtt / 2)
+    client_ms = clocks.wall * 1000 + skew_ms
+    clocks.advance(rtt / 2)
+    return est.answered(f"{n} {client_ms:.0f}")
+
+def test_first_sample(clocks):
+    est = latency.Estimator()
+    assert est.credit() == 0.0
+    assert est.fields() == {"rtt_ms": None, "clock_offset_ms": None}
+    assert ping(est, clocks, 1, 0.1, skew_ms=250) == pytest.approx(0.1)
+    assert est.rtt == pytest.approx(0.1) and est.rttvar == pytest.approx(0.05)
+    assert est.fields() == {"rtt_ms": 100.0, "clock_offset_ms": 250.0}
+
+def test_smoothing(clocks):
+    est = latency.Estimator()
+    ping(est, clocks, 1, 0.1)
+    ping(est, clocks, 2, 0.18)
+    assert est.rtt == pytest.approx(0.1 + latency.ALPHA * 0.08)
+    assert est.rttvar == pytest.approx(0.05 + latency.BETA * (0.08 - 0.05))
+    for n in range(3, 60):
+        ping(est, clocks, n, 0.18, skew_ms=-40)
+    assert est.rtt == pytest.approx(0.18, abs=1e-3)
+    assert est.offset == pytest.approx(-40, abs=1)
+
+def test_stale_and_bad_answers(clocks):
+    est = latency.Estimator()
+    before = latency.snapshot()["stale"]
+    assert est.answered("1") is None        # nothing sent
+    est.sent(1)
+    est.sent(2)
+    assert est.answered("1") is None        # answers an older PING
+    assert est.answered("") is None
+    clocks.advance(0.05)
+    assert est.answered("2 not-a-clock") == pytest.approx(0.05)
+    assert est.offset is None
+    assert est.answered("2") is None        # answered already
+    assert latency.snapshot()["stale"] - before == 4
+
+def test_credit_is_capped(clocks, monkeypatch):
+    est = latency.Estimator()
+    ping(est, clocks, 1, 0.3)
+    assert est.credit() == pytest.approx(0.3)
+    monkeypatch.setattr(latency, "MAX_CREDIT", 0.2)
+    assert est.credit() == 0.2
+    monkeypatch.setattr(latency, "MAX_CREDIT", 0)
+    assert est.credit() == 0
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+import logstore
+
+
+def entry(cycle, player, word, state, points, score, ts, sent=None, room="lobby", game="g1", rtt=None):
+    e = {"Cycle": str(cycle), "room": room, "game": game, "player": player, "word": word,
+         "player_timestamp": sent, "server_timestamp": ts, "state": state,
+         "score_change": points, "current_score": score}
+    if rtt is not None:
+        e.update(rtt_ms=rtt, clock_offset_ms=-3.5)
+    return e
+
+ENTRIES = [
+    entry(1, "alice", "apple", "accept", 5, 5, "2026-01-02T10:00:01.000Z", "2026-01-02T10:00:00.900Z", rtt=42.5),
+    entry(1, "bob", "egg", "bonus", 4, 4, "2026-01-02T10:00:05.000Z", "2026-01-02T10:00:04.990Z"),
+    entry(1, "carol", "xx", "invalid", 0, 0, "2026-01-02T10:00:06.000Z", room="fast", game="g2"),
+    entry(2, "alice", "", "timeout", 0, 5, "2026-01-02T10:00:40.000Z"),
+    entry(2, "bob", "grape", "accept", 5, 9, "2026-01-02T10:00:44.000Z", "2026-01-02T10:00:43.000Z"),
+    entry(2, "carol", "éclair", "accept", 6, 6, "2026-01-02T10:00:46.000Z", room="fast", game="g2"),
+]
+
+@pytest.fixture
+def store(tmp_path):
+    src = tmp_path / "game_log.20260102-100000.json"
+    lines = [json.dumps(e) for e in ENTRIES]
+    lines.insert(2, "not json")
+    lines.insert(4, json.dumps({"Cycle": "1", "state": "accept"}))
+    src.write_text("\n".join(lines) + "\n\n")
+    dst = logstore.store_path(str(src))
+    assert logstore.compact(str(src), dst) == (len(ENTRIES), 2)
+    return logstore.Store(dst)
+
+def test_entries_round_trip(store):
+    assert store.rows == len(ENTRIES)
+    for row, original in enumerate(ENTRIES):
+        expected = dict(original, Cycle=int(original["Cycle"]))
+        expected.setdefault("rtt_ms", None)
+        expected.setdefault("clock_offset_ms", None)
+        assert store.entry(row) == expected
+
+def test_find(store):
+    assert store.find(player="alice") == [0, 3]
+    assert store.find(game="g2") == [2, 5]
+    assert store.find(player="carol", state="accept") == [5]
+    assert store.find(room="lobby", state="accept") == [0, 4]
+    assert store.find(player="dave") == []
+    assert store.find() == list(range(len(ENTRIES)))
+
+def test_games(store):
+    games = store.games()
+    assert set(games) == {"g1", "g2"}
+    room, first, last, turns = games["g1"]
+    assert room == "lobby" and turns == 4 and last - first == 43000
+    assert set(store.games(player="carol")) == {"g2"}
+    assert store.games(player="dave") == {}
+
+def test_string_tables(store):
+    assert store.code("word", "éclair") is not None
+    assert store.string("word", store.code("word", "éclair")) == "éclair"
+    assert store.code("word", "zzz") is None
+    assert store.code("player", "aaa") is None
+
+def test_games_without_ids_split_where_the_cycle_drops(tmp_path):
+    src = tmp_path / "game_log.20260102-100000.json"
+    cycles = [1, 1, 2, 1, 3, 1]
+    src.write_text("".join(json.dumps(dict(entry(c, "alice", "a", "accept", 1, 1, f"2026-01-02T10:00:0{i}.000Z"),
+                                           game=None)) + "\n" for i, c in enumerate(cycles)))
+    dst = str(tmp_path / "out.col")
+    logstore.compact(str(src), dst)
+    store = logstore.Store(dst)
+    assert sorted(turns for _, _, _, turns in store.games().values()) == [1, 2, 3]
+
+def test_not_a_store(tmp_path):
+    path = tmp_path / "x.col"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        logstore.Store(str(path))
+
+def test_only_rotated_segments_are_compacted():
+    assert logstore.is_segment("logs/game_log.20260102-100000.json")
+    assert logstore.is_segment("game_log.w1.20260102-100000-2.json")
+    assert not logstore.is_segment("game_log.json")
+    assert not logstore.is_segment("game_log.w1.json")
@@ -0,0 +1,63 @@
+import json
+import socket
+import threading
+
+import pytest
+
+import inbound
+import prefork
+
+
+def reader_with(data, max_line=None):
+    reader = inbound.LineReader(max_line=max_line)
+    lines = reader.feed(data)
+    return reader, lines
+
+def test_unfinished_line_moves_with_the_client():
+    reader, lines = reader_with(b"JOIN other\nCHAT hel")
+    msg = prefork.carry({"op": "lobby"}, lines[1:], reader)
+    assert msg['pending'] == []
+    moved = inbound.LineReader()
+    prefork.take_over(moved, json.loads(json.dumps(msg))['partial'])
+    assert moved.feed(b"lo\n") == ["CHAT hello"]
+
+def test_skipped_line_stays_skipped():
+    reader, _ = reader_with(b"x" * 100, max_line=10)
+    msg = prefork.carry({"op": "lobby"}, [], reader)
+    assert msg['partial'] is None
+    moved = inbound.LineReader(max_line=10)
+    prefork.take_over(moved, msg['partial'])
+    assert moved.feed(b"xxx\nSCORES\n") == ["SCORES"]
+
+def test_new_connection_starts_empty():
+    reader = inbound.LineReader()
+    prefork.take_over(reader, "")
+    assert reader.feed(b"ROOMS\n") == ["ROOMS"]
+
+def test_handoff_fits_in_a_message(monkeypatch):
+    monkeypatch.setattr(prefork, "MAX_MESSAGE", 4096)
+    lines = [f"CHAT {i} " + "é" * 200 for i in range(20)]
+    reader, _ = reader_with("CHAT ".encode() + "\x01".encode() * 1000)
+    msg = prefork.carry({"op": "lobby", "name": "alice"}, lines, reader)
+    assert len(json.dumps(msg).encode()) <= 4096
+    # the partial line goes first, then lines from the end; what is kept is in order
+    assert msg['partial'] is None
+    assert 0 < len(msg['pending']) < len(lines) and msg['pending'] == lines[:len(msg['pending'])]
+    assert msg['name'] == "alice"
+
+def test_small_handoff_is_untouched():
+    reader, lines = reader_with(b"JOIN b\nCHAT hi\nSCO")
+    msg = prefork.carry({"op": "attach"}, lines, reader)
+    assert msg['pending'] == ["JOIN b", "CHAT hi"]
+    moved = inbound.LineReader()
+    prefork.take_over(moved, msg['partial'])
+    assert moved.feed(b"RES\n") == ["SCORES"]
+
+def test_oversized_message_is_refused(monkeypatch):
+    monkeypatch.setattr(prefork, "MAX_MESSAGE", 1024)
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    with a, b:
+        with pytest.raises(OSError):
+            prefork.send_msg(a, threading.Lock(), {"op": "attach", "name": "x" * 2000})
+        prefork.send_msg(a, threading.Lock(), {"op": "gone"})
+        assert prefork.recv_msg(b) == ({"op": "gone"}, None)
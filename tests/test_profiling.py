@@ -0,0 +1,38 @@
+import json
+import types
+
+import pytest
+
+import profiling
+
+
+ROOM = types.SimpleNamespace(name="lobby")
+
+def test_no_trace_when_off():
+    assert profiling.tracer is None
+    assert profiling.begin_turn(ROOM, {'name': "alice"}) is None
+
+def test_turn_is_traced(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    profiling.start(trace=str(path))
+    try:
+        trace = profiling.begin_turn(ROOM, {'name': "alice"})
+        trace.mark("receive")
+        trace.mark("validate")
+        trace.done(state="accept")
+    finally:
+        profiling.stop()
+    record = json.loads(path.read_text())
+    assert record["room"] == "lobby" and record["player"] == "alice" and record["state"] == "accept"
+    assert list(record["spans_ms"]) == ["receive", "validate"]
+    assert record["total_ms"] == pytest.approx(sum(record["spans_ms"].values()), abs=0.01)
+
+def test_turn_ending_after_stop(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    profiling.start(trace=str(path))
+    trace = profiling.begin_turn(ROOM, {'name': "alice"})
+    profiling.stop()
+    trace.mark("receive")
+    trace.done(state="accept")
+    assert profiling.tracer is None
+    assert path.read_text() == ""
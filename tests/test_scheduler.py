@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import scheduler
+
+
+def collect(n):
+    fired = []
+    done = threading.Event()
+    def fire(name):
+        fired.append(name)
+        if len(fired) == n:
+            done.set()
+    return fired, done, fire
+
+def test_timers_fire_in_deadline_order():
+    fired, done, fire = collect(3)
+    scheduler.call_later(0.06, fire, "c")
+    scheduler.call_later(0.04, fire, "b")
+    scheduler.call_later(0.02, fire, "a")    # earlier than the one the thread sleeps for
+    assert done.wait(2)
+    assert fired == ["a", "b", "c"]
+
+def test_cancelled_timer_does_not_fire():
+    fired, done, fire = collect(1)
+    timer = scheduler.call_later(0.01, fire, "cancelled")
+    timer.cancel()
+    timer.cancel()
+    scheduler.call_later(0.03, fire, "kept")
+    assert done.wait(2)
+    assert fired == ["kept"]
+    assert timer.cancelled
+
+def test_failing_callback_does_not_stop_the_heap(capsys):
+    fired, done, fire = collect(1)
+    scheduler.call_later(0.01, lambda: 1 / 0)
+    scheduler.call_later(0.02, fire, "after")
+    assert done.wait(2)
+    assert "ZeroDivisionError" in capsys.readouterr().err
+
+def test_counters():
+    before = scheduler.snapshot()
+    fired, done, fire = collect(1)
+    scheduler.call_later(0.01, fire, 1)
+    scheduler.call_later(60, fire, 2).cancel()
+    assert done.wait(2)
+    after = scheduler.snapshot()
+    assert after["scheduled"] - before["scheduled"] == 2
+    assert after["fired"] - before["fired"] == 1
+    assert after["cancelled"] - before["cancelled"] == 1
+    assert after["lateness_max_ms"] >= 0
+
+def test_asyncio_loop(monkeypatch):
+    fired = []
+    async def main():
+        monkeypatch.setattr(scheduler, "loop", asyncio.get_running_loop())
+        scheduler.call_later(0.02, fired.append, "b")
+        scheduler.call_later(0.01, fired.append, "a")
+        scheduler.call_later(0.01, fired.append, "cancelled").cancel()
+        await asyncio.sleep(0.05)
+    asyncio.run(main())
+    assert fired == ["a", "b"]
@@ -0,0 +1,77 @@
+import gameclient
+import rooms
+import server
+import wire
+
+
+def player(room, name, binary=False, delta=True):
+    received = []
+    p = {'id': len(room.players), 'name': name, 'score': 0, 'binary': binary, 'delta': delta,
+         'send': lambda data, kind="default": received.append(data), 'received': received}
+    room.players[p['id']] = p
+    return p
+
+def events(p):
+    framer = gameclient.LineFramer()
+    if p['binary']:
+        framer.feed(wire.SWITCH.encode() + b"\n")
+    for data in p['received']:
+        framer.feed(data)
+    p['received'].clear()
+    return [gameclient.to_event(item) for item in framer.lines()]
+
+def test_delta_clients_follow_the_scoreboard():
+    room = rooms.Room("lobby", 8)
+    old = player(room, "old", delta=False)
+    text = player(room, "alice")
+    binary = player(room, "bob", binary=True)
+    boards = {id(text): gameclient.Scoreboard(), id(binary): gameclient.Scoreboard()}
+    server.broadcast_scores(room, joined=text)
+    server.broadcast_scores(room, joined=binary)
+    for p in (text, binary):
+        for event in events(p):
+            boards[id(p)].apply(event)
+    text['score'], old['score'] = 5, 2
+    server.broadcast_scores(room)
+    del room.players[old['id']]
+    server.broadcast_scores(room)
+    server.broadcast_scores(room)       # nothing changed: nothing sent
+    for p in (text, binary):
+        received = events(p)
+        assert [type(e) for e in received] == [gameclient.ScoreDelta] * 2
+        for event in received:
+            assert boards[id(p)].apply(event)
+        assert boards[id(p)].scores == room.scoreboard == {"alice": 5, "bob": 0}
+    assert events(old)[-1] == gameclient.Scores({"old": 2, "alice": 5, "bob": 0})
+
+def test_delta_lists_only_the_changes():
+    room = rooms.Room("lobby", 8)
+    for name in ("alice", "bob", "carol"):
+        player(room, name)
+    server.broadcast_scores(room)
+    room.players[1]['score'] = 3
+    server.broadcast_scores(room)
+    assert room.players[0]['received'][-1] == b"SCOREDELTA 2 bob:3\n"
+
+def test_gap_asks_for_a_snapshot():
+    board = gameclient.Scoreboard()
+    assert board.apply(gameclient.ScoreDelta(1, {"alice": 1}, [])) == set()     # no snapshot yet
+    assert board.apply(gameclient.ScoreSnapshot(4, {"alice": 1, "bob": 2})) == {"alice", "bob"}
+    assert board.apply(gameclient.ScoreDelta(4, {"alice": 9}, [])) == set()     # already in the snapshot
+    assert board.apply(gameclient.ScoreDelta(5, {"alice": 3}, ["bob"])) == {"alice", "bob"}
+    assert board.scores == {"alice": 3}
+    assert board.apply(gameclient.ScoreDelta(7, {"alice": 4}, [])) is None
+    assert board.seq is None
+    assert board.apply(gameclient.ScoreDelta(8, {"alice": 5}, [])) == set()     # waits for the snapshot
+    board.apply(gameclient.ScoreSnapshot(8, {"alice": 5}))
+    assert board.scores == {"alice": 5} and board.seq == 8
+
+def test_snapshot_on_request():
+    room = rooms.Room("lobby", 8)
+    p = player(room, "alice", binary=True)
+    p['room'] = room
+    p['score'] = 4
+    server.broadcast_scores(room)
+    events(p)
+    server.send_scores(p)
+    assert events(p) == [gameclient.ScoreSnapshot(1, {"alice": 4})]
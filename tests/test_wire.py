@@ -0,0 +1,125 @@
+import pytest
+
+import gameclient
+import wire
+
+
+FRAMES = [
+    wire.prompt("b"),
+    wire.scores([("alice", 3), ("bob", -2)]),
+    wire.result(2, "alice", "banana", "bonus", 8, 11, "2026-01-01T00:00:00.000Z", "2026-01-01T00:00:00.120Z"),
+    wire.played("bob", "apple", 5, "accept"),
+    wire.chat("alice", "hi: there, all"),
+    wire.info("Waiting for players."),
+    wire.error("It is not your turn."),
+    wire.endgame([("alice", 11), ("bob", 5)]),
+    wire.rooms([("lobby", 2, 8, "waiting"), ("fast", 8, 8, "playing")]),
+    wire.started("q"),
+    wire.host(True),
+    wire.score_snapshot(7, [("alice", 11)]),
+    wire.score_delta(8, [("bob", 6)], ["carol"]),
+    wire.session("f00d"),
+    wire.state("lobby", "playing", 3, "e", "alice"),
+    wire.dictionary("0123456789abcdef", 10019, 40960),
+    wire.dictionary_data(1, 3, b"\x00\x01\xff"),
+]
+
+def framed(frames):
+    """What a binary client receives: the text lines up to BINARY, then frames."""
+    return wire.SWITCH.encode() + b"\n" + b"".join(f.encode(True) for f in frames)
+
+def events(data, size=None):
+    framer = gameclient.LineFramer()
+    out = []
+    for i in range(0, len(data), size or len(data)):
+        framer.feed(data[i:i + (size or len(data))])
+        out.extend(gameclient.to_event(item) for item in framer.lines())
+    return out
+
+@pytest.mark.parametrize("frame", FRAMES)
+def test_text_and_binary_decode_alike(frame):
+    data = frame.encode(True)
+    length, type = wire.HEADER.unpack_from(data)
+    assert type == frame.type and length == len(data) - wire.HEADER.size
+    # "+state" text: PLAYED carries the turn state as in binary
+    text = frame.encode(state=True).decode()
+    assert gameclient.parse_frame(type, data[wire.HEADER.size:]) == gameclient.parse_line(text)
+
+def test_encodings_are_cached():
+    frame = wire.chat("alice", "hello")
+    assert frame.encode() is frame.encode()
+    assert frame.encode(True) is frame.encode(True)
+    assert frame.encode() == b"CHAT [alice]: hello\n"
+
+def test_text_is_the_original_protocol():
+    assert wire.prompt("b").encode() == b"PROMPT b\n"
+    assert wire.scores([("alice", 3), ("bob", -2)]).encode() == b"SCORES alice:3,bob:-2\n"
+    assert wire.endgame([("alice", 11)]).encode() == b"ENDGAME alice: 11\n"
+    assert wire.error("x").encode() == b"ERROR: x\n"
+    assert wire.rooms([]).encode() == b"ROOMS\n"
+    assert wire.played("bob", "apple", 5, "accept").encode() == b"INFO bob played 'apple' (+5 points)\n"
+    assert wire.played("bob", "", -2, "timeout").encode() == b"INFO bob played '' (+-2 points)\n"
+
+def test_state_only_for_clients_that_ask():
+    frame = wire.played("bob", "apple", 5, "bonus")
+    assert frame.encode(state=True) == b"INFO bob played 'apple' (+5 points) [bonus]\n"
+    assert frame.encode(state=True) is frame.encode(state=True)
+    assert frame.encode() == b"INFO bob played 'apple' (+5 points)\n"
+    assert wire.encode_event(frame, 3, tagged=True, state=True) == b"@3 INFO bob played 'apple' (+5 points) [bonus]\n"
+    assert wire.info("hi").encode(state=True) == b"INFO hi\n"
+
+def test_stream_split_anywhere():
+    data = b"INFO Welcome.\r\nPING 1\n" + framed(FRAMES)
+    whole = events(data)
+    assert whole[:2] == [gameclient.Info("Welcome."), gameclient.Ping("1")]
+    assert len(whole) == 2 + len(FRAMES)
+    for size in (1, 3, 7):
+        assert events(data, size) == whole
+
+def test_long_fields_are_cut():
+    event = gameclient.parse_frame(wire.PROMPT, wire.prompt("n" * 300).encode(True)[wire.HEADER.size:])
+    assert event.letter == "n" * 255
+    assert wire.s16("x" * 70000) == b"\xff\xff" + b"x" * 0xFFFF
+
+@pytest.mark.parametrize("frame", [
+    wire.result(70000, "alice", "xx", "invalid", -1, -40000, None, "2026-01-01T00:00:00.000Z"),
+    wire.played("alice", "supercalifragilistic", 2 ** 31 - 1, "bonus"),
+    wire.scores([("alice", -40000), ("bob", 2 ** 20)]),
+    wire.score_delta(9, [("alice", -2 ** 31)], []),
+    wire.state("lobby", "playing", 70000, "e", "alice"),
+])
+def test_values_past_16_bits(frame):
+    # scores have no floor, and a long game runs past 65535 cycles
+    data = frame.encode(True)
+    assert gameclient.parse_frame(data[2], data[3:]) == gameclient.parse_line(frame.encode(state=True).decode())
+
+def test_malformed_frame():
+    with pytest.raises(ValueError):
+        wire.decode(wire.SCORES, b"\x00\x05")
+    with pytest.raises(ValueError):
+        wire.decode(250, b"")
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_tagged_events(binary):
+    frame = wire.info("bob joined.")
+    assert wire.encode_event(frame, 4, binary) == frame.encode(binary)
+    if not binary:
+        assert wire.encode_event(frame, 4, tagged=True) == b"@4 INFO bob joined.\n"
+    data = b"".join(wire.encode_event(frame, seq, binary, tagged=True) for seq in (4, 5, 5, 3))
+    framer = gameclient.LineFramer()
+    framer.feed(wire.SWITCH.encode() + b"\n" + data if binary else data)
+    conn = gameclient.Commands()
+    received = [conn.receive(item) for item in framer.lines()]
+    # the replayed 5 and the old 3 are dropped
+    assert [e for e in received if e is not None] == [gameclient.Info("bob joined.")] * 2
+    assert conn.last_seq == 5
+
+@pytest.mark.parametrize("arg, expected", [
+    ("alice", ("alice", set())),
+    ("alice +bin", ("alice", {"bin"})),
+    ("mary ann +delta +bin", ("mary ann", {"bin", "delta"})),
+    ("alice +state", ("alice", {"state"})),
+    ("+bin", ("+bin", set())),
+])
+def test_parse_register(arg, expected):
+    assert wire.parse_register(arg) == expected
@@ -0,0 +1,405 @@
+"""Server-to-client messages and their two encodings.
+
+Every message the server sends is a Frame: a type code plus fields.
+A frame is rendered at most once per encoding, however many players
+receive it:
+
+  text    the original line protocol (PROMPT x, SCORES a:1,b:2, JSON turn
+          results, INFO/ERROR lines ...), one line per message;
+  binary  negotiated with a "+bin" token after the name in REGISTER
+          ("REGISTER alice +bin"). The server answers with the text line
+          BINARY and from then on sends length-prefixed frames:
+
+              uint16 payload length | uint8 type | payload
+
+          Payload fields are big-endian. Scores and points are int32
+          (scores have no floor: invalid answers keep costing points),
+          cycle numbers uint32, counts uint16. Names, letters, timestamps and room names are
+          uint8 length + UTF-8 (cut at 255 bytes). Words, chat and
+          INFO/ERROR text are uint16 length + UTF-8.
+
+Clients keep sending text lines in both modes.
+
+A "+delta" token asks for a versioned scoreboard instead of SCORES: a
+SCORESNAP <seq> snapshot when joining a room (or on request, SCORES),
+then SCOREDELTA <seq> lines with only the entries that changed ("name:"
+for a player who left). Sequence numbers count up per room; a client
+that sees one skipped asks for a new snapshot.
+
+A "+resume" token gets a SESSION <token> line, and every room event (what
+goes through server.broadcast and chat) is tagged with a sequence number:
+"@<seq> " before the line, or a SEQ frame (uint32) before the binary
+frame. After a lost connection the client sends RESUME <token> <last seq>
+instead of REGISTER and receives the events it missed.
+
+A "+ping" token gets a PING <n> heartbeat every few seconds; the client
+answers PONG <n> [<its wall clock in ms>], and a connection that stops
+answering is closed. The answers give the server the player's RTT and
+clock offset (latency.py).
+
+A "+state" token adds the turn's result to the text play line:
+INFO <player> played '<word>' (+<points> points) [<state>], the state
+being accept, bonus, invalid or timeout. Binary PLAYED frames always end
+with the state byte.
+
+DICT asks for the version of the server's dictionary: DICT <version>
+<words> <compressed bytes>. DICT GET sends the compressed word list as
+DICTDATA <i> <n> <base64 chunk> lines (in binary, raw chunks), i counting
+up to n - 1. Both work before REGISTER; see dictcache.py.
+
+Spectators send WATCH <room> (same tokens as REGISTER) instead of
+REGISTER. They get STATE <room> <status> <cycle> <letter or -> <player>,
+the scoreboard, and then the room's INFO, scores and ENDGAME frames.
+"""
+import base64
+import functools
+import json
+import struct
+
+
+SWITCH = "BINARY"       # last text line before binary frames
+
+PROMPT = 1
+SCORES = 2
+RESULT = 3
+PLAYED = 4
+CHAT = 5
+INFO = 6
+ERROR = 7
+ENDGAME = 8
+ROOMS = 9
+STARTED = 10
+HOST = 11
+SCORESNAP = 12
+SCOREDELTA = 13
+SESSION = 14
+SEQ = 15                # tags the next frame with a room event number
+PING = 16
+STATE = 17              # room snapshot for a new spectator
+DICT = 18               # dictionary version
+DICTDATA = 19           # one chunk of the compressed dictionary
+
+STATES = ("accept", "bonus", "invalid", "timeout")
+STATE_CODES = {s: i for i, s in enumerate(STATES)}
+
+HEADER = struct.Struct("!HB")
+U8 = struct.Struct("!B")
+U16 = struct.Struct("!H")
+I32 = struct.Struct("!i")
+RESULT_HEAD = struct.Struct("!IBii")
+ROOM_COUNTS = struct.Struct("!HH")
+CHUNK_HEAD = struct.Struct("!HH")
+U32 = struct.Struct("!I")
+
+class Frame:
+    __slots__ = ("type", "fields", "text", "binary", "stated")
+
+    def __init__(self, type, *fields):
+        self.type = type
+        self.fields = fields
+        self.text = None
+        self.binary = None
+        self.stated = None
+
+    def encode(self, binary=False, state=False):
+        """The frame as bytes for a text or a binary client (cached); `state`: a "+state" text client."""
+        if binary:
+            if self.binary is None:
+                payload = PACK[self.type](*self.fields)
+                self.binary = HEADER.pack(len(payload), self.type) + payload
+            return self.binary
+        if state and self.type in RENDER_STATE:
+            if self.stated is None:
+                self.stated = (RENDER_STATE[self.type](*self.fields) + "\n").encode()
+            return self.stated
+        if self.text is None:
+            self.text = (RENDER[self.type](*self.fields) + "\n").encode()
+        return self.text
+
+    def __str__(self):
+        return RENDER[self.type](*self.fields)
+
+# --- constructors used by the server ---
+
+def prompt(letter):
+    return Frame(PROMPT, letter)
+
+def scores(pairs):
+    return Frame(SCORES, pairs)
+
+def score_snapshot(seq, pairs):
+    return Frame(SCORESNAP, seq, pairs)
+
+def score_delta(seq, changed, removed):
+    """changed: [(name, score)]; removed: names no longer on the scoreboard."""
+    return Frame(SCOREDELTA, seq, changed, removed)
+
+def session(token):
+    return Frame(SESSION, token)
+
+def ping(n):
+    return Frame(PING, n)
+
+def state(room, status, cycle, letter, player):
+    """letter and player are "" between games and turns."""
+    return Frame(STATE, room, status, cycle, letter, player)
+
+def dictionary(version, words, size):
+    return Frame(DICT, version, words, size)
+
+def dictionary_data(index, total, chunk):
+    return Frame(DICTDATA, index, total, chunk)
+
+def result(cycle, player, word, state, score_change, current_score, player_timestamp, server_timestamp):
+    return Frame(RESULT, cycle, player, word, state, score_change, current_score,
+                 player_timestamp, server_timestamp)
+
+def played(player, word, points, state):
+    return Frame(PLAYED, player, word, points, state)
+
+def chat(sender, text):
+    return Frame(CHAT, sender, text)
+
+def info(text):
+    return Frame(INFO, text)
+
+def error(text):
+    return Frame(ERROR, text)
+
+def endgame(pairs):
+    return Frame(ENDGAME, pairs)
+
+def rooms(listing):
+    """listing: [(name, players, max_players, status)]"""
+    return Frame(ROOMS, listing)
+
+def started(letter):
+    return Frame(STARTED, letter)
+
+def host(new=False):
+    return Frame(HOST, new)
+
+def encode_event(frame, seq, binary=False, tagged=False, state=False):
+    """A room event for one client; `tagged` (+resume) clients get its sequence number."""
+    if not tagged:
+        return frame.encode(binary, state)
+    if binary:
+        return HEADER.pack(U32.size, SEQ) + U32.pack(seq) + frame.encode(True)
+    return b"@%d " % seq + frame.encode(False, state)
+
+# --- text rendering (byte-identical to the original protocol) ---
+
+def render_result(cycle, player, word, state, score_change, current_score, player_timestamp, server_timestamp):
+    return json.dumps({
+        "Cycle": str(cycle),
+        "player": player,
+        "word": word,
+        "player_timestamp": player_timestamp,
+        "server_timestamp": server_timestamp,
+        "state": state,
+        "score_change": score_change,
+        "current_score": current_score,
+    })
+
+def render_delta(seq, changed, removed):
+    items = [f"{n}:{s}" for n, s in changed] + [f"{n}:" for n in removed]
+    return f"SCOREDELTA {seq} " + ",".join(items)
+
+RENDER = {
+    PROMPT: lambda letter: f"PROMPT {letter}",
+    SCORES: lambda pairs: "SCORES " + ",".join(f"{n}:{s}" for n, s in pairs),
+    RESULT: render_result,
+    PLAYED: lambda player, word, points, state: f"INFO {player} played '{word}' (+{points} points)",
+    CHAT: lambda sender, text: f"CHAT [{sender}]: {text}",
+    INFO: lambda text: f"INFO {text}",
+    ERROR: lambda text: f"ERROR: {text}",
+    ENDGAME: lambda pairs: "ENDGAME " + ",".join(f"{n}: {s}" for n, s in pairs),
+    ROOMS: lambda listing: f"ROOMS {','.join(f'{n}:{c}/{m}:{st}' for n, c, m, st in listing)}".rstrip(),
+    STARTED: lambda letter: f"INFO Game starting! First letter: {letter}",
+    HOST: lambda new: "INFO You are the new host." if new else "INFO You are the host.",
+    SCORESNAP: lambda seq, pairs: f"SCORESNAP {seq} " + ",".join(f"{n}:{s}" for n, s in pairs),
+    SCOREDELTA: render_delta,
+    SESSION: lambda token: f"SESSION {token}",
+    PING: lambda n: f"PING {n}",
+    STATE: lambda room, status, cycle, letter, player:
+        f"STATE {room} {status} {cycle} {letter or '-'} {player}".rstrip(),
+    DICT: lambda version, words, size: f"DICT {version} {words} {size}",
+    DICTDATA: lambda index, total, chunk: f"DICTDATA {index} {total} {base64.b64encode(chunk).decode()}",
+}
+
+# text for "+state" clients, where it differs
+RENDER_STATE = {
+    PLAYED: lambda player, word, points, state: f"INFO {player} played '{word}' (+{points} points) [{state}]",
+}
+
+# --- binary packing ---
+
+def s8(s):
+    """Short string: uint8 length + UTF-8, cut at 255 bytes."""
+    data = s.encode() if s.__class__ is str else ("" if s is None else str(s)).encode()
+    if len(data) > 0xFF:
+        data = data[:0xFF]
+    return U8.pack(len(data)) + data
+
+@functools.lru_cache(maxsize=4096)
+def name8(name):
+    """s8 for the few distinct strings that recur in every frame (player names, letters)."""
+    return s8(name)
+
+def s16(s):
+    data = s.encode() if s.__class__ is str else ("" if s is None else str(s)).encode()
+    if len(data) > 0xFFFF:
+        data = data[:0xFFFF]
+    return U16.pack(len(data)) + data
+
+def pack_pairs(pairs):
+    return U16.pack(len(pairs)) + b"".join([name8(n) + I32.pack(v) for n, v in pairs])
+
+def pack_result(cycle, player, word, state, score_change, current_score, player_timestamp, server_timestamp):
+    return (RESULT_HEAD.pack(cycle, STATE_CODES[state], score_change, current_score)
+            + name8(player) + s16(word) + s8(player_timestamp) + s8(server_timestamp))
+
+PACK = {
+    PROMPT: name8,
+    SCORES: pack_pairs,
+    RESULT: pack_result,
+    PLAYED: lambda player, word, points, state: (name8(player) + s16(word) + I32.pack(points)
+                                                 + U8.pack(STATE_CODES[state])),
+    CHAT: lambda sender, text: name8(sender) + s16(text),
+    INFO: s16,
+    ERROR: s16,
+    ENDGAME: pack_pairs,
+    ROOMS: lambda listing: U16.pack(len(listing)) + b"".join([
+        s8(n) + ROOM_COUNTS.pack(c, m) + s8(st) for n, c, m, st in listing]),
+    STARTED: name8,
+    HOST: lambda new: U8.pack(bool(new)),
+    SCORESNAP: lambda seq, pairs: U32.pack(seq) + pack_pairs(pairs),
+    SCOREDELTA: lambda seq, changed, removed: (U32.pack(seq) + pack_pairs(changed) + U16.pack(len(removed))
+                                               + b"".join([name8(n) for n in removed])),
+    SESSION: s8,
+    PING: U32.pack,
+    STATE: lambda room, status, cycle, letter, player: (s8(room) + s8(status) + U32.pack(cycle)
+                                                        + name8(letter) + name8(player)),
+    DICT: lambda version, words, size: s8(version) + U32.pack(words) + U32.pack(size),
+    DICTDATA: lambda index, total, chunk: CHUNK_HEAD.pack(index, total) + chunk,
+}
+
+# --- binary decoding (clients) ---
+# Each reader takes (payload, offset) and returns (value, next offset).
+
+def r8(b, pos):
+    end = pos + 1 + b[pos]
+    return b[pos + 1:end].decode('utf-8', 'replace'), end
+
+def r16(b, pos):
+    end = pos + 2 + (b[pos] << 8 | b[pos + 1])
+    return b[pos + 2:end].decode('utf-8', 'replace'), end
+
+def rpairs(b, pos):
+    (n,) = U16.unpack_from(b, pos)
+    pos += 2
+    pairs = []
+    for _ in range(n):
+        name, pos = r8(b, pos)
+        (value,) = I32.unpack_from(b, pos)
+        pos += I32.size
+        pairs.append((name, value))
+    return pairs, pos
+
+def unpack_str8(b):
+    return (r8(b, 0)[0],)
+
+def unpack_str16(b):
+    return (r16(b, 0)[0],)
+
+def unpack_result(b):
+    cycle, state, score_change, current_score = RESULT_HEAD.unpack_from(b, 0)
+    player, pos = r8(b, RESULT_HEAD.size)
+    word, pos = r16(b, pos)
+    player_ts, pos = r8(b, pos)
+    server_ts, _ = r8(b, pos)
+    return (cycle, player, word, STATES[state], score_change, current_score,
+            player_ts or None, server_ts or None)
+
+def unpack_played(b):
+    player, pos = r8(b, 0)
+    word, pos = r16(b, pos)
+    # the state byte came later; frames without it decode with state None
+    state = STATES[b[pos + I32.size]] if len(b) > pos + I32.size else None
+    return (player, word, I32.unpack_from(b, pos)[0], state)
+
+def unpack_chat(b):
+    sender, pos = r8(b, 0)
+    return (sender, r16(b, pos)[0])
+
+def unpack_rooms(b):
+    (n,) = U16.unpack_from(b, 0)
+    pos = 2
+    listing = []
+    for _ in range(n):
+        name, pos = r8(b, pos)
+        players, max_players = ROOM_COUNTS.unpack_from(b, pos)
+        status, pos = r8(b, pos + ROOM_COUNTS.size)
+        listing.append((name, players, max_players, status))
+    return (listing,)
+
+def unpack_delta(b):
+    changed, pos = rpairs(b, U32.size)
+    (n,) = U16.unpack_from(b, pos)
+    pos += 2
+    removed = []
+    for _ in range(n):
+        name, pos = r8(b, pos)
+        removed.append(name)
+    return (U32.unpack_from(b, 0)[0], changed, removed)
+
+def unpack_state(b):
+    room, pos = r8(b, 0)
+    status, pos = r8(b, pos)
+    (cycle,) = U32.unpack_from(b, pos)
+    letter, pos = r8(b, pos + U32.size)
+    return (room, status, cycle, letter, r8(b, pos)[0])
+
+def unpack_dict(b):
+    version, pos = r8(b, 0)
+    return (version, U32.unpack_from(b, pos)[0], U32.unpack_from(b, pos + 4)[0])
+
+UNPACK = {
+    PROMPT: unpack_str8,
+    SCORES: lambda b: (rpairs(b, 0)[0],),
+    RESULT: unpack_result,
+    PLAYED: unpack_played,
+    CHAT: unpack_chat,
+    INFO: unpack_str16,
+    ERROR: unpack_str16,
+    ENDGAME: lambda b: (rpairs(b, 0)[0],),
+    ROOMS: unpack_rooms,
+    STARTED: unpack_str8,
+    HOST: lambda b: (bool(b[0]),),
+    SCORESNAP: lambda b: (U32.unpack_from(b, 0)[0], rpairs(b, U32.size)[0]),
+    SCOREDELTA: unpack_delta,
+    SESSION: unpack_str8,
+    SEQ: U32.unpack,
+    PING: U32.unpack,
+    STATE: unpack_state,
+    DICT: unpack_dict,
+    DICTDATA: lambda b: CHUNK_HEAD.unpack_from(b, 0) + (bytes(b[CHUNK_HEAD.size:]),),
+}
+
+def decode(type, payload):
+    """Fields of a binary frame payload; raises ValueError if it is malformed."""
+    try:
+        return UNPACK[type](payload)
+    except (KeyError, IndexError, struct.error) as e:
+        raise ValueError(f"bad frame type {type}: {e}") from None
+
+def parse_register(arg):
+    """Split 'alice +bin' into ('alice', {'bin'})."""
+    caps = set()
+    name = arg.strip()
+    while True:
+        head, _, last = name.rpartition(" ")
+        if not head or not last.startswith("+"):
+            return name, caps
+        caps.add(last[1:])
+        name = head.rstrip()
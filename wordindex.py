@@ -0,0 +1,242 @@
+"""Dictionary engine: words indexed by id and by first letter.
+
+Words are kept sorted, so all words sharing a first letter occupy one
+contiguous id range. A game records the words it has used as a bitset of
+ids plus a used-count per first letter, which makes both "was this word
+played?" and "how many unused words start with X?" constant time.
+
+LetterGraph groups the ids once more by (first letter, last letter): the
+edges of the letter-to-letter graph a game walks along. Server-side bots
+use it to choose a word by the letter it leaves the next player.
+
+The word list can be compiled into a binary file that is opened with
+mmap instead of being parsed at startup (forked workers share its pages):
+
+    python3 wordindex.py dictionary.txt dictionary.bin
+
+Layout, all integers uint32 in the byte order of the machine that built
+it (little-endian hosts only; others fall back to the text file):
+    magic "WIDX0001", word count, letter count,
+    letter table  (code point, first id, end id) per first letter,
+    offsets       word count + 1 entries into the blob,
+    blob          the sorted, lowercased UTF-8 words back to back.
+"""
+import array
+import bisect
+import mmap
+import os
+import struct
+import sys
+
+
+class WordIndex:
+    def __init__(self, words):
+        self.words = sorted(set(words))
+        self.ids = {w: i for i, w in enumerate(self.words)}
+        self.ranges = {}        # first letter -> (first id, last id + 1)
+        for i, w in enumerate(self.words):
+            start, _ = self.ranges.get(w[0], (i, i))
+            self.ranges[w[0]] = (start, i + 1)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(w for w in (line.strip().lower() for line in f) if w)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.ids
+
+    def lookup(self, word):
+        """Id of a lowercase word, or None."""
+        return self.ids.get(word)
+
+    def word(self, word_id):
+        return self.words[word_id]
+
+    def first_letter(self, word_id):
+        return self.words[word_id][0]
+
+    def letter_range(self, letter):
+        return self.ranges.get(letter, (0, 0))
+
+    def count(self, letter):
+        start, end = self.letter_range(letter)
+        return end - start
+
+    def letters(self):
+        return self.ranges.keys()
+
+    def completions(self, prefix, limit=10):
+        """Up to `limit` words starting with lowercase `prefix`, in order."""
+        i = bisect.bisect_left(self.words, prefix)
+        found = []
+        while i < len(self.words) and len(found) < limit and self.words[i].startswith(prefix):
+            found.append(self.words[i])
+            i += 1
+        return found
+
+class UsedWords:
+    """Words played in one game, as a bitset over dictionary ids."""
+
+    def __init__(self, index):
+        self.index = index
+        self.bits = bytearray((len(index) + 7) // 8)
+        self.used_per_letter = {}
+        self.used_per_pair = {}     # (first letter, last letter) -> count
+        self.played = []        # ids in play order
+
+    def __contains__(self, word_id):
+        return bool(self.bits[word_id >> 3] & (1 << (word_id & 7)))
+
+    def __len__(self):
+        return len(self.played)
+
+    def add(self, word_id):
+        if word_id in self:
+            return
+        self.bits[word_id >> 3] |= 1 << (word_id & 7)
+        word = self.index.word(word_id)
+        letter = word[0]
+        self.used_per_letter[letter] = self.used_per_letter.get(letter, 0) + 1
+        pair = (letter, word[-1])
+        self.used_per_pair[pair] = self.used_per_pair.get(pair, 0) + 1
+        self.played.append(word_id)
+
+    def remaining(self, letter):
+        """Number of unused dictionary words starting with `letter`."""
+        return self.index.count(letter) - self.used_per_letter.get(letter, 0)
+
+    def open_letters(self, candidates):
+        """The candidate letters that still have unused words."""
+        return [c for c in candidates if self.remaining(c) > 0]
+
+    def used_pair(self, first, last):
+        return self.used_per_pair.get((first, last), 0)
+
+class LetterGraph:
+    """Word ids by first and last letter, built once per dictionary."""
+
+    def __init__(self, index):
+        self.edges = {}         # first letter -> {last letter: array of ids}
+        for first in index.letters():
+            start, end = index.letter_range(first)
+            edges = self.edges[first] = {}
+            for i in range(start, end):
+                last = index.word(i)[-1]
+                ids = edges.get(last)
+                if ids is None:
+                    ids = edges[last] = array.array("I")
+                ids.append(i)
+
+    def targets(self, first):
+        """{last letter: ids} of the words starting with `first`."""
+        return self.edges.get(first, {})
+
+    def count(self, first, last):
+        return len(self.edges.get(first, {}).get(last, ()))
+
+MAGIC = b"WIDX0001"
+HEADER = struct.Struct("<8sII")
+LETTER = struct.Struct("<III")
+
+def compile_dictionary(src, dst):
+    """Write the compiled form of text dictionary `src` to `dst`; returns the word count."""
+    index = WordIndex.load(src)
+    encoded = [w.encode('utf-8') for w in index.words]
+    offsets = [0]
+    for w in encoded:
+        offsets.append(offsets[-1] + len(w))
+    tmp = dst + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(encoded), len(index.ranges)))
+        for letter, (start, end) in index.ranges.items():
+            f.write(LETTER.pack(ord(letter), start, end))
+        f.write(array.array("I", offsets).tobytes())
+        f.write(b"".join(encoded))
+    os.replace(tmp, dst)
+    return len(encoded)
+
+class MappedIndex:
+    """WordIndex interface over a compiled, memory-mapped dictionary file."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size, nletters = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled dictionary")
+        pos = HEADER.size
+        self.ranges = {}
+        for _ in range(nletters):
+            code, start, end = LETTER.unpack_from(self.mm, pos)
+            self.ranges[chr(code)] = (start, end)
+            pos += LETTER.size
+        # zero-copy view of the offsets table
+        self.offsets = memoryview(self.mm)[pos:pos + 4 * (self.size + 1)].cast("I")
+        self.blob = pos + 4 * (self.size + 1)
+
+    def _bytes(self, word_id):
+        return self.mm[self.blob + self.offsets[word_id]:self.blob + self.offsets[word_id + 1]]
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, word):
+        return self.lookup(word) is not None
+
+    def __getitem__(self, word_id):
+        # lets bisect search the mapped words directly
+        return self._bytes(word_id)
+
+    def lookup(self, word):
+        if not word:
+            return None
+        start, end = self.letter_range(word[0])
+        key = word.encode('utf-8')
+        i = bisect.bisect_left(self, key, start, end)
+        if i < end and self._bytes(i) == key:
+            return i
+        return None
+
+    def word(self, word_id):
+        return self._bytes(word_id).decode('utf-8')
+
+    def first_letter(self, word_id):
+        return self.word(word_id)[0]
+
+    def letter_range(self, letter):
+        return self.ranges.get(letter, (0, 0))
+
+    def count(self, letter):
+        start, end = self.letter_range(letter)
+        return end - start
+
+    def letters(self):
+        return self.ranges.keys()
+
+    def completions(self, prefix, limit=10):
+        """Up to `limit` words starting with lowercase `prefix`, in order."""
+        key = prefix.encode('utf-8')
+        i = bisect.bisect_left(self, key)
+        found = []
+        while i < self.size and len(found) < limit and self._bytes(i).startswith(key):
+            found.append(self.word(i))
+            i += 1
+        return found
+
+def open_dictionary(text_path, compiled_path=None):
+    """Open the compiled dictionary if it is present and up to date, else parse the text file."""
+    compiled_path = compiled_path or os.path.splitext(text_path)[0] + ".bin"
+    if sys.byteorder == "little" and os.path.exists(compiled_path):
+        if not os.path.exists(text_path) or os.path.getmtime(compiled_path) >= os.path.getmtime(text_path):
+            return MappedIndex(compiled_path)
+        print(f"{compiled_path} is older than {text_path}; using the text file.")
+    return WordIndex.load(text_path)
+
+if __name__ == "__main__":
+    src = sys.argv[1] if len(sys.argv) > 1 else "dictionary.txt"
+    dst = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(src)[0] + ".bin"
+    print(f"Compiled {compile_dictionary(src, dst)} words into {dst}.")